@@ -0,0 +1,140 @@
+"""
+ブラー処理ベンチマークスクリプト
+
+同じ入力動画に対して、ブラー処理のエンジン/カーネルの組み合わせごとに
+エンコード時間とFFmpegプロセスのピークメモリ (RSS) を計測して比較します。
+
+使い方:
+    python benchmark_blur.py [動画ファイルまたはフォルダ ...] [--threads N] [--keep]
+
+計測対象:
+- concat/boxblur（従来方式）
+- timeline/boxblur
+- timeline/gblur
+- timeline/pixelize
+
+ピークメモリは os.wait4 で取得するため、Windows では計測されません（"-" と表示）。
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from blur_videos import build_blur_command, get_video_files
+
+# 比較する (エンジン, カーネル) の組み合わせ（先頭が基準）
+BENCHMARK_CONFIGS = [
+    ("concat", "boxblur"),
+    ("timeline", "boxblur"),
+    ("timeline", "gblur"),
+    ("timeline", "pixelize"),
+]
+
+
+def run_measured(cmd: list[str]) -> tuple[bool, float, int | None]:
+    """
+    コマンドを実行し、所要時間とピークメモリを計測
+
+    Returns:
+        (成功したか, 所要時間（秒）, ピークRSS（KB、計測不可の場合None）)
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    if hasattr(os, "wait4"):
+        # 子プロセス単位の資源使用量を取得（Linuxの ru_maxrss はKB単位）
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        peak_kb = usage.ru_maxrss
+        if sys.platform == "darwin":
+            peak_kb //= 1024  # macOS はバイト単位
+        return process.returncode == 0, elapsed, peak_kb
+
+    process.wait()
+    return process.returncode == 0, time.perf_counter() - start, None
+
+
+def benchmark(video_files: list[Path], threads: int = 0, keep: bool = False) -> None:
+    """各入力・各方式でブラー処理を実行して結果を表示"""
+    output_dir = Path(tempfile.mkdtemp(prefix="blur_bench_"))
+
+    print(f"=== ブラー処理ベンチマーク ===")
+    print(f"入力: {len(video_files)} ファイル")
+    print(f"出力: {output_dir}")
+    print()
+
+    totals = {config: [0.0, 0, 0] for config in BENCHMARK_CONFIGS}  # 時間, 最大RSS, 失敗数
+
+    for video_file in video_files:
+        print(f"--- {video_file.name} ---")
+        print(f"  {'方式':<20} {'時間(秒)':>10} {'ピークRSS(MB)':>14}")
+
+        for engine, kernel in BENCHMARK_CONFIGS:
+            output_file = output_dir / f"{video_file.stem}_{engine}_{kernel}.mp4"
+            cmd = build_blur_command(video_file, output_file, threads=threads,
+                                     engine=engine, kernel=kernel)
+            ok, elapsed, peak_kb = run_measured(cmd)
+
+            total = totals[(engine, kernel)]
+            if ok:
+                total[0] += elapsed
+                total[1] = max(total[1], peak_kb or 0)
+            else:
+                total[2] += 1
+
+            peak = f"{peak_kb / 1024:.1f}" if peak_kb is not None else "-"
+            status = "" if ok else "  ✗ 失敗"
+            print(f"  {engine + '/' + kernel:<20} {elapsed:>10.2f} {peak:>14}{status}")
+
+            if not keep and output_file.exists():
+                output_file.unlink()
+        print()
+
+    print(f"=== 合計 ===")
+    baseline = totals[BENCHMARK_CONFIGS[0]][0]
+    print(f"  {'方式':<20} {'時間(秒)':>10} {'対従来比':>8} {'最大RSS(MB)':>12} {'失敗':>4}")
+    for (engine, kernel), (elapsed, peak_kb, failures) in totals.items():
+        ratio = f"{elapsed / baseline:.2f}x" if baseline else "-"
+        peak = f"{peak_kb / 1024:.1f}" if peak_kb else "-"
+        print(f"  {engine + '/' + kernel:<20} {elapsed:>10.2f} {ratio:>8} {peak:>12} {failures:>4}")
+
+    if not keep:
+        try:
+            output_dir.rmdir()
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    # デフォルトの入力はoriginalsフォルダ
+    default_source = Path(__file__).parent / "originals"
+
+    parser = argparse.ArgumentParser(description="ブラー処理方式のベンチマーク")
+    parser.add_argument("inputs", nargs="*", default=[str(default_source)],
+                        help="動画ファイルまたはフォルダ（デフォルト: originals）")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="1エンコードあたりのスレッド数（デフォルト: FFmpegの自動設定）")
+    parser.add_argument("--keep", action="store_true",
+                        help="出力動画を削除せずに残す")
+    args = parser.parse_args()
+
+    video_files = []
+    for item in args.inputs:
+        path = Path(item)
+        if path.is_dir():
+            video_files.extend(sorted(get_video_files(path)))
+        elif path.is_file():
+            video_files.append(path)
+        else:
+            print(f"警告: 見つかりません: {item}")
+
+    if not video_files:
+        print("処理対象の動画ファイルが見つかりませんでした。")
+        sys.exit(1)
+
+    benchmark(video_files, threads=args.threads, keep=args.keep)
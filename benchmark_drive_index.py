@@ -0,0 +1,186 @@
+"""
+Google Drive フォルダHTMLパーサーのベンチマークスクリプト
+
+download_next_post_files.parse_folder_html（1回の走査）と、
+従来の3パターンを順に適用するパーサーの処理時間と結果を比較します。
+
+使い方:
+    python benchmark_drive_index.py [HTMLファイル ...] [--files N ...] [--repeat N] [--save DIR]
+
+HTMLファイルを指定しない場合は、埋め込みビュー形式とフォルダページ形式の
+フィクスチャを --files で指定したファイル数で生成して計測します。
+--save を指定すると、生成したフィクスチャを保存します（次回以降は保存したファイルを指定可能）。
+"""
+
+import argparse
+import codecs
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+from download_next_post_files import parse_folder_html
+
+
+def parse_folder_html_legacy(html: str) -> dict[str, str]:
+    """従来のパーサー（3つの正規表現でHTMLを個別に走査）"""
+    items_dict = {}
+
+    # --- 抽出パターン1: ["ID", "名前"] ---
+    matches = re.findall(r'\["([a-zA-Z0-9_-]{20,})","([^"]+)"', html)
+    for file_id, name in matches:
+        name_lower = name.lower()
+        if any(noise in name_lower for noise in ['drive_2020q4', 'branding', 'product', 'logo', 'favicon']):
+            continue
+        if any(ext in name_lower for ext in ['.png', '.mp4', '.mov', '.jpg', '.webp']):
+            if not name.startswith('http') and '.' not in file_id:
+                try: name = codecs.decode(name, 'unicode_escape')
+                except: pass
+                if len(name) > 3:
+                    items_dict[name] = file_id
+
+    # --- 抽出パターン2: flip-entry (HTML直接パース) ---
+    entry_matches = re.finditer(r'id="entry-([a-zA-Z0-9_-]+)"[^>]*>.*?class="flip-entry-title">([^<]+)</div>', html, re.DOTALL)
+    for m in entry_matches:
+        file_id, name = m.group(1), m.group(2)
+        if any(ext in name.lower() for ext in ['.png', '.mp4', '.mov', '.jpg', '.webp']):
+            items_dict[name] = file_id
+
+    # --- 抽出パターン3: 拡張子から遡ってIDを探す ---
+    for ext in ['.png', '.jpg', '.webp', '.mp4']:
+        raw_matches = re.finditer(r'"([^"]+' + re.escape(ext) + r')"', html)
+        for m in raw_matches:
+            name = m.group(1)
+            if any(noise in name.lower() for noise in ['drive_2020q4', 'branding', 'product']):
+                continue
+            start_pos = max(0, m.start() - 500)
+            chunk = html[start_pos : m.start()]
+            id_matches = re.findall(r'["\']([a-zA-Z0-9_-]{25,})["\']', chunk)
+            if id_matches:
+                file_id = id_matches[-1]
+                if name not in items_dict:
+                    items_dict[name] = file_id
+
+    return items_dict
+
+
+def _random_id(rng: random.Random) -> str:
+    return "1" + "".join(rng.choices(string.ascii_letters + string.digits + "_-", k=32))
+
+
+def generate_embedded_view(count: int, seed: int = 0) -> str:
+    """埋め込みビュー（embeddedfolderview）形式のフィクスチャを生成"""
+    rng = random.Random(seed)
+    entries = []
+    for i in range(count):
+        file_id = _random_id(rng)
+        name = f"video_{i:05d}.{'png' if i % 2 == 0 else 'mp4'}"
+        entries.append(
+            f'<div class="flip-entry" id="entry-{file_id}" tabindex="0" role="link">'
+            f'<div class="flip-entry-info"><a href="https://drive.google.com/file/d/{file_id}/view?usp=drive_web" target="_blank">'
+            f'<div class="flip-entry-thumb"><img src="https://lh3.googleusercontent.com/{_random_id(rng)}=s190" alt=""></div>'
+            f'<div class="flip-entry-list-icon"><img src="https://drive-thirdparty.googleusercontent.com/16/type/image/png" alt=""></div>'
+            f'<div class="flip-entry-title">{name}</div></a></div>'
+            f'<div class="flip-entry-last-modified"><div>10月17日</div></div></div>'
+        )
+    return (
+        '<!DOCTYPE html><html><head><title>folder</title>'
+        '<link rel="icon" href="https://ssl.gstatic.com/images/branding/product/1x/drive_2020q4_32dp.png">'
+        '</head><body><div class="flip-entries">' + "".join(entries) + '</div></body></html>'
+    )
+
+
+def generate_folder_page(count: int, seed: int = 0) -> str:
+    """フォルダページ（drive/folders）形式のフィクスチャを生成（スクリプト内のデータ配列）"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        file_id = _random_id(rng)
+        if i % 10 == 0:
+            name = "\\u52d5\\u753b_" + f"{i:05d}.png"  # 日本語名はエスケープされている
+        else:
+            name = f"clip_{i:05d}.{'png' if i % 2 == 0 else 'mp4'}"
+        mime = "image/png" if name.endswith(".png") else "video/mp4"
+        rows.append(f'["{file_id}","{name}",null,"{mime}",[null,"{_random_id(rng)}"],{rng.randint(1, 10**8)}]')
+    return (
+        '<!DOCTYPE html><html><head>'
+        '<link rel="icon" href="https://ssl.gstatic.com/images/branding/product/1x/drive_2020q4_32dp.png">'
+        '<script nonce="abc">window.__folder = [' + ",".join(rows) + '];'
+        'var logo = "https://www.gstatic.com/images/branding/googlelogo/2x/googlelogo_color.png";'
+        '</script></head><body></body></html>'
+    )
+
+
+def measure(parser, html: str, repeat: int) -> tuple[float, dict]:
+    """パーサーを repeat 回実行し、1回あたりの最短時間（ミリ秒）と結果を返す"""
+    best = float("inf")
+    result = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parser(html)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def benchmark(fixtures: list[tuple[str, str]], repeat: int = 5) -> bool:
+    """各フィクスチャで両パーサーを計測して結果を表示（全て一致した場合True）"""
+    print(f"=== フォルダHTMLパーサー ベンチマーク ===")
+    print(f"  {'フィクスチャ':<28} {'サイズ(KB)':>10} {'件数':>7} {'従来(ms)':>10} {'単一(ms)':>10} {'比':>7} {'一致':>4}")
+
+    all_match = True
+    for label, html in fixtures:
+        legacy_ms, legacy = measure(parse_folder_html_legacy, html, repeat)
+        single_ms, single = measure(parse_folder_html, html, repeat)
+        match = legacy == single
+        all_match = all_match and match
+        ratio = f"{legacy_ms / single_ms:.1f}x" if single_ms else "-"
+        print(f"  {label:<28} {len(html) / 1024:>10.0f} {len(single):>7} "
+              f"{legacy_ms:>10.2f} {single_ms:>10.2f} {ratio:>7} {'✓' if match else '✗':>4}")
+        if not match:
+            missing = legacy.keys() - single.keys()
+            extra = single.keys() - legacy.keys()
+            changed = [k for k in legacy.keys() & single.keys() if legacy[k] != single[k]]
+            print(f"    不一致: 不足 {len(missing)}件, 余分 {len(extra)}件, ID違い {len(changed)}件")
+
+    return all_match
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Google Drive フォルダHTMLパーサーのベンチマーク")
+    parser.add_argument("fixtures", nargs="*", help="保存済みのHTMLファイル（省略時は生成）")
+    parser.add_argument("--files", type=int, nargs="+", default=[100, 1000, 5000],
+                        help="生成するフィクスチャのファイル数（デフォルト: 100 1000 5000）")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="計測の繰り返し回数（デフォルト: 5）")
+    parser.add_argument("--save", default=None,
+                        help="生成したフィクスチャを保存するフォルダ")
+    args = parser.parse_args()
+
+    fixtures = []
+    if args.fixtures:
+        for item in args.fixtures:
+            path = Path(item)
+            if not path.is_file():
+                print(f"警告: 見つかりません: {item}")
+                continue
+            fixtures.append((path.name, path.read_text(encoding="utf-8", errors="replace")))
+    else:
+        for count in args.files:
+            fixtures.append((f"embedded_{count}.html", generate_embedded_view(count, seed=count)))
+            fixtures.append((f"folder_page_{count}.html", generate_folder_page(count, seed=count)))
+
+    if not fixtures:
+        print("計測対象のHTMLがありません。")
+        sys.exit(1)
+
+    if args.save:
+        save_dir = Path(args.save)
+        save_dir.mkdir(parents=True, exist_ok=True)
+        for label, html in fixtures:
+            (save_dir / label).write_text(html, encoding="utf-8")
+        print(f"フィクスチャを保存しました: {save_dir}\n")
+
+    if not benchmark(fixtures, repeat=args.repeat):
+        sys.exit(1)
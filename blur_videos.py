@@ -8,13 +8,26 @@
 - 元動画はそのまま保持
 - 処理済みファイルはスキップ
 - FFmpegを使用してブラー処理を適用
+- 複数の動画を並列にエンコード（--workers）
+- ブラー方式の選択（--engine concat/timeline, --kernel boxblur/gblur/pixelize）
+- スマートレンダリング（--smart-render）: ブラー前の区間はキーフレーム単位で
+  再エンコードせずにコピーし、ブラーが必要な区間だけをエンコード
+
+使い方:
+    python blur_videos.py [ソースフォルダ] [出力フォルダ名] [--workers N] [--threads N] [--ordered]
+                                [--engine ENGINE] [--kernel KERNEL] [--smart-render]
 """
 
+import argparse
 import os
 import subprocess
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+import media_probe
+
 
 def get_video_files(folder_path: Path) -> list[Path]:
     """動画ファイルの一覧を取得"""
@@ -45,26 +58,66 @@ def get_video_duration(video_path: Path) -> float:
         return 0
 
 
-def apply_blur_after_2sec(input_path: Path, output_path: Path, blur_strength: int = 5) -> bool:
+# ブラーの開始位置（秒）
+BLUR_START_SECS = 2
+
+# ブラー処理のエンジン
+# - concat: split/trim で前後を分けてから concat で結合（従来方式）
+# - timeline: 1系統のまま enable='gte(t,2)' でブラーを切り替え（全フレームの複製・バッファなし）
+BLUR_ENGINES = ("concat", "timeline")
+
+# ブラーのカーネル
+# - boxblur: ボックスブラー（従来方式）
+# - gblur: ガウシアンブラー
+# - pixelize: ブロックごとの平均色によるモザイク（縮小→拡大と同じ見た目、FFmpeg 5.1 以降）
+BLUR_KERNELS = ("boxblur", "gblur", "pixelize")
+
+
+def build_blur_filter(blur_strength: int = 5, engine: str = "concat",
+                      kernel: str = "boxblur", start: float = BLUR_START_SECS,
+                      input_label: str = "0:v") -> str:
     """
-    動画の2秒後からブラー処理を適用
+    ブラー処理の filter_complex を作成（出力ラベルは [outv]）
     
     Args:
-        input_path: 入力動画のパス
-        output_path: 出力動画のパス
-        blur_strength: ブラーの強さ（デフォルト: 5、薄めのブラー）
-    
-    Returns:
-        処理成功時True、失敗時False
+        blur_strength: ブラーの強さ（boxblur: 半径, gblur: sigma, pixelize: ブロックの大きさ）
+        engine: BLUR_ENGINES のいずれか
+        kernel: BLUR_KERNELS のいずれか
+        start: ブラーの開始位置（秒）
+        input_label: 入力のラベル（他のフィルターと組み合わせる場合に指定）
     """
-    # FFmpegフィルター: 最初の2秒は通常、それ以降はブラー処理
-    # boxblurフィルターを使用してブラー効果を適用（薄めのブラー）
-    filter_complex = (
-        f"[0:v]split=2[v1][v2];"
-        f"[v1]trim=0:2,setpts=PTS-STARTPTS[clean];"
-        f"[v2]trim=2,setpts=PTS-STARTPTS,boxblur={blur_strength}:{blur_strength}[blurred];"
-        f"[clean][blurred]concat=n=2:v=1:a=0[outv]"
-    )
+    if engine not in BLUR_ENGINES:
+        raise ValueError(f"不明なエンジン: {engine}")
+    if kernel not in BLUR_KERNELS:
+        raise ValueError(f"不明なカーネル: {kernel}")
+    
+    start = f"{start:g}"
+    src = f"[{input_label}]"
+    blur = {
+        "boxblur": f"boxblur={blur_strength}:{blur_strength}",
+        "gblur": f"gblur=sigma={blur_strength}",
+        "pixelize": f"pixelize=w={blur_strength}:h={blur_strength}",
+    }[kernel]
+    
+    if engine == "concat":
+        # 最初の2秒は通常、それ以降はブラー処理
+        return (
+            f"{src}split=2[v1][v2];"
+            f"[v1]trim=0:{start},setpts=PTS-STARTPTS[clean];"
+            f"[v2]trim={start},setpts=PTS-STARTPTS,{blur}[blurred];"
+            f"[clean][blurred]concat=n=2:v=1:a=0[outv]"
+        )
+    
+    # concat 方式と同じく先頭を0秒に揃えてから時間指定する
+    # （どのカーネルも時間指定 (enable) に対応した1つのフィルタで、映像は分岐しない）
+    return f"{src}setpts=PTS-STARTPTS,{blur}:enable='gte(t,{start})'[outv]"
+
+
+def build_blur_command(input_path: Path, output_path: Path, blur_strength: int = 5,
+                       threads: int = 0, engine: str = "concat",
+                       kernel: str = "boxblur") -> list[str]:
+    """ブラー処理のFFmpegコマンドを作成"""
+    filter_complex = build_blur_filter(blur_strength, engine, kernel)
     
     # 音声がある場合のコマンド
     cmd = [
@@ -79,8 +132,32 @@ def apply_blur_after_2sec(input_path: Path, output_path: Path, blur_strength: in
         '-crf', '23',
         '-c:a', 'aac',
         '-b:a', '128k',
-        str(output_path)
     ]
+    if threads > 0:
+        # 並列実行時に1プロセスがCPUを占有しないよう制限
+        cmd += ['-threads', str(threads)]
+    cmd.append(str(output_path))
+    return cmd
+
+
+def apply_blur_after_2sec(input_path: Path, output_path: Path, blur_strength: int = 5,
+                          threads: int = 0, engine: str = "concat",
+                          kernel: str = "boxblur") -> bool:
+    """
+    動画の2秒後からブラー処理を適用
+    
+    Args:
+        input_path: 入力動画のパス
+        output_path: 出力動画のパス
+        blur_strength: ブラーの強さ（デフォルト: 5、薄めのブラー）
+        threads: エンコードのスレッド数（0: FFmpegの自動設定）
+        engine: ブラー処理のエンジン（BLUR_ENGINES）
+        kernel: ブラーのカーネル（BLUR_KERNELS）
+    
+    Returns:
+        処理成功時True、失敗時False
+    """
+    cmd = build_blur_command(input_path, output_path, blur_strength, threads, engine, kernel)
     
     try:
         print(f"  処理中: {input_path.name}")
@@ -100,14 +177,237 @@ def apply_blur_after_2sec(input_path: Path, output_path: Path, blur_strength: in
         return False
 
 
-def process_videos(source_folder: str, output_folder_name: str = "blurred") -> None:
+# スマートレンダリングでコピーする区間の最短長（秒）
+# これより短い場合はプロセス起動の手間に見合わないため従来方式で処理する
+SMART_RENDER_MIN_COPY_SECS = 1.0
+
+# 元動画の H.264 プロファイル -> 再エンコード区間に指定する libx264 のプロファイル
+X264_PROFILES = {
+    "Constrained Baseline": "baseline",
+    "Baseline": "baseline",
+    "Main": "main",
+    "High": "high",
+}
+
+# 結合した MP4 は先頭（コピー区間）の avcC しか持たないため、
+# 再エンコード区間もこれらのパラメータが元動画と一致していなければならない
+SMART_RENDER_MATCH_KEYS = ("video_codec", "video_profile", "video_level", "pix_fmt",
+                           "width", "height", "has_b_frames")
+
+
+def find_smart_render_split(info: dict, start: float = BLUR_START_SECS) -> float | None:
+    """
+    コピーで済ませられる区間の終端（ブラー開始以前で最後のキーフレーム）を決定
+    
+    Args:
+        info: media_probe で取得したメタデータ
+        start: ブラーの開始位置（秒）
+    
+    Returns:
+        分割位置（秒）。スマートレンダリングできない場合None
+    """
+    # コピー区間と再エンコード区間を結合するため、同じコーデック・画素形式で、
+    # プロファイル・レベルを libx264 で再現できる必要がある
+    if info.get("video_codec") != "h264" or info.get("pix_fmt") != "yuv420p":
+        return None
+    if info.get("video_profile") not in X264_PROFILES or not info.get("video_level"):
+        return None
+    if info.get("has_b_frames") is None or not info.get("width") or not info.get("height"):
+        return None
+    
+    candidates = [t for t in info.get("keyframes", []) if t <= start]
+    if not candidates or candidates[-1] < SMART_RENDER_MIN_COPY_SECS:
+        return None
+    return candidates[-1]
+
+
+def apply_blur_smart_render(input_path: Path, output_path: Path, blur_strength: int = 5,
+                            threads: int = 0, engine: str = "concat",
+                            kernel: str = "boxblur", info: dict = None) -> bool:
+    """
+    ブラー前の区間をコピーし、ブラーが必要な区間だけを再エンコードする
+    
+    1. 先頭〜分割位置（キーフレーム）を再エンコードせずにコピー
+    2. 分割位置〜末尾をブラー付きでエンコード（元動画と同じプロファイル・レベル）
+    3. 再エンコード区間の符号化パラメータが元動画と一致することを確認
+    4. concat デマルチプレクサで結合し、音声を付け直す
+    
+    結合後の MP4（avc1）は先頭区間の SPS/PPS（avcC）しか持たず、多くのデコーダーや
+    アップロード先は途中の SPS/PPS の変化を無視する。そのため 3. で一致しない場合や、
+    キーフレームの位置が合わない場合などは apply_blur_after_2sec で処理する。
+    
+    Args:
+        info: media_probe で取得したメタデータ（省略時はここで取得）
+    
+    Returns:
+        処理成功時True、失敗時False
+    """
+    if info is None:
+        info = media_probe.run_ffprobe(input_path) or {}
+    split_at = find_smart_render_split(info)
+    
+    if split_at is None:
+        print(f"  スマートレンダリング不可（従来方式で処理）: {input_path.name}")
+        return apply_blur_after_2sec(input_path, output_path, blur_strength,
+                                     threads, engine, kernel)
+    
+    # 再エンコード区間は分割位置を0秒として、元の2秒の位置からブラーをかける
+    filter_complex = build_blur_filter(blur_strength, "timeline", kernel,
+                                       start=BLUR_START_SECS - split_at)
+    thread_args = ['-threads', str(threads)] if threads > 0 else []
+    # 再エンコード区間を元動画と同じプロファイル・レベル・Bフレーム構成にする
+    level = info["video_level"]
+    profile_args = [
+        '-profile:v', X264_PROFILES[info["video_profile"]],
+        '-level:v', f"{level // 10}.{level % 10}",
+    ]
+    if info["has_b_frames"] == 0:
+        profile_args += ['-bf', '0']
+    
+    with tempfile.TemporaryDirectory(dir=output_path.parent) as temp_dir:
+        temp_path = Path(temp_dir)
+        head = temp_path / "head.ts"
+        tail = temp_path / "tail.ts"
+        concat_list = temp_path / "concat.txt"
+        
+        encode_commands = [
+            # 1. ブラー前の区間をコピー（結合用に Annex B の MPEG-TS にする）
+            [
+                'ffmpeg', '-y',
+                '-i', str(input_path),
+                '-t', f"{split_at:.6f}",
+                '-map', '0:v:0',
+                '-c', 'copy',
+                '-bsf:v', 'h264_mp4toannexb',
+                '-f', 'mpegts',
+                str(head)
+            ],
+            # 2. 分割位置（キーフレーム）以降をブラー付きでエンコード
+            [
+                'ffmpeg', '-y',
+                '-ss', f"{split_at:.6f}",
+                '-i', str(input_path),
+                '-filter_complex', filter_complex,
+                '-map', '[outv]',
+                '-c:v', 'libx264',
+                '-preset', 'medium',
+                '-crf', '23',
+                '-pix_fmt', 'yuv420p',
+                *profile_args,
+                *thread_args,
+                '-bsf:v', 'h264_mp4toannexb',
+                '-f', 'mpegts',
+                str(tail)
+            ],
+        ]
+        # 4. 結合して元の音声を付ける
+        concat_command = [
+            'ffmpeg', '-y',
+            '-f', 'concat', '-safe', '0',
+            '-i', str(concat_list),
+            '-i', str(input_path),
+            '-map', '0:v',
+            '-map', '1:a?',
+            '-c:v', 'copy',
+            '-c:a', 'aac',
+            '-b:a', '128k',
+            '-movflags', '+faststart',
+            str(output_path)
+        ]
+        
+        concat_list.write_text(
+            f"file '{head.as_posix()}'\nfile '{tail.as_posix()}'\n", encoding="utf-8"
+        )
+        
+        try:
+            print(f"  処理中（スマートレンダリング: 0〜{split_at:.2f}秒をコピー）: {input_path.name}")
+            for cmd in encode_commands:
+                subprocess.run(
+                    cmd,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                    encoding='utf-8',
+                    errors='replace'
+                )
+            
+            # 3. 再エンコード区間の符号化パラメータを元動画と比較
+            tail_params = media_probe.probe_stream_params(tail) or {}
+            mismatched = [key for key in SMART_RENDER_MATCH_KEYS
+                          if tail_params.get(key) != info.get(key)]
+            if mismatched:
+                detail = ", ".join(f"{key}: {info.get(key)} -> {tail_params.get(key)}"
+                                   for key in mismatched)
+                print(f"  スマートレンダリング不可（符号化パラメータが不一致: {detail}、"
+                      f"従来方式で処理）: {input_path.name}")
+            else:
+                subprocess.run(
+                    concat_command,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                    encoding='utf-8',
+                    errors='replace'
+                )
+                print(f"  ✓ 完了: {output_path.name}")
+                return True
+        except subprocess.CalledProcessError as e:
+            print(f"  ✗ スマートレンダリング失敗（従来方式で再処理）: {input_path.name}")
+            print(f"    詳細: {e.stderr[:500] if e.stderr else 'Unknown error'}")
+    
+    return apply_blur_after_2sec(input_path, output_path, blur_strength,
+                                 threads, engine, kernel)
+
+
+def blur_video_job(video_file: Path, output_file: Path, threads: int = 0,
+                   engine: str = "concat", kernel: str = "boxblur",
+                   smart_render: bool = False, info: dict = None) -> tuple[str, str]:
+    """
+    1本の動画を処理（ワーカープロセスから呼ばれる）
+    
+    Args:
+        info: media_probe で取得したメタデータ（省略時は ffprobe で長さのみ取得）
+    
+    Returns:
+        (結果, 詳細) 結果は "processed" / "skipped" / "error"
+    """
+    # 動画の長さをチェック（2秒未満の場合はスキップ）
+    duration = info["duration"] if info else get_video_duration(video_file)
+    if duration < 2.0:
+        return "skipped", f"2秒未満 ({duration:.2f}秒)"
+    
+    # ブラー処理を適用
+    if smart_render:
+        ok = apply_blur_smart_render(video_file, output_file, threads=threads,
+                                     engine=engine, kernel=kernel, info=info)
+    else:
+        ok = apply_blur_after_2sec(video_file, output_file, threads=threads,
+                                   engine=engine, kernel=kernel)
+    if ok:
+        return "processed", ""
+    return "error", ""
+
+
+def process_videos(source_folder: str, output_folder_name: str = "blurred",
+                   workers: int = 1, threads: int = 0, ordered: bool = False,
+                   engine: str = "concat", kernel: str = "boxblur",
+                   smart_render: bool = False) -> None:
     """
     フォルダ内の全動画にブラー処理を適用
     
     Args:
         source_folder: 元動画が格納されているフォルダのパス
         output_folder_name: 出力フォルダ名（ソースフォルダ内に作成）
+        workers: 同時に実行するエンコード数（1: 逐次処理）
+        threads: 1エンコードあたりのスレッド数（0: FFmpegの自動設定）
+        ordered: True の場合、完了報告を入力順に行う
+        engine: ブラー処理のエンジン（BLUR_ENGINES）
+        kernel: ブラーのカーネル（BLUR_KERNELS）
+        smart_render: ブラー前の区間をコピーし、必要な区間だけ再エンコードする
     """
+    # 設定ミスは処理開始前に検出
+    build_blur_filter(engine=engine, kernel=kernel)
+    
     source_path = Path(source_folder)
     
     if not source_path.exists():
@@ -121,6 +421,8 @@ def process_videos(source_folder: str, output_folder_name: str = "blurred") -> N
     print(f"=== 動画ブラー処理 ===")
     print(f"入力フォルダ: {source_path}")
     print(f"出力フォルダ: {output_path}")
+    if workers > 1:
+        print(f"並列数: {workers} (スレッド数/ジョブ: {threads or '自動'})")
     print()
     
     # 動画ファイルを取得
@@ -133,50 +435,82 @@ def process_videos(source_folder: str, output_folder_name: str = "blurred") -> N
     print(f"検出された動画ファイル数: {len(video_files)}")
     print()
     
-    processed_count = 0
-    skipped_count = 0
-    error_count = 0
+    counts = {"processed": 0, "skipped": 0, "error": 0}
     
+    # 既に処理済みの場合はスキップ
+    jobs = []
     for video_file in video_files:
         output_file = output_path / video_file.name
-        
-        # 既に処理済みの場合はスキップ
         if output_file.exists():
             print(f"  スキップ（処理済み）: {video_file.name}")
-            skipped_count += 1
-            continue
-        
-        # 動画の長さをチェック（2秒未満の場合はスキップ）
-        duration = get_video_duration(video_file)
-        if duration < 2.0:
-            print(f"  スキップ（2秒未満）: {video_file.name} ({duration:.2f}秒)")
-            skipped_count += 1
-            continue
-        
-        # ブラー処理を適用
-        if apply_blur_after_2sec(video_file, output_file):
-            processed_count += 1
+            counts["skipped"] += 1
         else:
-            error_count += 1
+            jobs.append((video_file, output_file))
+    
+    # 未処理の動画のメタデータを一括取得（キャッシュ済みなら ffprobe は起動しない）
+    infos = media_probe.ingest([video_file for video_file, _ in jobs],
+                               workers=max(workers, 4))
+    
+    def report(done: int, video_file: Path, result: str, detail: str):
+        counts[result] += 1
+        if result == "skipped":
+            print(f"  スキップ（{detail}）: {video_file.name}")
+        if workers > 1:
+            print(f"  [{done}/{len(jobs)}] {video_file.name}: {result}")
+    
+    if workers <= 1:
+        for done, (video_file, output_file) in enumerate(jobs, 1):
+            result, detail = blur_video_job(video_file, output_file, threads, engine, kernel,
+                                            smart_render, infos.get(video_file))
+            report(done, video_file, result, detail)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(blur_video_job, video_file, output_file, threads, engine, kernel,
+                                smart_render, infos.get(video_file))
+                for video_file, output_file in jobs
+            ]
+            order = futures if ordered else as_completed(futures)
+            index_of = {future: i for i, future in enumerate(futures)}
+            for done, future in enumerate(order, 1):
+                video_file = jobs[index_of[future]][0]
+                try:
+                    result, detail = future.result()
+                except Exception as e:
+                    result, detail = "error", str(e)
+                    print(f"  ✗ エラー: {video_file.name} ({e})")
+                report(done, video_file, result, detail)
     
     print()
     print(f"=== 処理結果 ===")
-    print(f"処理完了: {processed_count} ファイル")
-    print(f"スキップ: {skipped_count} ファイル")
-    print(f"エラー:   {error_count} ファイル")
+    print(f"処理完了: {counts['processed']} ファイル")
+    print(f"スキップ: {counts['skipped']} ファイル")
+    print(f"エラー:   {counts['error']} ファイル")
 
 
 if __name__ == "__main__":
     # デフォルトのソースフォルダはoriginalsフォルダ
     default_source = Path(__file__).parent / "originals"
     
-    # コマンドライン引数があれば使用
-    if len(sys.argv) > 1:
-        source_folder = sys.argv[1]
-    else:
-        source_folder = str(default_source)
-    
-    # 出力フォルダ名（オプション）
-    output_folder_name = sys.argv[2] if len(sys.argv) > 2 else "blurred"
+    parser = argparse.ArgumentParser(description="動画の2秒後からブラー処理を適用")
+    parser.add_argument("source_folder", nargs="?", default=str(default_source),
+                        help="元動画のフォルダ（デフォルト: originals）")
+    parser.add_argument("output_folder_name", nargs="?", default="blurred",
+                        help="出力フォルダ名（デフォルト: blurred）")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="同時に実行するエンコード数（デフォルト: 1）")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="1エンコードあたりのスレッド数（デフォルト: FFmpegの自動設定）")
+    parser.add_argument("--ordered", action="store_true",
+                        help="完了報告を入力順に行う")
+    parser.add_argument("--engine", choices=BLUR_ENGINES, default="concat",
+                        help="ブラー処理のエンジン（デフォルト: concat）")
+    parser.add_argument("--kernel", choices=BLUR_KERNELS, default="boxblur",
+                        help="ブラーのカーネル（デフォルト: boxblur）")
+    parser.add_argument("--smart-render", action="store_true",
+                        help="ブラー前の区間を再エンコードせずにコピーする")
+    args = parser.parse_args()
     
-    process_videos(source_folder, output_folder_name)
+    process_videos(args.source_folder, args.output_folder_name,
+                   workers=args.workers, threads=args.threads, ordered=args.ordered,
+                   engine=args.engine, kernel=args.kernel, smart_render=args.smart_render)
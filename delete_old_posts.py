@@ -1,17 +1,36 @@
 """
 X (Twitter) の古い投稿を削除するスクリプト
 
-1回の実行につき、「最も古い投稿」を1つ削除します。
-GitHub Actionsで定期実行（5時間に1回程度）されます。
+引数なしで実行すると、「最も古い投稿」を1つ削除します。
+GitHub Actionsではバッチモード（下記）で1日1回実行されます。
 
 変更点 (2025/02/20):
 API検索ではなく、ローカルの tweets.json から最古のデータを取得し、
 削除後に tweets.json を更新する方式に変更しました。
+
+変更点 (2026/10/17):
+削除は tweets.journal への1行の追記で記録し、tweets.json は定期的にまとめて更新します
+（最古の取得は .cache/tweets.db のインデックスで行います。詳細は tweet_manager.py）。
+バッチモードを追加しました。1回の実行で保持ポリシーに該当する投稿をまとめて削除します。
+    python delete_old_posts.py batch
+
+バッチモードの設定（環境変数）:
+- DELETE_MAX_AGE_DAYS: この日数より古い投稿を削除
+- DELETE_KEEP_COUNT: 投稿数がこの件数になるまで古い順に削除
+- DELETE_MAX_PER_RUN: 1回の実行で削除する上限
+  （デフォルト: 保持ポリシーがある場合は50、ない場合は1）
+- DELETE_INTERVAL_SECS: 削除APIの呼び出し間隔（デフォルト: 18秒 = 15分50回の上限に合わせる）
+どちらの保持ポリシーも未設定の場合は、投稿の古さに関係なく古い順に削除します。
+この場合 DELETE_MAX_PER_RUN を明示しなければ、従来どおり1件だけ削除します
+（設定漏れで多数の投稿を消さないため）。
+1件削除するごとに tweets.journal に記録するため、途中で停止しても進捗は失われません。
 """
 
 import os
 import sys
+import time
 import json
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import tweepy
 from dotenv import load_dotenv
@@ -28,6 +47,15 @@ API_SECRET = os.getenv("X_API_SECRET")
 ACCESS_TOKEN = os.getenv("X_ACCESS_TOKEN")
 token_secret = os.getenv("X_ACCESS_TOKEN_SECRET")
 
+# バッチモードの設定
+DELETE_MAX_AGE_DAYS = os.getenv("DELETE_MAX_AGE_DAYS")
+DELETE_KEEP_COUNT = os.getenv("DELETE_KEEP_COUNT")
+DELETE_MAX_PER_RUN = os.getenv("DELETE_MAX_PER_RUN")
+# DELETE_MAX_PER_RUN を指定しない場合の上限（保持ポリシーあり / なし）
+DEFAULT_MAX_PER_RUN = 50
+DEFAULT_MAX_PER_RUN_WITHOUT_POLICY = 1
+DELETE_INTERVAL_SECS = float(os.getenv("DELETE_INTERVAL_SECS", "18"))
+
 if not all([API_KEY, API_SECRET, ACCESS_TOKEN, token_secret]):
     print("エラー: APIキーなどの環境変数が設定されていません。")
     sys.exit(1)
@@ -43,52 +71,145 @@ def get_twitter_client():
     )
     return client
 
-def delete_oldest_tweet():
-    # 1. ローカルDBから最古のツイートを取得
-    oldest_data = tweet_manager.get_oldest_tweet()
-    
-    if not oldest_data:
-        print("tweets.json にデータがありません。削除対象なし。")
-        return
+def delete_tweet_record(client: tweepy.Client, tweet: dict) -> bool:
+    """
+    ツイートをAPIで削除し、成功（または既に存在しない）ならDBからも削除
+
+    Returns:
+        DBから削除した場合True
+
+    Raises:
+        tweepy.TweepyException: 404以外のAPIエラー（403 Forbiddenなど、解決が必要なもの）
+    """
+    tweet_id = tweet["id"]
+    created_at = tweet.get("created_at", "不明")
+    text = tweet.get("text", "")
 
-    tweet_id = oldest_data["id"]
-    created_at = oldest_data.get("created_at", "不明")
-    text = oldest_data.get("text", "")
-    
     print(f"削除対象: ID={tweet_id} (作成日: {created_at})")
     print(f"内容: {text}")
-    
-    # 2. APIで削除実行
-    client = get_twitter_client()
+
     try:
         response = client.delete_tweet(tweet_id)
-        
+
         # dataが存在し、deleted: true なら成功
-        # またはエラーにならず完了した場合も成功とみなす
         if response.data and response.data.get("deleted"):
             print(f"✓ API削除成功: {tweet_id}")
-            # 3. ローカルDBからも削除
+            # ローカルDBからも削除
             tweet_manager.remove_tweet(tweet_id)
-            print(f"✓ tweets.jsonから削除しました（残り: {tweet_manager.get_count()}件）")
-        else:
-            print(f"⚠ APIレスポンス確認: {response}")
-            # delete_tweet は削除成功時に { "deleted": true } を返す
-            if response.data and response.data.get("deleted"):
-                tweet_manager.remove_tweet(tweet_id)
-            else:
-                # 失敗かもしれないが、とりあえずエラーじゃないならスルー？
-                # いや、deleted: false なら失敗
-                pass
-            
+            return True
+
+        # deleted: false なら失敗（DBには残す）
+        print(f"⚠ APIレスポンス確認: {response}")
+        return False
+
     except tweepy.TweepyException as e:
         print(f"✗ API例外発生: {e}")
         # 404 Not FoundならDBから削除（既に消えてる）
         if "404" in str(e) or "Not Found" in str(e):
             print("  -> 既に存在しないため、tweets.jsonから削除します。")
             tweet_manager.remove_tweet(tweet_id)
+            return True
         # 403 Forbidden (権限なし) の場合は消さない（解決が必要）
+        raise
+
+def delete_oldest_tweet():
+    # 1. ローカルDBから最古のツイートを取得
+    oldest_data = tweet_manager.get_oldest_tweet()
+
+    if not oldest_data:
+        print("tweets.json にデータがありません。削除対象なし。")
+        return
+
+    # 2. APIで削除実行（成功すればローカルDBからも削除）
+    client = get_twitter_client()
+    try:
+        if delete_tweet_record(client, oldest_data):
+            print(f"✓ tweets.jsonから削除しました（残り: {tweet_manager.get_count()}件）")
+    except tweepy.TweepyException:
+        sys.exit(1)
+
+def count_deletion_targets(max_age_days: float | None, keep_count: int | None) -> int:
+    """保持ポリシーに該当する（古い順に削除すべき）投稿数を計算"""
+    total = tweet_manager.get_count()
+
+    if max_age_days is None and keep_count is None:
+        return total
+
+    targets = 0
+    if max_age_days is not None:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+        targets = tweet_manager.count_older_than(int(cutoff.timestamp()))
+    if keep_count is not None:
+        targets = max(targets, total - keep_count)
+
+    return max(0, targets)
+
+def delete_old_tweets_batch(max_age_days: float | None = None,
+                            keep_count: int | None = None,
+                            max_per_run: int | None = None,
+                            interval_secs: float = DELETE_INTERVAL_SECS):
+    """
+    保持ポリシーに該当する投稿を古い順にまとめて削除
+
+    Args:
+        max_age_days: この日数より古い投稿を削除
+        keep_count: 投稿数がこの件数になるまで削除
+        max_per_run: 1回の実行で削除する上限
+            （None の場合、保持ポリシーがあれば DEFAULT_MAX_PER_RUN、なければ1件）
+        interval_secs: 削除APIの呼び出し間隔（レート制限対策）
+    """
+    if max_per_run is None:
+        if max_age_days is None and keep_count is None:
+            max_per_run = DEFAULT_MAX_PER_RUN_WITHOUT_POLICY
         else:
+            max_per_run = DEFAULT_MAX_PER_RUN
+    
+    targets = min(count_deletion_targets(max_age_days, keep_count), max_per_run)
+
+    print("=== バッチ削除 ===")
+    print(f"保持ポリシー: 日数={max_age_days if max_age_days is not None else '-'}, "
+          f"保持件数={keep_count if keep_count is not None else '-'}")
+    print(f"削除対象: {targets}件（上限 {max_per_run}件）\n")
+
+    if targets == 0:
+        print("削除対象なし。")
+        return
+
+    client = get_twitter_client()
+    deleted_count = 0
+    failed_count = 0
+    last_call = None
+
+    for tweet in tweet_manager.get_oldest_tweets(targets):
+        # 削除APIのレート制限に合わせて間隔を空ける
+        if last_call is not None:
+            wait_secs = interval_secs - (time.monotonic() - last_call)
+            if wait_secs > 0:
+                time.sleep(wait_secs)
+        last_call = time.monotonic()
+
+        try:
+            if delete_tweet_record(client, tweet):
+                deleted_count += 1
+            else:
+                failed_count += 1
+        except tweepy.TweepyException:
+            # 解決が必要なエラーは中断（削除済みの分はDBに反映済み）
+            print(f"\n中断: 削除済み {deleted_count}件（残り: {tweet_manager.get_count()}件）")
             sys.exit(1)
+        print()
+
+    print("=== 処理結果 ===")
+    print(f"削除完了: {deleted_count} 件")
+    print(f"失敗:     {failed_count} 件")
+    print(f"残り:     {tweet_manager.get_count()} 件")
 
 if __name__ == "__main__":
-    delete_oldest_tweet()
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        delete_old_tweets_batch(
+            max_age_days=float(DELETE_MAX_AGE_DAYS) if DELETE_MAX_AGE_DAYS else None,
+            keep_count=int(DELETE_KEEP_COUNT) if DELETE_KEEP_COUNT else None,
+            max_per_run=int(DELETE_MAX_PER_RUN) if DELETE_MAX_PER_RUN else None,
+        )
+    else:
+        delete_oldest_tweet()
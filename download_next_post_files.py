@@ -2,141 +2,461 @@ import os
 import json
 import re
 import sys
-import requests
 import codecs
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import gdown
 from dotenv import load_dotenv
+from PIL import Image
 
-def get_folder_files_public(folder_id):
+import durable_io
+import http_client
+import media_probe
+import pair_catalog
+import post_status
+import prefetch_queue
+from extract_thumbnails import THUMBNAIL_SUFFIXES
+
+# ダウンロードの再試行回数（整合性チェックに失敗した場合も含む）
+DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "3"))
+# フォルダ一覧のキャッシュ（GitHub Actions では actions/cache で実行間に引き継ぐ）
+DRIVE_INDEX_FILE = Path(os.getenv("DRIVE_INDEX_FILE", Path(__file__).parent / ".cache" / "drive_index.json"))
+DRIVE_INDEX_VERSION = 1
+
+# 単一パスのフォルダHTMLパーサー
+# 以下のパターンを1つの正規表現にまとめ、HTMLを先頭から1回だけ走査する
+# - entry:  flip-entry（埋め込みビューのHTML）: id="entry-ID" ... class="flip-entry-title">名前</div>
+# - pair:   JSONデータ内の ["ID","名前"
+# - name:   拡張子で終わる文字列（直前500文字以内の最後のIDと対応付ける。pair の名前も対象）
+# - id:     ID らしい文字列（name の対応付け用に位置を覚えておく）
+FOLDER_ENTRY_RE = re.compile(
+    r'id="entry-(?P<entry_id>[a-zA-Z0-9_-]+)"[^>]*>.*?class="flip-entry-title">(?P<entry_name>[^<]+)</div>'
+    r'|\["(?P<pair_id>[a-zA-Z0-9_-]{20,})","(?P<pair_name>[^"]+)"'
+    r'|"(?P<name>[^"]+\.(?:png|jpg|webp|mp4))"'
+    r'|["\'](?P<id>[a-zA-Z0-9_-]{25,})["\']',
+    re.DOTALL
+)
+MEDIA_EXTENSIONS = ('.png', '.mp4', '.mov', '.jpg', '.webp')
+NAME_EXTENSIONS = ('.png', '.jpg', '.webp', '.mp4')
+PAIR_NOISE = ('drive_2020q4', 'branding', 'product', 'logo', 'favicon')
+NAME_NOISE = ('drive_2020q4', 'branding', 'product')
+# name と対応付ける ID の探索範囲（文字数）
+ID_LOOKBEHIND = 500
+
+def parse_folder_html(html):
     """
-    公開フォルダのHTMLをパースしてファイル名とIDのリストを取得する
+    公開フォルダのHTMLからファイル名とIDを抽出（1回の走査）
+    
+    同じ名前が複数見つかった場合は entry > pair > name の優先度で採用する。
+    
+    Returns:
+        {名前: ID}
+    """
+    items = {}
+    priorities = {}
+    last_id, last_id_pos = None, -1
+    
+    def add(name, file_id, priority):
+        # entry / pair は後に見つかったものを、name は最初に見つかったものを採用
+        current = priorities.get(name, -1)
+        if priority > current or (priority == current and priority > 0):
+            items[name] = file_id
+            priorities[name] = priority
+    
+    def add_name(name, pos):
+        if any(noise in name.lower() for noise in NAME_NOISE):
+            return
+        if last_id and last_id_pos >= pos - ID_LOOKBEHIND:
+            add(name, last_id, 0)
+    
+    for m in FOLDER_ENTRY_RE.finditer(html):
+        kind = m.lastgroup
+        if kind == "entry_name":
+            name = m.group("entry_name")
+            if any(ext in name.lower() for ext in MEDIA_EXTENSIONS):
+                add(name, m.group("entry_id"), 2)
+        elif kind == "pair_name":
+            file_id, name = m.group("pair_id"), m.group("pair_name")
+            if len(file_id) >= 25:
+                last_id, last_id_pos = file_id, m.start("pair_id") - 1
+            if name.endswith(NAME_EXTENSIONS):
+                add_name(name, m.start("pair_name") - 1)
+            name_lower = name.lower()
+            if any(noise in name_lower for noise in PAIR_NOISE):
+                continue
+            if any(ext in name_lower for ext in MEDIA_EXTENSIONS) and not name.startswith('http'):
+                try: name = codecs.decode(name, 'unicode_escape')
+                except: pass
+                if len(name) > 3:
+                    add(name, file_id, 1)
+        elif kind == "name":
+            add_name(m.group("name"), m.start())
+        else:
+            last_id, last_id_pos = m.group("id"), m.start()
+    
+    return items
+
+def load_drive_index():
+    """フォルダ一覧のキャッシュを読み込み"""
+    try:
+        with open(DRIVE_INDEX_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(index, dict) or index.get("version") != DRIVE_INDEX_VERSION:
+        return {}
+    return index.get("urls", {})
+
+def save_drive_index(urls):
+    """フォルダ一覧のキャッシュを保存"""
+    DRIVE_INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    durable_io.write_json(DRIVE_INDEX_FILE, {"version": DRIVE_INDEX_VERSION, "urls": urls})
+
+def fetch_folder_html(url, cached=None):
+    """
+    公開フォルダのHTMLを取得（キャッシュの ETag / Last-Modified で条件付きリクエスト）
+    
+    Returns:
+        (HTML, 検証用ヘッダー)。変更がない場合（304）はHTMLがNone
     """
-    urls = [
+    print(f"フォルダ情報を取得中: {url}")
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/95.0.4638.69 Safari/537.36'
+    }
+    if cached:
+        if cached.get("etag"):
+            headers['If-None-Match'] = cached["etag"]
+        if cached.get("last_modified"):
+            headers['If-Modified-Since'] = cached["last_modified"]
+    
+    response = http_client.get(url, timeout=15, headers=headers)
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    if response.status_code == 304:
+        return None, validators
+    response.raise_for_status()
+    return response.text, validators
+
+def folder_urls(folder_id):
+    """公開フォルダの一覧を取得するURL（優先順）"""
+    return [
         f"https://drive.google.com/embeddedfolderview?id={folder_id}",
         f"https://drive.google.com/drive/folders/{folder_id}"
     ]
+
+def get_folder_files_public(folder_id, index=None):
+    """
+    公開フォルダのHTMLをパースしてファイル名とIDのリストを取得する
+    
+    Args:
+        folder_id: フォルダID
+        index: フォルダ一覧のキャッシュ（load_drive_index の結果、URLごとに更新される）
+            HTMLが前回から変わっていなければ（304 または内容が同じ）パースを省略し、
+            変わっていれば差分（追加・削除）をキャッシュに反映する
+    """
+    if index is None:
+        index = {}
     
-    items_dict = {} # 名前をキーにして重複を防ぐ
-    for url in urls:
+    # 優先順に取得し、取得に失敗したかファイルが見つからなかった場合のみ次のURLを取得する
+    items_dict = {}
+    for url in folder_urls(folder_id):
         try:
-            print(f"フォルダ情報を取得中: {url}")
-            response = requests.get(url, timeout=15, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/95.0.4638.69 Safari/537.36'
-            })
-            response.raise_for_status()
-            html = response.text
+            html, validators = fetch_folder_html(url, index.get(url))
+            cached = index.get(url, {})
+            
+            digest = hashlib.sha256(html.encode("utf-8")).hexdigest() if html is not None else None
+            if html is None or digest == cached.get("sha256"):
+                # 前回から変更なし（新しい ETag / Last-Modified は次回の条件付きリクエスト用に保存）
+                items_dict = dict(cached.get("entries", {}))
+                if html is not None:
+                    index[url] = {**cached, **validators}
+                print(f"  -> 変更なし（キャッシュを使用）: {len(items_dict)} 個のファイル")
+            else:
+                items_dict = parse_folder_html(html)
+                old = cached.get("entries", {})
+                added = len(items_dict.keys() - old.keys())
+                removed = len(old.keys() - items_dict.keys())
+                if old:
+                    print(f"  -> 差分: 追加 {added}件, 削除 {removed}件")
+                index[url] = {**validators, "sha256": digest, "entries": items_dict}
             
-            # --- 抽出パターン1: ["ID", "名前"] ---
-            matches = re.findall(r'\["([a-zA-Z0-9_-]{20,})","([^"]+)"', html)
-            for file_id, name in matches:
-                name_lower = name.lower()
-                if any(noise in name_lower for noise in ['drive_2020q4', 'branding', 'product', 'logo', 'favicon']):
-                    continue
-                if any(ext in name_lower for ext in ['.png', '.mp4', '.mov', '.jpg']):
-                    if not name.startswith('http') and '.' not in file_id:
-                        try: name = codecs.decode(name, 'unicode_escape')
-                        except: pass
-                        if len(name) > 3:
-                            items_dict[name] = {"id": file_id, "name": name}
-
-            # --- 抽出パターン2: flip-entry (HTML直接パース) ---
-            # id="entry-XXXX" ... >TITLE</div>
-            entry_matches = re.finditer(r'id="entry-([a-zA-Z0-9_-]+)"[^>]*>.*?class="flip-entry-title">([^<]+)</div>', html, re.DOTALL)
-            for m in entry_matches:
-                file_id, name = m.group(1), m.group(2)
-                if any(ext in name.lower() for ext in ['.png', '.mp4', '.mov', '.jpg']):
-                    items_dict[name] = {"id": file_id, "name": name}
-
-            # --- 抽出パターン3: 拡張子から遡ってIDを探す ---
-            for ext in ['.png', '.mp4']:
-                raw_matches = re.finditer(r'"([^"]+' + re.escape(ext) + r')"', html)
-                for m in raw_matches:
-                    name = m.group(1)
-                    if any(noise in name.lower() for noise in ['drive_2020q4', 'branding', 'product']):
-                        continue
-                    start_pos = max(0, m.start() - 500)
-                    chunk = html[start_pos : m.start()]
-                    id_matches = re.findall(r'["\']([a-zA-Z0-9_-]{25,})["\']', chunk)
-                    if id_matches:
-                        file_id = id_matches[-1]
-                        if name not in items_dict:
-                            items_dict[name] = {"id": file_id, "name": name}
-
             if items_dict:
                 print(f"  -> {len(items_dict)} 個のファイルを発見しました")
                 break
-            else:
+            elif html is not None:
                 # 何も見つからない場合のみHTMLの断片を表示
                 print(f"  HTML スニペット (1000文字): {html[:1000]}")
                 
         except Exception as e:
             print(f"警告: {url} からの取得に失敗しました: {e}")
             
-    return list(items_dict.values())
+    return [{"id": file_id, "name": name} for name, file_id in items_dict.items()]
 
-def download_file(file_id, output_path):
-    """gdownを使用して特定のファイルをダウンロード"""
-    url = f"https://drive.google.com/uc?id={file_id}"
-    print(f"ダウンロード開始: {output_path}")
-    gdown.download(url, str(output_path), quiet=False)
-
-def main():
-    # .envがあれば読み込む（ローカルテスト用）
-    load_dotenv()
+def verify_download(path):
+    """
+    ダウンロードしたファイルの整合性を確認
     
-    # 1. ステータスを読み込んで次回の投稿対象を特定
-    status_file = Path("post_status.json")
-    if not status_file.exists():
-        print("エラー: post_status.json が見つかりません。")
-        sys.exit(1)
-        
-    with open(status_file, "r", encoding="utf-8") as f:
-        status = json.load(f)
+    Returns:
+        問題がなければNone、問題があればその内容
+    """
+    if not path.exists() or path.stat().st_size == 0:
+        return "ファイルが空です"
     
-    thumbnails_folder_id = os.getenv("GDRIVE_THUMBNAILS_FOLDER_ID")
-    originals_folder_id = os.getenv("GDRIVE_ORIGINALS_FOLDER_ID")
+    with open(path, "rb") as f:
+        head = f.read(512)
     
-    if not thumbnails_folder_id or not originals_folder_id:
-        print("エラー: 環境変数 GDRIVE_THUMBNAILS_FOLDER_ID または GDRIVE_ORIGINALS_FOLDER_ID が設定されていません。")
-        sys.exit(1)
-        
-    print("Google Drive からファイルリストを取得中...")
-    thumbnail_files = get_folder_files_public(thumbnails_folder_id)
-    originals_files = get_folder_files_public(originals_folder_id)
+    # 共有設定やダウンロード上限のエラーページ（HTML）が保存されていないか
+    if head.lstrip()[:15].lower().startswith((b"<!doctype html", b"<html")):
+        return "HTMLページがダウンロードされました（共有設定またはダウンロード上限を確認してください）"
     
-    print(f"サムネイル候補: {len(thumbnail_files)}件, 動画候補: {len(originals_files)}件")
+    suffix = path.suffix.lower()
+    if suffix in THUMBNAIL_SUFFIXES:
+        try:
+            with Image.open(path) as img:
+                img.verify()
+        except Exception as e:
+            return f"画像として読み込めません: {e}"
+    elif suffix in (".mp4", ".mov"):
+        # MP4/MOV は先頭に ftyp ボックスがある
+        if head[4:8] != b"ftyp":
+            return "動画ファイルの形式が不正です"
+    
+    return None
+
+def download_file(file_id, output_path):
+    """
+    gdownを使用して特定のファイルをダウンロード
     
-    # デバッグ: 取得できたファイル名をいくつか表示
-    if thumbnail_files:
-        print(f"サムネイル例: {[f['name'] for f in thumbnail_files[:5]]}")
-    if originals_files:
-        print(f"動画例: {[f['name'] for f in originals_files[:5]]}")
+    途中まで受信したデータは gdown の一時ファイルに残り、再試行時は
+    Range リクエストで続きから再開する。ダウンロード後に整合性を確認し、
+    不正なファイルは削除して最初から取得し直す。
     
-    # フォルダ作成（常に作成しておくことで後続のエラーを防ぐ）
-    Path("thumbnails").mkdir(exist_ok=True)
-    Path("originals").mkdir(exist_ok=True)
+    Raises:
+        RuntimeError: 再試行しても正しいファイルを取得できない場合
+    """
+    url = f"https://drive.google.com/uc?id={file_id}"
     
-    # 投稿済みの名前セット
-    posted_names = set(status.get("posted", []))
+    # 前回までに保存された不正なファイルは再開の対象にしない
+    if output_path.exists() and verify_download(output_path):
+        output_path.unlink()
+    
+    last_error = None
+    for attempt in range(1, DOWNLOAD_RETRIES + 1):
+        start = time.monotonic()
+        print(f"ダウンロード開始: {output_path}" + (f"（再試行 {attempt - 1}）" if attempt > 1 else ""))
+        try:
+            # 並列ダウンロード中は進捗バーが混ざるため quiet にする
+            gdown.download(url, str(output_path), quiet=True, resume=True)
+        except Exception as e:
+            last_error = str(e)
+            print(f"  ⚠ {output_path.name}: {e}")
+            time.sleep(min(2 ** attempt, 10))
+            continue
+        
+        last_error = verify_download(output_path)
+        if last_error is None:
+            size_mb = output_path.stat().st_size / 1024 / 1024
+            print(f"  ✓ {output_path.name}: {size_mb:.1f}MB ({time.monotonic() - start:.1f}秒)")
+            return
+        
+        print(f"  ⚠ {output_path.name}: {last_error}")
+        output_path.unlink(missing_ok=True)
     
-    # ペアを組む
+    raise RuntimeError(f"{output_path.name} のダウンロードに失敗しました: {last_error}")
+
+def build_drive_pairs(thumbnail_files, originals_files):
+    """
+    フォルダ一覧からサムネイルと動画のペアを組む
+    
+    Returns:
+        ペアのリスト（name, thumb_id, thumb_suffix, video_id）
+    """
     pairs = []
     originals_map = {Path(f["name"]).stem: f["id"] for f in originals_files if f["name"].endswith(".mp4")}
     
     for thumb in thumbnail_files:
-        if not thumb["name"].endswith(".png"):
+        suffix = Path(thumb["name"]).suffix.lower()
+        if suffix not in THUMBNAIL_SUFFIXES:
             continue
         name = Path(thumb["name"]).stem
-        if name in originals_map and name not in posted_names:
+        if name in originals_map:
             pairs.append({
                 "name": name,
                 "thumb_id": thumb["id"],
+                "thumb_suffix": suffix,
                 "video_id": originals_map[name]
             })
+    return pairs
+
+def sync_drive_catalog(thumbnails_folder_id, originals_folder_id, posted_names):
+    """
+    Google Drive のフォルダ一覧をペアカタログに反映
+    
+    フォルダ一覧の内容（HTMLのハッシュ）が前回から変わっていなければ、
+    ペアを組み直さずに前回のカタログをそのまま使う。
+    
+    Args:
+        posted_names: 投稿済みの名前（post_status.json の posted、投稿順）
+    
+    Returns:
+        カタログのソース名
+    """
+    print("Google Drive からファイルリストを取得中...")
+    # サムネイルと動画のフォルダは同時に取得（前回の一覧から変わっていなければパースを省略）
+    drive_index = load_drive_index()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        thumbnail_future = executor.submit(get_folder_files_public, thumbnails_folder_id, drive_index)
+        originals_future = executor.submit(get_folder_files_public, originals_folder_id, drive_index)
+    thumbnail_files = thumbnail_future.result()
+    originals_files = originals_future.result()
+    try:
+        save_drive_index(drive_index)
+    except OSError as e:
+        print(f"警告: フォルダ一覧のキャッシュの保存に失敗しました: {e}")
+    
+    print(f"サムネイル候補: {len(thumbnail_files)}件, 動画候補: {len(originals_files)}件")
+    
+    source = f"drive:{thumbnails_folder_id}:{originals_folder_id}"
+    fingerprint = ":".join(
+        drive_index.get(url, {}).get("sha256") or "-"
+        for url in folder_urls(thumbnails_folder_id) + folder_urls(originals_folder_id)
+    )
+    if pair_catalog.needs_refresh(source, fingerprint):
+        # デバッグ: 取得できたファイル名をいくつか表示
+        if thumbnail_files:
+            print(f"サムネイル例: {[f['name'] for f in thumbnail_files[:5]]}")
+        if originals_files:
+            print(f"動画例: {[f['name'] for f in originals_files[:5]]}")
+        
+        added, removed = pair_catalog.replace_pairs(
+            source, build_drive_pairs(thumbnail_files, originals_files), fingerprint
+        )
+        print(f"ペアカタログを更新: 追加 {added}件, 削除 {removed}件")
+    
+    pair_catalog.sync_posted(list(posted_names))
+    return source
+
+def list_drive_pairs(thumbnails_folder_id, originals_folder_id, posted_names, limit=1, exclude=()):
+    """
+    Google Drive のフォルダ一覧から未投稿のペアを名前順に limit 件取得
+    
+    Args:
+        posted_names: 投稿済みの名前（post_status.json の posted、投稿順）
+        exclude: 除外する名前（先読み済みのものなど）
+    
+    Returns:
+        ペアのリスト（name, thumb_id, thumb_suffix, video_id）
+    """
+    source = sync_drive_catalog(thumbnails_folder_id, originals_folder_id, posted_names)
+    return pair_catalog.next_pending(source, limit, exclude=set(exclude))
+
+def download_pair(pair, thumbnail_dir, video_dir):
+    """
+    ペアのサムネイルと動画を同時にダウンロード
+    
+    Returns:
+        (サムネイルのパス, 動画のパス)
+    """
+    thumbnail_path = thumbnail_dir / f"{pair['name']}{pair['thumb_suffix']}"
+    video_path = video_dir / f"{pair['name']}.mp4"
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(download_file, pair["thumb_id"], thumbnail_path),
+            executor.submit(download_file, pair["video_id"], video_path),
+        ]
+    for future in futures:
+        future.result()
+    return thumbnail_path, video_path
+
+def load_status_file():
+    """投稿ステータスを読み込み（存在しない場合は終了）"""
+    if not post_status.exists():
+        print(f"エラー: {post_status.STATUS_FILE.name} が見つかりません。")
+        sys.exit(1)
+    return post_status.load_status()
+
+def get_folder_ids():
+    """Google Drive のフォルダIDを環境変数から取得（未設定の場合は終了）"""
+    thumbnails_folder_id = os.getenv("GDRIVE_THUMBNAILS_FOLDER_ID")
+    originals_folder_id = os.getenv("GDRIVE_ORIGINALS_FOLDER_ID")
+    
+    if not thumbnails_folder_id or not originals_folder_id:
+        print("エラー: 環境変数 GDRIVE_THUMBNAILS_FOLDER_ID または GDRIVE_ORIGINALS_FOLDER_ID が設定されていません。")
+        sys.exit(1)
+    return thumbnails_folder_id, originals_folder_id
+
+def prefetch(count=prefetch_queue.PREFETCH_COUNT, posted_names=None):
+    """
+    次に投稿する count セットを先読みキューにダウンロード
+    
+    キューに既に count セット以上揃っている場合は Google Drive にアクセスしない。
+    
+    Args:
+        count: キューに揃えておくセット数
+        posted_names: 投稿済みの名前（投稿順、None の場合は post_status.json から読み込み）
+    
+    Returns:
+        キューに揃っているセット数
+    """
+    if posted_names is None:
+        posted_names = load_status_file().get("posted", [])
+    
+    ready = prefetch_queue.prune(set(posted_names))
+    print(f"=== 先読みキュー: {len(ready)}/{count} セット準備済み ===")
+    if len(ready) >= count:
+        return len(ready)
+    
+    thumbnails_folder_id, originals_folder_id = get_folder_ids()
+    queued = {item["name"] for item in ready}
+    pairs = list_drive_pairs(thumbnails_folder_id, originals_folder_id, posted_names,
+                             limit=count - len(ready), exclude=queued)
+    
+    for pair in pairs:
+        print(f"\n先読み: {pair['name']}")
+        pair_dir = prefetch_queue.item_dir(pair["name"])
+        pair_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            thumbnail_path, video_path = download_pair(pair, pair_dir, pair_dir)
+        except Exception as e:
+            # 取得できなかったペアは飛ばす（途中まで受信したデータは次回に再開）
+            print(f"  ⚠ 先読み失敗: {pair['name']}: {e}")
+            continue
+        
+        # 動画のメタデータも取得しておく（ffprobe がない環境ではNone）
+        metadata = media_probe.get_media_info(video_path)
+        prefetch_queue.add(pair["name"], thumbnail_path, video_path, metadata)
+        ready.append(pair)
     
-    # 名前でソート（一貫性のため）
-    pairs.sort(key=lambda x: x["name"])
+    print(f"\n先読みキュー: {len(ready)}/{count} セット準備済み")
+    return len(ready)
+
+def main():
+    # .envがあれば読み込む（ローカルテスト用）
+    load_dotenv()
+    
+    # 先読みモード: python download_next_post_files.py prefetch [セット数]
+    if len(sys.argv) > 1 and sys.argv[1] == "prefetch":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else prefetch_queue.PREFETCH_COUNT
+        if prefetch(count) == 0:
+            print("次に投稿可能な新しいペアが見つかりませんでした。")
+        return
+    
+    # 1. ステータスを読み込んで次回の投稿対象を特定
+    status = load_status_file()
+    thumbnails_folder_id, originals_folder_id = get_folder_ids()
+    
+    # 投稿済みの名前（投稿順）
+    posted_names = status.get("posted", [])
+    
+    pairs = list_drive_pairs(thumbnails_folder_id, originals_folder_id, posted_names)
+    
+    # フォルダ作成（常に作成しておくことで後続のエラーを防ぐ）
+    Path("thumbnails").mkdir(exist_ok=True)
+    Path("originals").mkdir(exist_ok=True)
     
     if not pairs:
         print("次に投稿可能な新しいペアが見つかりませんでした。")
@@ -146,14 +466,9 @@ def main():
     next_pair = pairs[0]
     print(f"\n次の投稿対象: {next_pair['name']}")
     
-    # フォルダ作成
-    Path("thumbnails").mkdir(exist_ok=True)
-    Path("originals").mkdir(exist_ok=True)
-    
-    # ダウンロード実行
+    # ダウンロード実行（サムネイルと動画を同時に取得）
     try:
-        download_file(next_pair["thumb_id"], Path("thumbnails") / f"{next_pair['name']}.png")
-        download_file(next_pair["video_id"], Path("originals") / f"{next_pair['name']}.mp4")
+        download_pair(next_pair, Path("thumbnails"), Path("originals"))
         print("\n必要なファイルのダウンロードが完了しました。")
     except Exception as e:
         print(f"\nダウンロード中にエラーが発生しました: {e}")
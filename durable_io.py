@@ -0,0 +1,155 @@
+"""
+クラッシュに強いファイル書き込みモジュール
+
+ファイルを直接 "w" で開いて書き込むと、途中でプロセスが止まった場合に
+中身が途中までのファイルが残る。このモジュールでは次の手順で書き込む:
+
+1. 同じフォルダの一時ファイルに書き込んで fsync（権限は今のファイルにそろえる）
+2. （keep_previous の場合）今のファイルを前世代 (<名前>.prev) として残す
+3. 一時ファイルを本来の名前に置き換え (os.replace)、フォルダを fsync
+
+置き換えはアトミックなため、読み込み側からは常に古い内容か新しい内容の
+どちらかが完全な形で見える。
+
+読み込み時に内容が壊れていた場合は、read_json で前世代から復旧できる。
+"""
+
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+from pathlib import Path
+
+PREVIOUS_SUFFIX = ".prev"
+
+# 新規ファイルの権限に適用する umask（os.umask は読み取りだけでも値を書き換えるため、
+# スレッドから書き込む前に読み込み時に1回だけ取得する）
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class CorruptFileError(Exception):
+    """ファイルも前世代も読み込めない（空のデータで上書きしないよう処理を止める）"""
+
+
+def previous_path(path: Path) -> Path:
+    """前世代のファイルのパス"""
+    return path.with_name(path.name + PREVIOUS_SUFFIX)
+
+
+def fsync_dir(folder: Path):
+    """フォルダのエントリ（ファイル名の変更）をディスクに反映"""
+    if sys.platform == "win32":
+        return
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _keep_previous(path: Path):
+    """今のファイルを前世代として残す（本来のファイルは置き換えまで残したまま）"""
+    prev = previous_path(path)
+    temp_prev = prev.with_name(prev.name + ".tmp")
+    temp_prev.unlink(missing_ok=True)
+    try:
+        os.link(path, temp_prev)
+    except OSError:
+        shutil.copy2(path, temp_prev)
+    os.replace(temp_prev, prev)
+
+
+def _target_mode(path: Path) -> int:
+    """置き換え後のファイルの権限（既存ファイルの権限、新規の場合は umask を適用した 0o666）"""
+    try:
+        return stat.S_IMODE(path.stat().st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def write_bytes(path: Path, data: bytes, keep_previous: bool = False):
+    """
+    ファイルをアトミックに書き込み
+
+    Args:
+        path: 書き込み先
+        data: 書き込む内容
+        keep_previous: 今のファイルを前世代 (<名前>.prev) として残すか
+    """
+    path = Path(path)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp の一時ファイルは 0600 のため、通常の書き込みと同じ権限にそろえる
+        os.chmod(temp_name, _target_mode(path))
+        if keep_previous and path.exists():
+            _keep_previous(path)
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+    fsync_dir(path.parent)
+
+
+def write_text(path: Path, text: str, keep_previous: bool = False):
+    """テキストファイルをアトミックに書き込み（UTF-8）"""
+    write_bytes(path, text.encode("utf-8"), keep_previous=keep_previous)
+
+
+def write_json(path: Path, obj, keep_previous: bool = False, **dump_kwargs):
+    """JSONファイルをアトミックに書き込み（dump_kwargs は json.dumps に渡す）"""
+    dump_kwargs.setdefault("ensure_ascii", False)
+    write_text(path, json.dumps(obj, **dump_kwargs), keep_previous=keep_previous)
+
+
+def append_line(path: Path, line: str):
+    """
+    ファイルの末尾に1行追記して fsync
+
+    前回の追記が行の途中で止まっていた場合は改行してから追記する
+    （書きかけの行と新しい行がつながらないようにする）。
+    """
+    data = line.rstrip("\n") + "\n"
+    with open(path, "ab+") as f:
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                data = "\n" + data
+        f.write(data.encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_json(path: Path, default=None):
+    """
+    JSONファイルを読み込み（壊れている場合は前世代から復旧）
+
+    Returns:
+        読み込んだ内容。ファイルも前世代も存在しない場合は default
+
+    Raises:
+        CorruptFileError: ファイルが壊れていて、前世代からも復旧できない場合
+    """
+    path = Path(path)
+    candidates = [p for p in (path, previous_path(path)) if p.exists()]
+    if not candidates:
+        return default
+
+    for candidate in candidates:
+        try:
+            with open(candidate, "r", encoding="utf-8") as f:
+                obj = json.load(f)
+        except (ValueError, UnicodeDecodeError) as e:
+            print(f"警告: {candidate.name} が壊れています: {e}")
+            continue
+        if candidate != path:
+            print(f"警告: 前世代 {candidate.name} から復旧しました")
+        return obj
+
+    raise CorruptFileError(f"{path.name} を読み込めません（前世代からも復旧できません）")
@@ -6,15 +6,66 @@
 
 機能:
 - 元動画はそのまま保持
-- 処理済みファイルはスキップ
-- FFmpegを使用して最初のフレームを抽出
+- 処理済みファイルはスキップ（元動画の内容が変わった場合は再抽出）
+- 同じ内容の動画は抽出済みの画像を再利用
+- FFmpegを使用して最初のフレームを抽出（複数ファイルを並列処理可能）
+- 出力形式を選択可能（最適化PNG / 高画質JPEG / WebP）
+- 投稿先の画像サイズ上限に収まるように品質を自動調整（JPEG / WebP）
+
+処理済みの判定は、.cache/thumbnail_index/ に出力フォルダごとに記録した
+元動画の内容ハッシュ (SHA-256) で行います（出力フォルダは Google Drive の
+公開フォルダと同期するため、インデックスはフォルダ内には書きません）。
+
+設定（環境変数）:
+- THUMBNAIL_INDEX_DIR: インデックスの保存先（デフォルト: スクリプトと同じフォルダの .cache/thumbnail_index）
+いずれかの形式のサムネイルが既にある動画は、形式が異なっても処理済みとみなします。
+
+使い方:
+    python extract_thumbnails.py [ソースフォルダ] [出力フォルダ名] [--workers N]
+                                 [--format {png,jpeg,webp}] [--platforms x instagram ...]
+                                 [--max-bytes N]
+
+注意: Instagram は WebP に対応していないため、Instagramに投稿する場合は png か jpeg を使用してください。
 """
 
+import argparse
+import io
+import json
 import os
+import shutil
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+from PIL import Image
+
+import durable_io
+import media_probe
+
+# 抽出結果のインデックスの保存先（出力フォルダごとに1ファイル）
+INDEX_DIR = Path(os.getenv("THUMBNAIL_INDEX_DIR", Path(__file__).parent / ".cache" / "thumbnail_index"))
+
+# 以前の保存先（出力フォルダ内、保存時に削除する）
+LEGACY_INDEX_FILE_NAME = ".thumbnail_index.json"
+
+# 出力形式と拡張子
+THUMBNAIL_FORMATS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+
+# サムネイルとして扱う拡張子（post_to_x.py / download_next_post_files.py と共有）
+THUMBNAIL_SUFFIXES = (".png", ".jpg", ".jpeg", ".webp")
+
+# 投稿先ごとの画像サイズ上限（バイト）
+PLATFORM_BYTE_BUDGETS = {
+    "x": 5 * 1024 * 1024,          # X の画像アップロード上限
+    "instagram": 8 * 1024 * 1024,  # Instagram Graph API の画像上限
+    "threads": 8 * 1024 * 1024,    # Threads API の画像上限
+}
+
+# JPEG / WebP の品質の探索範囲（Pillow の quality）
+QUALITY_MAX = 95
+QUALITY_MIN = 40
+
 
 def get_video_files(folder_path: Path) -> list[Path]:
     """動画ファイルの一覧を取得"""
@@ -28,26 +79,155 @@ def get_video_files(folder_path: Path) -> list[Path]:
     return video_files
 
 
-def extract_first_frame(input_path: Path, output_path: Path) -> bool:
+def find_thumbnail(folder: Path, stem: str) -> Path | None:
+    """いずれかの形式で保存されたサムネイルを探す"""
+    for suffix in THUMBNAIL_SUFFIXES:
+        path = folder / f"{stem}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def resolve_byte_budget(platforms: list[str] | None = None,
+                        max_bytes: int | None = None) -> int | None:
+    """
+    画像サイズの上限を決定（指定がなければ投稿先の上限のうち最も小さいもの）
+    
+    Args:
+        platforms: 投稿先（PLATFORM_BYTE_BUDGETS のキー）。None の場合は全て
+        max_bytes: 明示的な上限（指定時はこちらを優先）
+    """
+    if max_bytes:
+        return max_bytes
+    if platforms is None:
+        platforms = list(PLATFORM_BYTE_BUDGETS)
+    budgets = [PLATFORM_BYTE_BUDGETS[p] for p in platforms]
+    return min(budgets) if budgets else None
+
+
+def _encode(image: Image.Image, fmt: str, quality: int | None = None) -> bytes:
+    """画像を指定形式でエンコード"""
+    buffer = io.BytesIO()
+    if fmt == "png":
+        image.save(buffer, format="PNG", optimize=True)
+    elif fmt == "jpeg":
+        image.save(buffer, format="JPEG", quality=quality, optimize=True,
+                   progressive=True, subsampling="4:2:0")
+    else:
+        image.save(buffer, format="WEBP", quality=quality, method=6)
+    return buffer.getvalue()
+
+
+def encode_image(image: Image.Image, fmt: str = "png",
+                 max_bytes: int | None = None) -> tuple[bytes, int | None]:
+    """
+    画像をエンコードし、サイズ上限に収まる最も高い品質を二分探索で選ぶ
+    
+    Args:
+        image: 画像
+        fmt: 出力形式（THUMBNAIL_FORMATS のキー）
+        max_bytes: サイズ上限（None: 上限なし）
+    
+    Returns:
+        (エンコード結果, 品質)  PNG の場合、品質はNone
+    
+    Raises:
+        ValueError: 最低品質でもサイズ上限を超える場合
+    """
+    if fmt not in THUMBNAIL_FORMATS:
+        raise ValueError(f"不明な出力形式: {fmt}（{', '.join(THUMBNAIL_FORMATS)} から選択）")
+    
+    if fmt == "png":
+        # 可逆圧縮のため画質は変わらない（圧縮率のみ最大化）
+        data = _encode(image, fmt)
+        if max_bytes and len(data) > max_bytes:
+            raise ValueError(f"PNGがサイズ上限を超えています: {len(data)} > {max_bytes} バイト"
+                             f"（jpeg か webp を指定してください）")
+        return data, None
+    
+    if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    
+    data = _encode(image, fmt, QUALITY_MAX)
+    if not max_bytes or len(data) <= max_bytes:
+        return data, QUALITY_MAX
+    
+    # 上限に収まる最大の品質を探す
+    best = None
+    low, high = QUALITY_MIN, QUALITY_MAX - 1
+    while low <= high:
+        quality = (low + high) // 2
+        data = _encode(image, fmt, quality)
+        if len(data) <= max_bytes:
+            best = (data, quality)
+            low = quality + 1
+        else:
+            high = quality - 1
+    
+    if best is None:
+        raise ValueError(f"品質 {QUALITY_MIN} でもサイズ上限を超えています: "
+                         f"{len(data)} > {max_bytes} バイト")
+    return best
+
+
+def save_thumbnail(frame: bytes, output_path: Path, fmt: str = "png",
+                   max_bytes: int | None = None) -> str:
+    """
+    FFmpegが出力したフレーム（PNG）を指定形式に変換して保存
+    
+    Returns:
+        保存結果の説明（ログ表示用）
+    
+    Raises:
+        ValueError: サイズ上限に収まらない場合
+    """
+    with Image.open(io.BytesIO(frame)) as image:
+        image.load()
+        data, quality = encode_image(image, fmt, max_bytes)
+    
+    with open(output_path, "wb") as f:
+        f.write(data)
+    
+    detail = f"{len(data) / 1024:.0f}KB"
+    if quality is not None:
+        detail += f", 品質 {quality}"
+    return detail
+
+
+def extract_first_frame(input_path: Path, output_path: Path, threads: int = 0,
+                        fmt: str = "png", max_bytes: int | None = None) -> bool:
     """
     動画の最初のフレームを画像として抽出
     
     Args:
         input_path: 入力動画のパス
-        output_path: 出力画像のパス（.png）
+        output_path: 出力画像のパス（拡張子は fmt に合わせる）
+        threads: デコードのスレッド数（0: FFmpegの自動設定）
+        fmt: 出力形式（THUMBNAIL_FORMATS のキー）
+        max_bytes: 出力画像のサイズ上限（None: 上限なし）
     
     Returns:
         処理成功時True、失敗時False
     """
-    # FFmpegコマンド: 最初のフレームをPNG（可逆圧縮・劣化なし）として抽出
+    # FFmpegコマンド: 最初のフレームを無圧縮のPNGとして標準出力に書き出し、
+    # 出力形式への変換と品質の調整はメモリ上で行う（動画のデコードは1回のみ）
+    # 入力側で先頭にシークし、キーフレーム以外と映像以外のストリームはデコードしない
     cmd = [
         'ffmpeg',
         '-y',  # 上書き確認なし
+        '-ss', '0',
+        '-skip_frame', 'nokey',
+        '-an', '-sn', '-dn',
+    ]
+    if threads > 0:
+        cmd += ['-threads', str(threads)]
+    cmd += [
         '-i', str(input_path),
         '-vframes', '1',  # 1フレームのみ
+        '-f', 'image2pipe',
         '-c:v', 'png',  # PNG形式（可逆圧縮、最高画質）
-        '-compression_level', '0',  # 最速圧縮（画質に影響なし）
-        str(output_path)
+        '-compression_level', '0',  # 最速圧縮（最終的な圧縮は save_thumbnail で行う）
+        'pipe:1'
     ]
     
     try:
@@ -55,26 +235,58 @@ def extract_first_frame(input_path: Path, output_path: Path) -> bool:
         result = subprocess.run(
             cmd, 
             capture_output=True, 
-            text=True, 
-            check=True,
-            encoding='utf-8',
-            errors='replace'
+            check=True
         )
-        print(f"  ✓ 完了: {output_path.name}")
+        detail = save_thumbnail(result.stdout, output_path, fmt, max_bytes)
+        print(f"  ✓ 完了: {output_path.name} ({detail})")
         return True
     except subprocess.CalledProcessError as e:
+        stderr = e.stderr.decode('utf-8', errors='replace') if e.stderr else ''
+        print(f"  ✗ エラー: {input_path.name}")
+        print(f"    詳細: {stderr[:500] if stderr else 'Unknown error'}")
+        return False
+    except (OSError, ValueError) as e:
+        output_path.unlink(missing_ok=True)
         print(f"  ✗ エラー: {input_path.name}")
-        print(f"    詳細: {e.stderr[:500] if e.stderr else 'Unknown error'}")
+        print(f"    詳細: {e}")
         return False
 
 
-def extract_thumbnails(source_folder: str, output_folder_name: str = "thumbnails") -> None:
+def load_index(output_path: Path) -> dict:
+    """
+    抽出結果のインデックスを読み込み
+    
+    Returns:
+        {"sources": {動画名: SHA-256}, "outputs": {SHA-256: 画像名}}
+    """
+    try:
+        with open(media_probe.folder_cache_file(INDEX_DIR, output_path), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        return {"sources": index.get("sources", {}), "outputs": index.get("outputs", {})}
+    except (OSError, ValueError):
+        return {"sources": {}, "outputs": {}}
+
+
+def save_index(output_path: Path, index: dict):
+    """抽出結果のインデックスを保存"""
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    durable_io.write_json(media_probe.folder_cache_file(INDEX_DIR, output_path), index, indent=2)
+    # 以前のインデックスは公開フォルダに同期されないよう削除
+    (output_path / LEGACY_INDEX_FILE_NAME).unlink(missing_ok=True)
+
+
+def extract_thumbnails(source_folder: str, output_folder_name: str = "thumbnails",
+                       workers: int = 1, fmt: str = "png",
+                       max_bytes: int | None = None) -> None:
     """
     フォルダ内の全動画から最初のフレームを抽出
     
     Args:
         source_folder: 元動画が格納されているフォルダのパス
         output_folder_name: 出力フォルダ名（ソースフォルダ内に作成）
+        workers: 同時に実行する抽出数（1: 逐次処理）
+        fmt: 出力形式（THUMBNAIL_FORMATS のキー）
+        max_bytes: 出力画像のサイズ上限（None: 上限なし）
     """
     source_path = Path(source_folder)
     
@@ -82,6 +294,10 @@ def extract_thumbnails(source_folder: str, output_folder_name: str = "thumbnails
         print(f"エラー: フォルダが存在しません: {source_folder}")
         sys.exit(1)
     
+    if fmt not in THUMBNAIL_FORMATS:
+        print(f"エラー: 不明な出力形式です: {fmt}")
+        sys.exit(1)
+    
     # 出力フォルダを作成（親ディレクトリに作成）
     output_path = source_path.parent / output_folder_name
     output_path.mkdir(exist_ok=True)
@@ -89,6 +305,9 @@ def extract_thumbnails(source_folder: str, output_folder_name: str = "thumbnails
     print(f"=== サムネイル抽出 ===")
     print(f"入力フォルダ: {source_path}")
     print(f"出力フォルダ: {output_path}")
+    print(f"出力形式: {fmt}" + (f"（上限 {max_bytes / 1024 / 1024:.1f}MB）" if max_bytes else ""))
+    if workers > 1:
+        print(f"並列数: {workers}")
     print()
     
     # 動画ファイルを取得
@@ -103,27 +322,101 @@ def extract_thumbnails(source_folder: str, output_folder_name: str = "thumbnails
     
     processed_count = 0
     skipped_count = 0
+    reused_count = 0
     error_count = 0
     
+    # 全動画の内容ハッシュを取得（blur_videos.py とキャッシュを共有、
+    # サイズと更新日時が変わっていなければハッシュも再計算しない）
+    infos = media_probe.ingest(video_files, workers=max(workers, 4))
+    index = load_index(output_path)
+    jobs = []
+    
     for video_file in video_files:
-        # 出力ファイル名: 動画名.png
-        output_file = output_path / f"{video_file.stem}.png"
+        # 出力ファイル名: 動画名 + 出力形式の拡張子
+        output_file = output_path / f"{video_file.stem}{THUMBNAIL_FORMATS[fmt]}"
+        existing = find_thumbnail(output_path, video_file.stem)
         
-        # 既に処理済みの場合はスキップ
-        if output_file.exists():
-            print(f"  スキップ（処理済み）: {video_file.name}")
-            skipped_count += 1
+        # 映像ストリームが読めない動画は FFmpeg を起動せずにエラー扱い
+        info = infos.get(video_file)
+        if info is None:
+            print(f"  ✗ エラー: {video_file.name}")
+            print(f"    詳細: 映像ストリームを読み込めません")
+            error_count += 1
             continue
+        digest = info["sha256"]
         
-        # 最初のフレームを抽出
-        if extract_first_frame(video_file, output_file):
+        # 既に処理済みの場合はスキップ（元動画の内容が変わっていれば再抽出）
+        if existing:
+            recorded = index["sources"].get(video_file.name)
+            if recorded is None or recorded == digest:
+                # インデックス導入前の出力は、現在の内容で抽出済みとみなす
+                index["sources"][video_file.name] = digest
+                index["outputs"].setdefault(digest, existing.name)
+                print(f"  スキップ（処理済み）: {video_file.name}")
+                skipped_count += 1
+                continue
+            print(f"  再抽出（元動画が変更されています）: {video_file.name}")
+            # 古い内容に紐づいた画像は再利用の対象から外す
+            index["outputs"] = {d: name for d, name in index["outputs"].items()
+                                if name != existing.name}
+            if existing != output_file:
+                existing.unlink()
+        
+        # 同じ内容の動画から抽出済みの画像があれば再利用（形式は抽出済みの画像に合わせる）
+        cached_name = index["outputs"].get(digest)
+        if cached_name and Path(cached_name).stem != video_file.stem and (output_path / cached_name).exists():
+            output_file = output_path / f"{video_file.stem}{Path(cached_name).suffix}"
+            shutil.copyfile(output_path / cached_name, output_file)
+            index["sources"][video_file.name] = digest
+            print(f"  再利用（同じ内容: {cached_name}）: {video_file.name}")
+            reused_count += 1
+            continue
+        
+        jobs.append((video_file, output_file, digest))
+    
+    def record(video_file: Path, output_file: Path, digest: str, ok: bool):
+        nonlocal processed_count, error_count
+        if ok:
+            index["sources"][video_file.name] = digest
+            index["outputs"][digest] = output_file.name
             processed_count += 1
         else:
             error_count += 1
     
+    # 最初のフレームを抽出
+    if workers <= 1:
+        for video_file, output_file, digest in jobs:
+            record(video_file, output_file, digest,
+                   extract_first_frame(video_file, output_file, fmt=fmt, max_bytes=max_bytes))
+    else:
+        # 並列実行時は1プロセスあたりのスレッドを制限
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(extract_first_frame, video_file, output_file, 1,
+                                fmt, max_bytes): (video_file, output_file, digest)
+                for video_file, output_file, digest in jobs
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                video_file, output_file, digest = futures[future]
+                try:
+                    ok = future.result()
+                except Exception as e:
+                    print(f"  ✗ エラー: {video_file.name} ({e})")
+                    ok = False
+                record(video_file, output_file, digest, ok)
+                print(f"  [{done}/{len(jobs)}] {video_file.name}: {'processed' if ok else 'error'}")
+    
+    # 存在しなくなった動画・画像のエントリを削除
+    names = {video_file.name for video_file in video_files}
+    index["sources"] = {name: d for name, d in index["sources"].items() if name in names}
+    index["outputs"] = {d: name for d, name in index["outputs"].items()
+                        if (output_path / name).exists()}
+    save_index(output_path, index)
+    
     print()
     print(f"=== 処理結果 ===")
     print(f"処理完了: {processed_count} ファイル")
+    print(f"再利用:   {reused_count} ファイル")
     print(f"スキップ: {skipped_count} ファイル")
     print(f"エラー:   {error_count} ファイル")
 
@@ -132,13 +425,25 @@ if __name__ == "__main__":
     # デフォルトのソースフォルダはoriginalsフォルダ
     default_source = Path(__file__).parent / "originals"
     
-    # コマンドライン引数があれば使用
-    if len(sys.argv) > 1:
-        source_folder = sys.argv[1]
-    else:
-        source_folder = str(default_source)
+    parser = argparse.ArgumentParser(description="動画の最初のフレームを抽出")
+    parser.add_argument("source_folder", nargs="?", default=str(default_source),
+                        help="元動画のフォルダ（デフォルト: originals）")
+    parser.add_argument("output_folder_name", nargs="?", default="thumbnails",
+                        help="出力フォルダ名（デフォルト: thumbnails）")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="同時に実行する抽出数（デフォルト: 1）")
+    parser.add_argument("--format", choices=THUMBNAIL_FORMATS, default="png",
+                        help="出力形式（デフォルト: png。Instagramは webp 非対応）")
+    parser.add_argument("--platforms", nargs="+", choices=PLATFORM_BYTE_BUDGETS,
+                        default=list(PLATFORM_BYTE_BUDGETS),
+                        help="投稿先。各投稿先の画像サイズ上限のうち最も小さい値に収める（デフォルト: 全て）")
+    parser.add_argument("--max-bytes", type=int, default=None,
+                        help="画像サイズの上限（バイト、--platforms より優先）")
+    args = parser.parse_args()
     
-    # 出力フォルダ名（オプション）
-    output_folder_name = sys.argv[2] if len(sys.argv) > 2 else "thumbnails"
+    if args.format == "webp" and "instagram" in args.platforms:
+        print("警告: Instagram は WebP に対応していません。Instagramに投稿する場合は --format jpeg を使用してください。")
     
-    extract_thumbnails(source_folder, output_folder_name)
+    extract_thumbnails(args.source_folder, args.output_folder_name, workers=args.workers,
+                       fmt=args.format,
+                       max_bytes=resolve_byte_budget(args.platforms, args.max_bytes))
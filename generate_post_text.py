@@ -7,10 +7,12 @@ text_index をシードに使い、シチュエーション×トーンの組み
 （40シチュエーション × 8トーン = 320通り一巡まで同じペアなし）
 """
 
+import json
 import os
+import sys
 from pathlib import Path
 
-import requests
+import http_client
 
 
 # シチュエーション（テーマ）プール
@@ -84,6 +86,76 @@ def get_situation_and_tone(text_index: int) -> tuple[str, str]:
     return SITUATIONS[situation_idx], TONES[tone_idx]
 
 
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
+
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+
+GENERATION_CONFIG = {
+    "temperature": 1.2,
+    "topP": 0.95,
+    "topK": 40,
+    "maxOutputTokens": 500,
+}
+
+# 単体・一括生成で共通のルール
+PROMPT_RULES = """【重要ルール】
+1. **ほぼセリフのみ**で構成してください。（情景描写は（）で補足する程度、または無しでOK）
+2. タイムラインでパッと目に止まる、**破壊力のある短い一言**を意識して。
+3. 男が思わずリプライしたくなるような「隙」や「挑発」を含める。
+4. 改行を効果的に使い、空白を作ることで「焦らし」を演出する。
+5. 絵文字は文末に少しだけ（💕🥺🙈💦 など）。多すぎないこと。
+6. ハッシュタグは不要。
+7. 長々と書かない。一瞬でドキッとさせること。
+
+【生成例イメージ】
+「ねぇ、ここ…空いてるよ？💕」
+
+「我慢、しなくていいのに…🥺」
+
+「バレないように…静かにしてね？🤫💦」"""
+
+# モデル（gemini-2.0-flash）の出力トークン数の上限
+MODEL_MAX_OUTPUT_TOKENS = 8192
+# 一括生成の1リクエストあたりの最大件数（1件あたりの出力トークン数が上限に収まる件数）
+BATCH_MAX_TEXTS = MODEL_MAX_OUTPUT_TOKENS // GENERATION_CONFIG["maxOutputTokens"]
+# 一括生成のタイムアウト（秒、件数に応じて延長）
+BATCH_TIMEOUT_BASE = 30
+BATCH_TIMEOUT_PER_TEXT = 5
+
+
+def _request_gemini(api_key: str, prompt: str, generation_config: dict, timeout: float) -> list[dict]:
+    """Gemini API にプロンプトを送信し、候補のリストを返す"""
+    payload = {
+        "contents": [
+            {
+                "parts": [
+                    {"text": prompt}
+                ]
+            }
+        ],
+        "generationConfig": generation_config,
+        "safetySettings": SAFETY_SETTINGS,
+    }
+    
+    response = http_client.post(GEMINI_URL.format(api_key=api_key), json=payload, timeout=timeout)
+    response.raise_for_status()
+    return response.json().get("candidates", [])
+
+
+def _candidate_text(candidate: dict) -> str:
+    """候補からテキストを取り出し、前後の空白とコードブロック記号を除去"""
+    text = candidate.get("content", {}).get("parts", [{}])[0].get("text", "")
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").strip()
+    return text
+
+
 def generate_post_text_gemini(
     api_key: str,
     text_index: int = 0,
@@ -111,68 +183,19 @@ def generate_post_text_gemini(
 【シチュエーション】{situation}
 【今の気分・口調】{tone}
 
-【重要ルール】
-1. **ほぼセリフのみ**で構成してください。（情景描写は（）で補足する程度、または無しでOK）
-2. タイムラインでパッと目に止まる、**破壊力のある短い一言**を意識して。
-3. 男が思わずリプライしたくなるような「隙」や「挑発」を含める。
-4. 改行を効果的に使い、空白を作ることで「焦らし」を演出する。
-5. 絵文字は文末に少しだけ（💕🥺🙈💦 など）。多すぎないこと。
-6. ハッシュタグは不要。
-7. 長々と書かない。一瞬でドキッとさせること。
-
-【生成例イメージ】
-「ねぇ、ここ…空いてるよ？💕」
-
-「我慢、しなくていいのに…🥺」
-
-「バレないように…静かにしてね？🤫💦」
+{PROMPT_RULES}
 
 【出力】投稿文のみを出力してください。"""
 
     try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
-        
-        payload = {
-            "contents": [
-                {
-                    "parts": [
-                        {"text": prompt}
-                    ]
-                }
-            ],
-            "generationConfig": {
-                "temperature": 1.2,
-                "topP": 0.95,
-                "topK": 40,
-                "maxOutputTokens": 500,
-            },
-            "safetySettings": [
-                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-            ]
-        }
-        
-        response = requests.post(url, json=payload, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
+        candidates = _request_gemini(api_key, prompt, GENERATION_CONFIG, timeout=30)
         
         # レスポンスからテキストを抽出
-        candidates = data.get("candidates", [])
         if not candidates:
             print("警告: Geminiからの応答が空です")
             return None
         
-        text = candidates[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-        
-        # 前後の空白・改行をトリム
-        text = text.strip()
-        
-        # コードブロック記号の除去
-        if text.startswith("```"):
-            text = text.strip("`").strip()
+        text = _candidate_text(candidates[0])
         
         if text:
             print(f"  ✓ Gemini生成テキスト ({len(text)}文字)")
@@ -186,6 +209,118 @@ def generate_post_text_gemini(
         return None
 
 
+def parse_batch_response(raw: str, text_indices: list[int]) -> dict[int, str]:
+    """
+    一括生成の応答（JSON配列）を検証して text_index ごとに分割
+    
+    要求していない text_index・重複・空のテキストは除外する。
+    
+    Returns:
+        text_index -> 投稿文（応答に含まれなかった text_index はキーなし）
+    """
+    # コードブロックで囲まれていた場合の言語名（```json）を除去
+    raw = raw.strip()
+    if raw.startswith("json"):
+        raw = raw[len("json"):]
+    try:
+        items = json.loads(raw)
+    except ValueError as e:
+        print(f"警告: 一括生成の応答がJSONではありません: {e}")
+        return {}
+    if isinstance(items, dict):
+        items = items.get("texts", [])
+    if not isinstance(items, list):
+        print("警告: 一括生成の応答が配列ではありません")
+        return {}
+    
+    requested = set(text_indices)
+    texts = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index, text = item.get("text_index"), item.get("text")
+        if not isinstance(index, int) or index not in requested or index in texts:
+            continue
+        if not isinstance(text, str) or not text.strip():
+            continue
+        texts[index] = text.strip()
+    return texts
+
+
+def generate_post_texts_gemini(api_key: str, text_indices: list[int]) -> dict[int, str]:
+    """
+    複数の text_index の投稿文を1回のリクエストでまとめて生成する。
+    
+    共通のルールは1回だけ送り、text_index ごとのシチュエーションとトーンを列挙して、
+    JSON（responseSchema で形式を指定）で text_index と投稿文の組を返させる。
+    BATCH_MAX_TEXTS 件を超える場合は分割してリクエストする。
+    
+    Args:
+        api_key: Gemini API Key
+        text_indices: 生成する text_index のリスト
+    
+    Returns:
+        text_index -> 生成された投稿文（生成できなかった text_index はキーなし）
+    """
+    texts = {}
+    for start in range(0, len(text_indices), BATCH_MAX_TEXTS):
+        batch = text_indices[start:start + BATCH_MAX_TEXTS]
+        
+        requests_text = "\n".join(
+            f"- text_index={index}: 【シチュエーション】{situation} 【今の気分・口調】{tone}"
+            for index in batch
+            for situation, tone in [get_situation_and_tone(index)]
+        )
+        prompt = f"""あなたはTwitter（X）の裏垢女子（AI美女）です。
+次のそれぞれのシチュエーションと口調で、「バズる」エッチな投稿文を1つずつ生成してください。
+
+{requests_text}
+
+{PROMPT_RULES}
+
+【出力】各 text_index について、text_index と投稿文（text）の組をJSON配列で出力してください。"""
+        
+        generation_config = {
+            **GENERATION_CONFIG,
+            "maxOutputTokens": min(GENERATION_CONFIG["maxOutputTokens"] * len(batch),
+                                   MODEL_MAX_OUTPUT_TOKENS),
+            "responseMimeType": "application/json",
+            "responseSchema": {
+                "type": "ARRAY",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "text_index": {"type": "INTEGER"},
+                        "text": {"type": "STRING"},
+                    },
+                    "required": ["text_index", "text"],
+                },
+            },
+        }
+        
+        print(f"  一括生成: text_index={batch}")
+        try:
+            candidates = _request_gemini(
+                api_key, prompt, generation_config,
+                timeout=BATCH_TIMEOUT_BASE + BATCH_TIMEOUT_PER_TEXT * len(batch)
+            )
+        except Exception as e:
+            print(f"✗ Gemini API エラー: {e}")
+            continue
+        
+        if not candidates:
+            print("警告: Geminiからの応答が空です")
+            continue
+        
+        result = parse_batch_response(_candidate_text(candidates[0]), batch)
+        missing = [index for index in batch if index not in result]
+        print(f"  ✓ Gemini一括生成 {len(result)}/{len(batch)} 件"
+              + (f"（不足: {missing}）" if missing else ""))
+        texts.update(result)
+    
+    return texts
+
+
 # テスト用
 if __name__ == "__main__":
     from dotenv import load_dotenv
@@ -198,6 +333,13 @@ if __name__ == "__main__":
     
     print("=== 妄想会話テキスト生成テスト ===\n")
     
+    # 一括生成: python generate_post_text.py batch
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        for index, text in sorted(generate_post_texts_gemini(api_key, [0, 1, 2]).items()):
+            print(f"\n--- テスト (index={index}) ---\n{text}\n")
+            print("-" * 40)
+        sys.exit(0)
+    
     for i in range(3):
         print(f"\n--- テスト (index={i}) ---")
         text = generate_post_text_gemini(api_key, text_index=i)
@@ -0,0 +1,166 @@
+"""
+共有HTTPクライアントモジュール
+
+全スクリプトで1つの requests.Session を共有し、
+ホストごとのコネクションプール（Keep-Alive）と
+共通のリトライ/バックオフ設定を提供する。
+
+同じホスト（graph.threads.net / graph.instagram.com / api.github.com など）への
+2回目以降のリクエストは既存の接続を再利用するため、TCP+TLSハンドシェイクが発生しない。
+
+設定（環境変数）:
+- HTTP_MAX_RETRIES: リトライ回数（デフォルト: 3）
+- HTTP_BACKOFF_FACTOR: バックオフ係数（デフォルト: 1.0 → 1, 2, 4秒...）
+- HTTP_POOL_MAXSIZE: ホストごとの最大接続数（デフォルト: 10）
+
+ファイルのアップロードには MultipartStream を使用すると、
+ファイル全体をメモリに読み込まずに multipart/form-data で逐次送信できる。
+"""
+
+import io
+import os
+import threading
+import uuid
+from typing import BinaryIO, Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "1.0"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+
+# リトライ対象のステータスコード
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# ステータスコードでリトライしてよいメソッド（POSTは二重投稿を防ぐため対象外）
+RETRY_METHODS = frozenset({"HEAD", "GET", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def build_retry(max_retries: int = None, backoff_factor: float = None) -> Retry:
+    """共通のリトライ/バックオフ設定を作成"""
+    if max_retries is None:
+        max_retries = HTTP_MAX_RETRIES
+    if backoff_factor is None:
+        backoff_factor = HTTP_BACKOFF_FACTOR
+
+    return Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=RETRY_METHODS,
+        respect_retry_after_header=True,
+        # リトライし尽くした場合はレスポンスを返し、呼び出し側の raise_for_status に任せる
+        raise_on_status=False,
+    )
+
+
+def create_session(max_retries: int = None, backoff_factor: float = None,
+                   pool_maxsize: int = None) -> requests.Session:
+    """コネクションプールとリトライ設定を持つ Session を作成"""
+    if pool_maxsize is None:
+        pool_maxsize = HTTP_POOL_MAXSIZE
+
+    adapter = HTTPAdapter(
+        pool_connections=pool_maxsize,
+        pool_maxsize=pool_maxsize,
+        max_retries=build_retry(max_retries, backoff_factor),
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """プロセス全体で共有する Session を取得"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """共有 Session で GET"""
+    return get_session().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """共有 Session で POST"""
+    return get_session().post(url, **kwargs)
+
+
+def patch(url: str, **kwargs) -> requests.Response:
+    """共有 Session で PATCH"""
+    return get_session().patch(url, **kwargs)
+
+
+class MultipartStream:
+    """
+    multipart/form-data の本文を逐次生成するファイル風オブジェクト
+
+    requests の data= に渡すと、ファイルをチャンク単位で読みながら送信する
+    （本文全体をメモリ上に組み立てない）。Content-Length は事前に計算する。
+    """
+
+    def __init__(self, fields: dict[str, str], file_field: str, file_obj: BinaryIO,
+                 file_name: str, file_size: int,
+                 file_content_type: str = "application/octet-stream",
+                 progress: Callable[[int, int], None] | None = None):
+        """
+        Args:
+            fields: 通常のフォーム項目
+            file_field: ファイル項目の名前
+            file_obj: 送信するファイル（バイナリモードで開いたもの）
+            file_name: 送信時のファイル名
+            file_size: ファイルのサイズ（バイト）
+            file_content_type: ファイルの Content-Type
+            progress: 送信済みバイト数と合計バイト数を受け取るコールバック
+        """
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+
+        head = b"".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+            .encode("utf-8") + str(value).encode("utf-8") + b"\r\n"
+            for name, value in fields.items()
+        )
+        head += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+            f'filename="{file_name}"\r\nContent-Type: {file_content_type}\r\n\r\n'
+        ).encode("utf-8")
+        tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+        self._parts = [io.BytesIO(head), file_obj, io.BytesIO(tail)]
+        self._total = len(head) + file_size + len(tail)
+        self._sent = 0
+        self._progress = progress
+
+    def __len__(self) -> int:
+        return self._total
+
+    def read(self, size: int = -1) -> bytes:
+        """本文を最大 size バイト読み出す（size < 0 の場合は残り全て）"""
+        chunks = []
+        while self._parts and (size < 0 or size > 0):
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+
+        data = b"".join(chunks)
+        if data and self._progress:
+            self._sent += len(data)
+            self._progress(self._sent, self._total)
+        return data
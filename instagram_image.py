@@ -0,0 +1,62 @@
+"""
+Instagram用の画像の寸法計算
+
+Instagramのフィード投稿要件に合わせたクロップ範囲を、画像の幅と高さだけから計算する。
+画像の読み込みやクロップ自体は呼び出し側で行う（post_to_x.py はサムネイル画像をメモリ上で）。
+media_pipeline.py は同じ基準のクロップを ffmpeg のフィルタ（instagram_crop_filter）で行い、
+instagram/<名前>.jpg に書き出す（post_to_x.py はこれがあればクロップせずに使う）。
+"""
+
+from pathlib import Path
+
+# Instagramの許容アスペクト比
+INSTAGRAM_MIN_RATIO = 0.8   # 4:5
+INSTAGRAM_MAX_RATIO = 1.91  # 1.91:1
+# Instagramの画像の最大幅（これより大きい画像はInstagram側で縮小される）
+INSTAGRAM_MAX_WIDTH = 1440
+# media_pipeline.py が Instagram用の画像を書き出すフォルダ（originals / thumbnails と同じ階層）
+INSTAGRAM_DIR_NAME = "instagram"
+
+
+def instagram_crop_box(width: int, height: int) -> tuple[int, int, int, int] | None:
+    """
+    Instagramのフィード投稿要件（アスペクト比 4:5 ~ 1.91:1）に合わせたクロップ範囲を計算
+
+    Returns:
+        (left, top, right, bottom)。クロップ不要の場合None
+    """
+    if not width or not height:
+        return None
+
+    aspect_ratio = width / height
+
+    # アスペクト比が範囲内ならそのまま
+    if INSTAGRAM_MIN_RATIO <= aspect_ratio <= INSTAGRAM_MAX_RATIO:
+        return None
+
+    # 縦長すぎる場合（例: 9:16 = 0.56）-> 上下をカットして 4:5 に
+    if aspect_ratio < INSTAGRAM_MIN_RATIO:
+        new_height = int(width / INSTAGRAM_MIN_RATIO)
+        top = (height - new_height) // 2
+        return (0, top, width, top + new_height)
+
+    # 横長すぎる場合 -> 今回は省略（通常縦長動画のサムネなので発生しにくい）
+    return None
+
+
+def instagram_crop_filter() -> str:
+    """
+    instagram_crop_box と同じクロップ（縦長すぎる場合のみ中央で 4:5）を行う ffmpeg のフィルタ
+
+    幅と高さはフィルタ内の式 (iw / ih) で決めるため、回転情報付きの動画でも
+    ffmpeg が回転した後の向きでクロップされる（メタデータの幅・高さは使わない）。
+    最大幅を超える場合は INSTAGRAM_MAX_WIDTH に縮小する。
+    """
+    return (f"crop=w=iw:h='min(ih,floor(iw/{INSTAGRAM_MIN_RATIO}))',"
+            f"scale=w='min(iw,{INSTAGRAM_MAX_WIDTH})':h=-2")
+
+
+def find_instagram_image(thumbnail_path: Path) -> Path | None:
+    """media_pipeline.py が書き出した Instagram用の画像（thumbnails と同じ階層の instagram/<名前>.jpg）"""
+    path = Path(thumbnail_path).parent.parent / INSTAGRAM_DIR_NAME / f"{Path(thumbnail_path).stem}.jpg"
+    return path if path.exists() else None
@@ -0,0 +1,329 @@
+"""
+動画処理の統合パイプライン
+
+元動画を1回だけデコードし、1つのFFmpegプロセスで以下をまとめて出力します。
+extract_thumbnails.py と blur_videos.py を順に実行する代わりに使用できます。
+
+出力:
+- thumbnails/<名前>.png  最初のフレーム（extract_thumbnails.py と同じ。--format で jpg / webp も可）
+- blurred/<名前>.mp4     2秒後からブラー処理した動画（blur_videos.py と同じ）
+- instagram/<名前>.jpg   Instagram用に 4:5 にクロップした最初のフレーム（--instagram 指定時）
+                         post_to_x.py はこれがあればサムネイルをクロップせずにそのまま使う
+
+機能:
+- 出力ごとに処理済みならスキップし、足りない出力だけを生成
+- 2秒未満の動画はブラー動画を生成しない（サムネイルは生成）
+- メタデータは media_probe のキャッシュを共有
+- サムネイルの形式とサイズ上限は extract_thumbnails.py と同じ設定を使用
+
+使い方:
+    python media_pipeline.py [ソースフォルダ] [--instagram] [--workers N] [--threads N]
+                             [--engine ENGINE] [--kernel KERNEL]
+                             [--format {png,jpeg,webp}] [--platforms ...] [--max-bytes N]
+"""
+
+import argparse
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import instagram_image
+import media_probe
+from blur_videos import (
+    BLUR_ENGINES, BLUR_KERNELS, BLUR_START_SECS, build_blur_filter, get_video_files
+)
+from extract_thumbnails import (
+    PLATFORM_BYTE_BUDGETS, THUMBNAIL_FORMATS, find_thumbnail, resolve_byte_budget, save_thumbnail
+)
+
+
+def build_pipeline_command(input_path: Path, info: dict,
+                           blurred_path: Path | None = None,
+                           thumbnail_path: Path | None = None,
+                           instagram_path: Path | None = None,
+                           blur_strength: int = 5, threads: int = 0,
+                           engine: str = "timeline", kernel: str = "boxblur") -> list[str]:
+    """
+    1回のデコードで複数の出力を生成するFFmpegコマンドを作成
+
+    Args:
+        input_path: 入力動画のパス
+        info: media_probe で取得したメタデータ
+        blurred_path / thumbnail_path / instagram_path: 各出力のパス（None の出力は生成しない）
+            thumbnail_path には無圧縮のPNGを書き出す（形式の変換は process_one で行う）
+    """
+    branches = []
+    if blurred_path:
+        branches.append("pipe_blur")
+    if thumbnail_path:
+        branches.append("pipe_thumb")
+    if instagram_path:
+        branches.append("pipe_ig")
+
+    # デコードした映像を出力の数だけ分岐
+    if len(branches) == 1:
+        graph = [f"[0:v]null[{branches[0]}]"]
+    else:
+        graph = [f"[0:v]split={len(branches)}" + "".join(f"[{b}]" for b in branches)]
+
+    if blurred_path:
+        graph.append(build_blur_filter(blur_strength, engine, kernel, input_label="pipe_blur"))
+    if thumbnail_path:
+        graph.append("[pipe_thumb]trim=end_frame=1[thumb]")
+    if instagram_path:
+        # クロップ範囲はフィルタ内で回転後のフレームサイズから決める
+        # （media_probe の幅・高さは回転前の値のため使わない）
+        graph.append(f"[pipe_ig]trim=end_frame=1,{instagram_image.instagram_crop_filter()}[ig]")
+
+    cmd = [
+        'ffmpeg',
+        '-y',  # 上書き確認なし
+        '-i', str(input_path),
+        '-filter_complex', ";".join(graph),
+    ]
+
+    if blurred_path:
+        cmd += [
+            '-map', '[outv]',
+            '-map', '0:a?',  # 音声があれば含める（なくてもエラーにならない）
+            '-c:v', 'libx264',
+            '-preset', 'medium',
+            '-crf', '23',
+            '-c:a', 'aac',
+            '-b:a', '128k',
+        ]
+        if threads > 0:
+            cmd += ['-threads', str(threads)]
+        cmd.append(str(blurred_path))
+
+    if thumbnail_path:
+        # PNG（可逆圧縮・劣化なし）
+        cmd += [
+            '-map', '[thumb]',
+            '-frames:v', '1',
+            '-c:v', 'png',
+            '-compression_level', '0',
+            str(thumbnail_path)
+        ]
+
+    if instagram_path:
+        cmd += [
+            '-map', '[ig]',
+            '-frames:v', '1',
+            '-q:v', '2',  # 高画質JPEG
+            str(instagram_path)
+        ]
+
+    return cmd
+
+
+def process_one(video_file: Path, info: dict, outputs: dict[str, Path],
+                threads: int = 0, engine: str = "timeline",
+                kernel: str = "boxblur", fmt: str = "png",
+                max_bytes: int | None = None) -> tuple[str, str]:
+    """
+    1本の動画から必要な出力をまとめて生成（ワーカープロセスから呼ばれる）
+
+    Returns:
+        (結果, 詳細) 結果は "processed" / "error"
+    """
+    # サムネイルは一時ファイルに書き出してから指定形式に変換
+    frame_path = None
+    if "thumbnail" in outputs:
+        frame_path = outputs["thumbnail"].with_name(f".{video_file.stem}.frame.png")
+
+    cmd = build_pipeline_command(
+        video_file, info,
+        blurred_path=outputs.get("blurred"),
+        thumbnail_path=frame_path,
+        instagram_path=outputs.get("instagram"),
+        threads=threads, engine=engine, kernel=kernel
+    )
+
+    try:
+        print(f"  処理中: {video_file.name} ({', '.join(outputs)})")
+        subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            check=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+        if frame_path:
+            thumb_detail = save_thumbnail(frame_path.read_bytes(), outputs["thumbnail"],
+                                          fmt, max_bytes)
+            print(f"  サムネイル: {outputs['thumbnail'].name} ({thumb_detail})")
+        print(f"  ✓ 完了: {video_file.name}")
+        return "processed", ""
+    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+        # 途中まで書き込まれた出力は次回に再生成させる
+        for path in outputs.values():
+            path.unlink(missing_ok=True)
+        if isinstance(e, subprocess.CalledProcessError):
+            detail = e.stderr[:500] if e.stderr else 'Unknown error'
+        else:
+            detail = str(e)
+        print(f"  ✗ エラー: {video_file.name}")
+        print(f"    詳細: {detail}")
+        return "error", detail
+    finally:
+        if frame_path:
+            frame_path.unlink(missing_ok=True)
+
+
+def run_pipeline(source_folder: str, instagram: bool = False, workers: int = 1,
+                 threads: int = 0, engine: str = "timeline", kernel: str = "boxblur",
+                 fmt: str = "png", max_bytes: int | None = None) -> None:
+    """
+    フォルダ内の全動画からサムネイルとブラー動画（とInstagram用画像）を生成
+
+    Args:
+        source_folder: 元動画が格納されているフォルダのパス
+        instagram: Instagram用にクロップしたJPEGも生成する
+        workers: 同時に処理する動画数
+        threads: 1プロセスあたりのエンコードスレッド数（0: FFmpegの自動設定）
+        engine: ブラー処理のエンジン（blur_videos.BLUR_ENGINES）
+        kernel: ブラーのカーネル（blur_videos.BLUR_KERNELS）
+        fmt: サムネイルの出力形式（extract_thumbnails.THUMBNAIL_FORMATS）
+        max_bytes: サムネイルのサイズ上限（None: 上限なし）
+    """
+    source_path = Path(source_folder)
+
+    if not source_path.exists():
+        print(f"エラー: フォルダが存在しません: {source_folder}")
+        sys.exit(1)
+
+    # 設定ミスは処理開始前に検出
+    build_blur_filter(engine=engine, kernel=kernel)
+
+    # 出力フォルダを作成（親ディレクトリに作成）
+    folders = {
+        "thumbnail": source_path.parent / "thumbnails",
+        "blurred": source_path.parent / "blurred",
+    }
+    if instagram:
+        folders["instagram"] = source_path.parent / instagram_image.INSTAGRAM_DIR_NAME
+    for folder in folders.values():
+        folder.mkdir(exist_ok=True)
+
+    print(f"=== 動画処理パイプライン ===")
+    print(f"入力フォルダ: {source_path}")
+    for folder in folders.values():
+        print(f"出力フォルダ: {folder}")
+    print()
+
+    video_files = sorted(get_video_files(source_path))
+
+    if not video_files:
+        print("処理対象の動画ファイルが見つかりませんでした。")
+        return
+
+    print(f"検出された動画ファイル数: {len(video_files)}")
+    print()
+
+    def expected_outputs(video_file: Path) -> dict[str, Path]:
+        # 既存のサムネイルは形式が異なっても処理済みとみなす
+        thumbnail = (find_thumbnail(folders["thumbnail"], video_file.stem)
+                     or folders["thumbnail"] / f"{video_file.stem}{THUMBNAIL_FORMATS[fmt]}")
+        outputs = {
+            "thumbnail": thumbnail,
+            "blurred": folders["blurred"] / video_file.name,
+        }
+        if instagram:
+            outputs["instagram"] = folders["instagram"] / f"{video_file.stem}.jpg"
+        return outputs
+
+    # 出力が揃っていない動画だけメタデータを取得
+    pending = [v for v in video_files
+               if not all(p.exists() for p in expected_outputs(v).values())]
+    infos = media_probe.ingest(pending, workers=max(workers, 4))
+
+    counts = {"processed": 0, "skipped": 0, "error": 0}
+    jobs = []
+
+    for video_file in video_files:
+        outputs = {kind: path for kind, path in expected_outputs(video_file).items()
+                   if not path.exists()}
+
+        # 既に処理済みの場合はスキップ
+        if not outputs:
+            print(f"  スキップ（処理済み）: {video_file.name}")
+            counts["skipped"] += 1
+            continue
+
+        info = infos.get(video_file)
+        if info is None:
+            print(f"  ✗ エラー: {video_file.name}")
+            print(f"    詳細: 映像ストリームを読み込めません")
+            counts["error"] += 1
+            continue
+
+        # 2秒未満の動画はブラー動画を生成しない
+        if "blurred" in outputs and info["duration"] < BLUR_START_SECS:
+            print(f"  ブラー動画スキップ（2秒未満）: {video_file.name} ({info['duration']:.2f}秒)")
+            del outputs["blurred"]
+            if not outputs:
+                counts["skipped"] += 1
+                continue
+
+        jobs.append((video_file, info, outputs))
+
+    if workers <= 1:
+        for video_file, info, outputs in jobs:
+            result, _ = process_one(video_file, info, outputs, threads, engine, kernel,
+                                    fmt, max_bytes)
+            counts[result] += 1
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(process_one, video_file, info, outputs,
+                                threads, engine, kernel, fmt, max_bytes): video_file
+                for video_file, info, outputs in jobs
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    result, _ = future.result()
+                except Exception as e:
+                    result = "error"
+                    print(f"  ✗ エラー: {futures[future].name} ({e})")
+                counts[result] += 1
+                print(f"  [{done}/{len(jobs)}] {futures[future].name}: {result}")
+
+    print()
+    print(f"=== 処理結果 ===")
+    print(f"処理完了: {counts['processed']} ファイル")
+    print(f"スキップ: {counts['skipped']} ファイル")
+    print(f"エラー:   {counts['error']} ファイル")
+
+
+if __name__ == "__main__":
+    # デフォルトのソースフォルダはoriginalsフォルダ
+    default_source = Path(__file__).parent / "originals"
+
+    parser = argparse.ArgumentParser(description="サムネイルとブラー動画を1回のデコードで生成")
+    parser.add_argument("source_folder", nargs="?", default=str(default_source),
+                        help="元動画のフォルダ（デフォルト: originals）")
+    parser.add_argument("--instagram", action="store_true",
+                        help="Instagram用に 4:5 にクロップしたJPEGも生成する")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="同時に処理する動画数（デフォルト: 1）")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="1プロセスあたりのスレッド数（デフォルト: FFmpegの自動設定）")
+    parser.add_argument("--engine", choices=BLUR_ENGINES, default="timeline",
+                        help="ブラー処理のエンジン（デフォルト: timeline）")
+    parser.add_argument("--kernel", choices=BLUR_KERNELS, default="boxblur",
+                        help="ブラーのカーネル（デフォルト: boxblur）")
+    parser.add_argument("--format", choices=THUMBNAIL_FORMATS, default="png",
+                        help="サムネイルの出力形式（デフォルト: png。Instagramは webp 非対応）")
+    parser.add_argument("--platforms", nargs="+", choices=PLATFORM_BYTE_BUDGETS,
+                        default=list(PLATFORM_BYTE_BUDGETS),
+                        help="投稿先。サムネイルを各投稿先の画像サイズ上限に収める（デフォルト: 全て）")
+    parser.add_argument("--max-bytes", type=int, default=None,
+                        help="サムネイルのサイズ上限（バイト、--platforms より優先）")
+    args = parser.parse_args()
+
+    run_pipeline(args.source_folder, instagram=args.instagram, workers=args.workers,
+                 threads=args.threads, engine=args.engine, kernel=args.kernel,
+                 fmt=args.format, max_bytes=resolve_byte_budget(args.platforms, args.max_bytes))
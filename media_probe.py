@@ -0,0 +1,271 @@
+"""
+動画メタデータ取得モジュール
+
+ffprobe を1回だけ実行して、動画の長さ・ストリーム構成・解像度・キーフレーム位置を
+まとめて取得する。結果は動画のフォルダごとのキャッシュファイル
+(.cache/media_probe/<フォルダ名>-<パスのハッシュ>.json) にファイルのハッシュと更新日時を
+キーにして保存し、次回以降は ffprobe を起動しない。
+（originals などの動画フォルダは Google Drive の公開フォルダと同期するため、フォルダ内には書かない）
+
+取得したメタデータは、ブラー処理・サムネイル抽出・Instagram用クロップで共有する。
+
+設定（環境変数）:
+- MEDIA_PROBE_CACHE_DIR: キャッシュの保存先（デフォルト: スクリプトと同じフォルダの .cache/media_probe）
+
+使い方:
+    python media_probe.py [フォルダ]   # フォルダ内の動画を一括で取得・キャッシュ
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import durable_io
+
+CACHE_DIR = Path(os.getenv("MEDIA_PROBE_CACHE_DIR", Path(__file__).parent / ".cache" / "media_probe"))
+
+# 以前の保存先（動画と同じフォルダのサイドカーファイル、保存時に削除する）
+LEGACY_CACHE_FILE_NAME = ".media_probe.json"
+
+# キャッシュ形式のバージョン（メタデータの項目を変えたら上げる）
+# 2: video_profile / video_level / has_b_frames を追加
+CACHE_VERSION = 2
+
+
+def file_hash(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """ファイル内容の SHA-256 を計算"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stream_params(video: dict) -> dict:
+    """ffprobe の映像ストリーム情報から符号化パラメータを取り出す"""
+    return {
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "video_codec": video.get("codec_name"),
+        "video_profile": video.get("profile"),
+        "video_level": video.get("level"),
+        "pix_fmt": video.get("pix_fmt"),
+        "has_b_frames": video.get("has_b_frames"),
+    }
+
+
+def probe_stream_params(video_path: Path) -> dict | None:
+    """
+    最初の映像ストリームの符号化パラメータのみを取得（パケット情報は読まない）
+
+    Returns:
+        run_ffprobe と同じキーの width / height / video_codec / video_profile /
+        video_level / pix_fmt / has_b_frames（取得失敗時None）
+    """
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=codec_name,profile,level,pix_fmt,width,height,has_b_frames',
+        '-of', 'json',
+        str(video_path)
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True,
+                                encoding='utf-8', errors='replace')
+        streams = json.loads(result.stdout).get("streams", [])
+    except (subprocess.CalledProcessError, OSError, ValueError, AttributeError):
+        return None
+    return _stream_params(streams[0]) if streams else None
+
+
+def run_ffprobe(video_path: Path) -> dict | None:
+    """
+    ffprobe を1回実行してメタデータを取得（パケット情報のみ読むためデコードなし）
+
+    Returns:
+        メタデータの辞書（取得失敗時None）
+        - duration: 長さ（秒）
+        - width / height: 解像度
+        - video_codec / pix_fmt: 映像コーデックと画素形式
+        - video_profile / video_level / has_b_frames: H.264 のプロファイル・レベル・Bフレームの並べ替え数
+        - has_audio: 音声ストリームの有無
+        - keyframes: キーフレームの時刻（秒）
+    """
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-show_entries',
+        'format=duration:stream=index,codec_type,codec_name,profile,level,pix_fmt,width,height,has_b_frames'
+        ':packet=stream_index,pts_time,flags',
+        '-of', 'json',
+        str(video_path)
+    ]
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True,
+                                encoding='utf-8', errors='replace')
+        data = json.loads(result.stdout)
+    except (subprocess.CalledProcessError, OSError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if video is None:
+        return None
+
+    try:
+        duration = float(data.get("format", {}).get("duration", 0))
+    except (TypeError, ValueError):
+        duration = 0.0
+
+    keyframes = sorted(
+        float(packet["pts_time"])
+        for packet in data.get("packets", [])
+        if packet.get("stream_index") == video.get("index")
+        and "K" in packet.get("flags", "")
+        and packet.get("pts_time") not in (None, "N/A")
+    )
+
+    return {
+        "duration": duration,
+        **_stream_params(video),
+        "has_audio": any(s.get("codec_type") == "audio" for s in streams),
+        "keyframes": keyframes,
+    }
+
+
+def folder_cache_file(cache_dir: Path, folder: Path) -> Path:
+    """フォルダごとのキャッシュファイルのパス（同名の別フォルダと区別するためパスのハッシュを付ける）"""
+    folder = Path(folder).resolve()
+    digest = hashlib.sha256(str(folder).encode("utf-8")).hexdigest()[:12]
+    return Path(cache_dir) / f"{folder.name}-{digest}.json"
+
+
+def load_cache(folder: Path) -> dict:
+    """フォルダのキャッシュを読み込み"""
+    cache_file = folder_cache_file(CACHE_DIR, folder)
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache.get("files", {})
+
+
+def save_cache(folder: Path, entries: dict):
+    """フォルダのキャッシュを保存"""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    durable_io.write_json(folder_cache_file(CACHE_DIR, folder),
+                          {"version": CACHE_VERSION, "files": entries})
+    # 以前のサイドカーファイルは公開フォルダに同期されないよう削除
+    (folder / LEGACY_CACHE_FILE_NAME).unlink(missing_ok=True)
+
+
+def _lookup_or_probe(video_path: Path, entry: dict | None) -> tuple[dict | None, bool]:
+    """
+    キャッシュを確認し、必要な場合のみ ffprobe を実行
+
+    Returns:
+        (新しいキャッシュエントリ, キャッシュを更新したか)
+    """
+    stat = video_path.stat()
+
+    # サイズと更新日時が一致すればハッシュ計算も省略
+    if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+        return entry, False
+
+    digest = file_hash(video_path)
+    if entry and entry.get("sha256") == digest:
+        # 内容は同じ（更新日時だけ変わった）
+        return {**entry, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}, True
+
+    metadata = run_ffprobe(video_path)
+    if metadata is None:
+        return None, entry is not None
+
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest,
+        "metadata": metadata,
+    }, True
+
+
+def ingest(video_files: list[Path], workers: int = 4) -> dict[Path, dict]:
+    """
+    複数の動画のメタデータを取得（キャッシュを利用、未取得分は並列に ffprobe）
+
+    Returns:
+        動画パス -> メタデータ（取得できなかった動画は含まない）
+        メタデータにはファイル内容の SHA-256 (sha256) も含まれる
+    """
+    results = {}
+    by_folder = {}
+    for video_file in video_files:
+        by_folder.setdefault(video_file.parent, []).append(video_file)
+
+    for folder, files in by_folder.items():
+        entries = load_cache(folder)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            lookups = list(executor.map(
+                lambda path: _lookup_or_probe(path, entries.get(path.name)), files
+            ))
+
+        changed = False
+        for video_file, (entry, updated) in zip(files, lookups):
+            changed = changed or updated
+            if entry is None:
+                entries.pop(video_file.name, None)
+                continue
+            entries[video_file.name] = entry
+            results[video_file] = {**entry["metadata"], "sha256": entry["sha256"]}
+
+        # 存在しなくなったファイルのエントリを削除
+        existing = {name for name in entries if (folder / name).exists()}
+        if len(existing) != len(entries):
+            entries = {name: entries[name] for name in existing}
+            changed = True
+
+        if changed:
+            try:
+                save_cache(folder, entries)
+            except OSError as e:
+                print(f"警告: メタデータキャッシュの保存に失敗しました: {e}")
+
+    return results
+
+
+def get_media_info(video_path: Path) -> dict | None:
+    """1本の動画のメタデータを取得（キャッシュを利用）"""
+    return ingest([video_path]).get(video_path)
+
+
+if __name__ == "__main__":
+    folder = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent / "originals"
+    if not folder.exists():
+        print(f"エラー: フォルダが存在しません: {folder}")
+        sys.exit(1)
+
+    video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm'}
+    video_files = sorted(f for f in folder.iterdir()
+                         if f.is_file() and f.suffix.lower() in video_extensions)
+
+    infos = ingest(video_files, workers=os.cpu_count() or 4)
+    print(f"=== メタデータ取得: {len(infos)}/{len(video_files)} ファイル ===")
+    for video_file in video_files:
+        info = infos.get(video_file)
+        if info is None:
+            print(f"  ✗ {video_file.name}: 取得失敗")
+        else:
+            print(f"  {video_file.name}: {info['width']}x{info['height']} "
+                  f"{info['duration']:.2f}秒 キーフレーム{len(info['keyframes'])}個")
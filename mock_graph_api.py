@@ -0,0 +1,199 @@
+"""
+Graph API モックサーバー（オフライン検証用）
+
+Instagram / Threads の投稿フロー（コンテナ作成 → ステータス確認 → 公開）を
+ローカルで再現し、post_to_x.py のポーリング処理を実際のAPIなしで確認する。
+
+機能:
+- コンテナ作成から指定秒数後に FINISHED を返す
+- image_url に "error" を含む場合は ERROR を返す
+- 処理完了前の公開リクエストはエラー（400）を返す
+
+使い方:
+    python mock_graph_api.py demo [処理秒数]   # モックに対して投稿処理を実行
+    python mock_graph_api.py serve [処理秒数] [ポート]
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class MockGraphState:
+    """モックサーバーが保持するコンテナの状態"""
+
+    def __init__(self, ready_after: float = 3.0):
+        self.ready_after = ready_after
+        self.containers = {}
+        self.status_requests = 0
+        self.lock = threading.Lock()
+        self.next_id = 1
+
+    def create_container(self, image_url: str) -> str:
+        with self.lock:
+            container_id = str(17840000000000000 + self.next_id)
+            self.next_id += 1
+            self.containers[container_id] = {
+                "created": time.monotonic(),
+                "failed": "error" in image_url.lower(),
+                "published": False,
+            }
+            return container_id
+
+    def get_status(self, container_id: str) -> str | None:
+        with self.lock:
+            self.status_requests += 1
+            container = self.containers.get(container_id)
+            if container is None:
+                return None
+            if container["failed"]:
+                return "ERROR"
+            if container["published"]:
+                return "PUBLISHED"
+            if time.monotonic() - container["created"] < self.ready_after:
+                return "IN_PROGRESS"
+            return "FINISHED"
+
+
+def make_handler(state: MockGraphState):
+    """状態を共有するリクエストハンドラーを作成"""
+
+    class MockGraphHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            # リクエストログは出力しない
+            pass
+
+        def _send_json(self, code: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_form(self) -> dict:
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length).decode("utf-8")
+            return {k: v[0] for k, v in parse_qs(raw).items()}
+
+        def do_GET(self):
+            # GET /{container_id}?fields=status_code,status
+            parsed = urlparse(self.path)
+            container_id = parsed.path.rstrip("/").split("/")[-1]
+            fields = parse_qs(parsed.query).get("fields", ["status_code"])[0].split(",")
+
+            status = state.get_status(container_id)
+            if status is None:
+                self._send_json(404, {"error": {"message": "Unknown container"}})
+                return
+
+            payload = {"id": container_id}
+            # Instagram は status_code、Threads は status にステータスが入る
+            if "status_code" in fields:
+                payload["status_code"] = status
+                if "status" in fields:
+                    payload["status"] = "Error: mock failure" if status == "ERROR" else status
+            elif "status" in fields:
+                payload["status"] = status
+            if "error_message" in fields and status == "ERROR":
+                payload["error_message"] = "mock failure"
+            self._send_json(200, payload)
+
+        def do_POST(self):
+            parsed = urlparse(self.path)
+            endpoint = parsed.path.rstrip("/").split("/")[-1]
+            form = self._read_form()
+
+            if endpoint in ("media", "threads"):
+                container_id = state.create_container(form.get("image_url", ""))
+                self._send_json(200, {"id": container_id})
+                return
+
+            if endpoint in ("media_publish", "threads_publish"):
+                container_id = form.get("creation_id", "")
+                status = state.get_status(container_id)
+                if status != "FINISHED":
+                    self._send_json(400, {"error": {"message": f"Media not ready: {status}"}})
+                    return
+                with state.lock:
+                    state.containers[container_id]["published"] = True
+                self._send_json(200, {"id": f"media_{container_id}"})
+                return
+
+            self._send_json(404, {"error": {"message": "Unknown endpoint"}})
+
+    return MockGraphHandler
+
+
+def start_server(ready_after: float = 3.0, port: int = 0) -> tuple[ThreadingHTTPServer, MockGraphState]:
+    """バックグラウンドスレッドでモックサーバーを起動"""
+    state = MockGraphState(ready_after)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, state
+
+
+def run_demo(ready_after: float):
+    """モックサーバーに対して Instagram / Threads の投稿処理を実行"""
+    import post_to_x
+
+    server, state = start_server(ready_after)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    post_to_x.INSTAGRAM_API_BASE = f"{base_url}/v22.0"
+    post_to_x.THREADS_API_BASE = f"{base_url}/v1.0"
+
+    print(f"=== Graph API モック検証 (処理時間: {ready_after}秒) ===")
+
+    try:
+        for label, func, kwargs in [
+            ("Instagram", post_to_x.post_to_instagram, {"caption": "mock"}),
+            ("Threads", post_to_x.post_to_threads, {"text": "mock"}),
+        ]:
+            start = time.monotonic()
+            media_id = func(
+                image_url="https://example.com/image.png",
+                user_id="mock_user",
+                access_token="mock_token",
+                **kwargs
+            )
+            elapsed = time.monotonic() - start
+            print(f"  -> {label}: media_id={media_id}, 所要時間 {elapsed:.1f}秒")
+
+        # 処理失敗の検出
+        try:
+            post_to_x.post_to_instagram(
+                image_url="https://example.com/error.png",
+                caption="mock",
+                user_id="mock_user",
+                access_token="mock_token"
+            )
+            print("  ✗ ERROR ステータスが検出されませんでした")
+        except Exception as e:
+            print(f"  -> ERROR ステータスを検出: {e}")
+
+        print(f"\nステータス確認リクエスト数: {state.status_requests}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    mode = sys.argv[1] if len(sys.argv) > 1 else "demo"
+    ready_after = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+
+    if mode == "serve":
+        port = int(sys.argv[3]) if len(sys.argv) > 3 else 8765
+        server, _ = start_server(ready_after, port)
+        print(f"モックサーバー起動: http://127.0.0.1:{port}")
+        print(f"  INSTAGRAM_API_BASE=http://127.0.0.1:{port}/v22.0")
+        print(f"  THREADS_API_BASE=http://127.0.0.1:{port}/v1.0")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        run_demo(ready_after)
@@ -0,0 +1,288 @@
+"""
+投稿ペアのカタログ
+
+サムネイルと動画のペアを SQLite (pair_catalog.db) に保持し、
+未投稿のペアを名前順に取り出す。(source, posted, name) にインデックスを持つため、
+次の投稿対象の取得はペアの数に関係なくディレクトリの走査や全件の比較なしで行える。
+ソースごとの全ペア数・未投稿数は counts テーブルにトリガーで保持し、件数の取得も全件を数えない。
+
+ペアの一覧はソース（ローカルのフォルダ、または Google Drive のフォルダ）ごとに
+フィンガープリント（フォルダの更新日時、フォルダ一覧のハッシュ）と一緒に保存し、
+フィンガープリントが変わった場合のみ呼び出し側で一覧を作り直して差分を反映する。
+
+投稿済みの判定は post_status.json の posted を正とし、sync_posted で
+前回から追加された分だけをカタログに反映する。
+
+設定（環境変数）:
+- PAIR_CATALOG_DB: DBの保存先（デフォルト: スクリプトと同じフォルダの .cache/pair_catalog.db）
+
+使い方:
+    python pair_catalog.py   # ソースごとの件数を表示
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+CATALOG_DB = Path(os.getenv("PAIR_CATALOG_DB", Path(__file__).parent / ".cache" / "pair_catalog.db"))
+
+# DBスキーマのバージョン（PRAGMA user_version）
+# 1: pairs / posted / sources / meta
+# 2: counts（トリガーで保持するソースごとの件数）
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pairs (
+    source TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    posted INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, name)
+);
+CREATE INDEX IF NOT EXISTS idx_pairs_pending ON pairs (source, posted, name);
+CREATE INDEX IF NOT EXISTS idx_pairs_name ON pairs (name);
+CREATE TABLE IF NOT EXISTS posted (
+    name TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS counts (
+    source TEXT PRIMARY KEY,
+    total INTEGER NOT NULL DEFAULT 0,
+    pending INTEGER NOT NULL DEFAULT 0
+);
+CREATE TRIGGER IF NOT EXISTS trg_pairs_insert AFTER INSERT ON pairs BEGIN
+    INSERT OR IGNORE INTO counts (source) VALUES (NEW.source);
+    UPDATE counts SET total = total + 1, pending = pending + (NEW.posted = 0)
+    WHERE source = NEW.source;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_pairs_delete AFTER DELETE ON pairs BEGIN
+    UPDATE counts SET total = total - 1, pending = pending - (OLD.posted = 0)
+    WHERE source = OLD.source;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_pairs_posted AFTER UPDATE OF posted ON pairs
+WHEN OLD.posted != NEW.posted BEGIN
+    UPDATE counts SET pending = pending + (NEW.posted = 0) - (OLD.posted = 0)
+    WHERE source = NEW.source;
+END;
+"""
+
+# スキーマを確認済みのDB（プロセス内で1回だけ確認する）
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def _migrate_schema(conn: sqlite3.Connection):
+    """スキーマを作成し、古いバージョンのDBを現在のバージョンに更新"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+
+    conn.executescript(SCHEMA)
+    if version >= 1:
+        # v1 -> v2: 既存のペアから件数を集計（以降はトリガーで更新）
+        _recount(conn)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def _recount(conn: sqlite3.Connection):
+    """counts テーブルをペアから集計し直す"""
+    conn.execute("DELETE FROM counts")
+    conn.execute(
+        "INSERT INTO counts (source, total, pending) "
+        "SELECT source, COUNT(*), SUM(posted = 0) FROM pairs GROUP BY source"
+    )
+
+
+@contextmanager
+def _open_db():
+    """DB接続を開き、処理が正常終了すればコミットする"""
+    CATALOG_DB.parent.mkdir(parents=True, exist_ok=True)
+    with closing(sqlite3.connect(CATALOG_DB)) as conn:
+        conn.row_factory = sqlite3.Row
+        if CATALOG_DB not in _initialized:
+            with _init_lock, conn:
+                _migrate_schema(conn)
+                _initialized.add(CATALOG_DB)
+        with conn:
+            yield conn
+
+
+def _get_meta(conn: sqlite3.Connection, key: str) -> str | None:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else None
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value: str):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def directory_fingerprint(*folders: Path) -> str:
+    """
+    フォルダのフィンガープリント（フォルダ自体の更新日時）
+
+    ファイルの追加・削除・名前変更でフォルダの更新日時が変わるため、
+    中のファイルを走査せずに変更の有無を判定できる。
+    """
+    parts = []
+    for folder in folders:
+        try:
+            parts.append(str(folder.stat().st_mtime_ns))
+        except OSError:
+            parts.append("-")
+    return ":".join(parts)
+
+
+def needs_refresh(source: str, fingerprint: str) -> bool:
+    """ソースのペア一覧を作り直す必要があるか"""
+    with _open_db() as conn:
+        row = conn.execute("SELECT fingerprint FROM sources WHERE source = ?", (source,)).fetchone()
+    return row is None or row["fingerprint"] != fingerprint
+
+
+def replace_pairs(source: str, pairs: list[dict], fingerprint: str) -> tuple[int, int]:
+    """
+    ソースのペア一覧を更新（新しいペアを追加し、なくなったペアを削除）
+
+    既存のペアの投稿済みフラグはそのまま残る。
+
+    Args:
+        source: ソースの識別子
+        pairs: ペアのリスト（各要素は "name" を含むJSON化可能な辞書、Pathは文字列に変換）
+        fingerprint: ソースのフィンガープリント
+
+    Returns:
+        (追加件数, 削除件数)
+    """
+    rows = {
+        pair["name"]: json.dumps({k: str(v) if isinstance(v, Path) else v for k, v in pair.items()},
+                                 ensure_ascii=False)
+        for pair in pairs
+    }
+
+    with _open_db() as conn:
+        existing = {row["name"] for row in conn.execute(
+            "SELECT name FROM pairs WHERE source = ?", (source,))}
+        removed = existing - rows.keys()
+        added = rows.keys() - existing
+
+        conn.executemany("DELETE FROM pairs WHERE source = ? AND name = ?",
+                         [(source, name) for name in removed])
+        conn.executemany(
+            "INSERT INTO pairs (source, name, data) VALUES (?, ?, ?) "
+            "ON CONFLICT (source, name) DO UPDATE SET data = excluded.data",
+            [(source, name, data) for name, data in rows.items()]
+        )
+        # 追加されたペアが既に投稿済みの場合は投稿済みにする
+        conn.executemany(
+            "UPDATE pairs SET posted = 1 WHERE source = ? AND name = ? "
+            "AND EXISTS (SELECT 1 FROM posted WHERE posted.name = pairs.name)",
+            [(source, name) for name in added]
+        )
+        conn.execute("INSERT OR REPLACE INTO sources (source, fingerprint) VALUES (?, ?)",
+                     (source, fingerprint))
+
+    return len(added), len(removed)
+
+
+def sync_posted(posted: list[str]):
+    """
+    post_status.json の投稿済み一覧をカタログに反映
+
+    一覧は末尾に追加されていくため、前回の同期時の件数と末尾の名前を覚えておき、
+    それ以降に増えた分だけを反映する。
+    リセットなどで前回の一覧と一致しない場合は全件を反映し直す。
+    """
+    with _open_db() as conn:
+        synced_count = int(_get_meta(conn, "posted_count") or 0)
+        synced_last = _get_meta(conn, "posted_last")
+
+        if synced_count == len(posted) and (not posted or posted[-1] == synced_last):
+            return
+
+        if synced_count <= len(posted) and (
+                synced_count == 0 or posted[synced_count - 1] == synced_last):
+            new_names = posted[synced_count:]
+        else:
+            conn.execute("DELETE FROM posted")
+            conn.execute("UPDATE pairs SET posted = 0")
+            new_names = posted
+
+        conn.executemany("INSERT OR IGNORE INTO posted (name) VALUES (?)",
+                         [(name,) for name in new_names])
+        conn.executemany("UPDATE pairs SET posted = 1 WHERE name = ?",
+                         [(name,) for name in new_names])
+        _set_meta(conn, "posted_count", str(len(posted)))
+        _set_meta(conn, "posted_last", posted[-1] if posted else "")
+
+
+def next_pending(source: str, limit: int = 1, exclude: set[str] = frozenset()) -> list[dict]:
+    """
+    未投稿のペアを名前順に取得
+
+    Args:
+        source: ソースの識別子
+        limit: 取得する件数
+        exclude: 除外する名前（先読み済みのものなど）
+    """
+    placeholders = ",".join("?" * len(exclude))
+    query = "SELECT data FROM pairs WHERE source = ? AND posted = 0"
+    if exclude:
+        query += f" AND name NOT IN ({placeholders})"
+    query += " ORDER BY name LIMIT ?"
+
+    with _open_db() as conn:
+        rows = conn.execute(query, (source, *exclude, limit)).fetchall()
+    return [json.loads(row["data"]) for row in rows]
+
+
+def mark_posted(name: str):
+    """
+    ペアを投稿済みにする
+
+    post_status.json の保存後に呼ぶ（次回の sync_posted でも同じ名前が反映される）。
+    """
+    with _open_db() as conn:
+        conn.execute("INSERT OR IGNORE INTO posted (name) VALUES (?)", (name,))
+        conn.execute("UPDATE pairs SET posted = 1 WHERE name = ?", (name,))
+
+
+def get_counts(source: str) -> tuple[int, int]:
+    """ソースの (全ペア数, 未投稿のペア数) を取得"""
+    with _open_db() as conn:
+        row = conn.execute(
+            "SELECT total, pending FROM counts WHERE source = ?", (source,)
+        ).fetchone()
+    return (row["total"], row["pending"]) if row else (0, 0)
+
+
+def recount():
+    """
+    ソースごとの件数をペアから集計し直す
+
+    件数はトリガーで保持しているため通常は不要だが、
+    next_pending の結果と食い違った場合（DBを外部から変更した場合など）に使う。
+    """
+    with _open_db() as conn:
+        _recount(conn)
+
+
+if __name__ == "__main__":
+    if not CATALOG_DB.exists():
+        print(f"カタログがありません: {CATALOG_DB}")
+    else:
+        with _open_db() as conn:
+            sources = [row["source"] for row in conn.execute("SELECT source FROM sources")]
+        print(f"=== ペアカタログ ({CATALOG_DB}) ===")
+        for source in sources:
+            total, pending = get_counts(source)
+            print(f"  {source}: {pending}/{total} セット未投稿")
@@ -0,0 +1,170 @@
+"""
+投稿ステータス管理モジュール
+
+投稿ステータスをスナップショット (post_status.json) と
+追記専用のジャーナル (post_status.journal) の2つのファイルで管理する。
+
+- 投稿のたびにジャーナルの末尾にイベントを1行（JSON）追記する
+  （post_status.json 全体を書き直さないため、コミットの差分も1行で済む）
+- 読み込み時はスナップショットにジャーナルのイベントを順に適用する
+  （スナップショットに反映済みの seq 以下のイベントは読み飛ばす）
+- ジャーナルが STATUS_COMPACT_EVERY 件を超えたら、スナップショットに反映して
+  ジャーナルを空にする（コンパクション）
+- スナップショットは durable_io で一時ファイルに書いてから置き換えるため、書き込み途中で
+  止まっても壊れたファイルが残らない。ジャーナルの末尾の書きかけの行は無視する
+- コンパクション時はスナップショットとジャーナルの前世代 (.prev) を残し、
+  スナップショットが壊れていた場合は前世代のスナップショットと両方のジャーナルから復旧する
+  （GitHub Actions では前世代もコミットし、次回の実行でも復旧できるようにする）
+
+イベントの形式:
+    {"seq": 連番, "event": "posted", "name": ペアの名前, "text_index": 次のテキストインデックス}
+    {"seq": 連番, "event": "reset"}
+
+設定（環境変数）:
+- STATUS_COMPACT_EVERY: コンパクションするジャーナルの件数（デフォルト: 50）
+
+使い方:
+    python post_status.py            # ステータスを表示
+    python post_status.py compact    # 今すぐコンパクション
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import durable_io
+
+STATUS_FILE = Path(__file__).parent / "post_status.json"
+JOURNAL_FILE = Path(__file__).parent / "post_status.journal"
+STATUS_COMPACT_EVERY = int(os.getenv("STATUS_COMPACT_EVERY", "50"))
+
+
+def default_status() -> dict:
+    """初期状態のステータス"""
+    return {"posted": [], "current_index": 0, "text_index": 0, "seq": 0}
+
+
+def exists() -> bool:
+    """ステータスが保存されているか"""
+    return STATUS_FILE.exists() or JOURNAL_FILE.exists()
+
+
+def _read_snapshot() -> dict:
+    """スナップショットを読み込み（壊れている場合は前世代から復旧）"""
+    status = default_status()
+    status.update(durable_io.read_json(STATUS_FILE, {}))
+    return status
+
+
+def _read_journal(path: Path) -> list[dict]:
+    """ジャーナルのイベントを読み込み（書きかけで止まった行は無視）"""
+    events = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return events
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            print(f"警告: {path.name} の書きかけの行を無視しました: {line[:80]}")
+    return events
+
+
+def _apply(status: dict, event: dict):
+    """イベントをステータスに適用"""
+    if event["event"] == "posted":
+        status["posted"].append(event["name"])
+        status["current_index"] = len(status["posted"])
+        status["text_index"] = event["text_index"]
+    elif event["event"] == "reset":
+        status["posted"] = []
+        status["current_index"] = 0
+    status["seq"] = event["seq"]
+
+
+def load_status() -> dict:
+    """
+    ステータスを読み込み（スナップショット + ジャーナルの未反映分）
+
+    Returns:
+        - posted: 投稿済みの名前（投稿順）
+        - current_index: 投稿済みの件数
+        - text_index: 次に使うテキストインデックス
+        - seq: 最後に適用したイベントの連番
+        - journal_size: ジャーナルのイベント数（コンパクションの判定用）
+    """
+    status = _read_snapshot()
+    # 前世代のジャーナルは前世代のスナップショットから復旧した場合のみ適用される
+    # （通常は全て seq がスナップショット以下のため読み飛ばす）
+    previous = _read_journal(durable_io.previous_path(JOURNAL_FILE))
+    events = _read_journal(JOURNAL_FILE)
+    for event in sorted(previous + events, key=lambda e: e["seq"]):
+        if event["seq"] > status["seq"]:
+            _apply(status, event)
+    status["journal_size"] = len(events)
+    return status
+
+
+def _write_snapshot(status: dict):
+    """スナップショットを書き込み（今のスナップショットは前世代として残す）"""
+    snapshot = {key: status[key] for key in ("posted", "current_index", "text_index", "seq")}
+    durable_io.write_json(STATUS_FILE, snapshot, keep_previous=True, indent=2)
+
+
+def compact(status: dict):
+    """
+    ステータスをスナップショットに書き出してジャーナルを空にする
+
+    スナップショットの置き換え後にジャーナルを空にするため、その間に止まっても
+    次回の読み込みでは反映済みのイベントが seq で読み飛ばされる。
+    """
+    _write_snapshot(status)
+    if JOURNAL_FILE.exists():
+        durable_io.write_text(JOURNAL_FILE, "", keep_previous=True)
+    status["journal_size"] = 0
+
+
+def _append(status: dict, event: dict):
+    """イベントをジャーナルに追記してステータスに適用"""
+    event = {"seq": status["seq"] + 1, **event}
+    durable_io.append_line(JOURNAL_FILE, json.dumps(event, ensure_ascii=False))
+    _apply(status, event)
+    status["journal_size"] = status.get("journal_size", 0) + 1
+
+    if status["journal_size"] >= STATUS_COMPACT_EVERY:
+        compact(status)
+
+
+def record_post(status: dict, name: str, text_index: int):
+    """
+    投稿を記録
+
+    Args:
+        status: load_status の結果（記録後の状態に更新される）
+        name: 投稿したペアの名前
+        text_index: 次に使うテキストインデックス
+    """
+    _append(status, {"event": "posted", "name": name, "text_index": text_index})
+
+
+def record_reset(status: dict):
+    """投稿済みの一覧をリセット（全て投稿済みになった場合）"""
+    _append(status, {"event": "reset"})
+
+
+if __name__ == "__main__":
+    status = load_status()
+    if len(sys.argv) > 1 and sys.argv[1] == "compact":
+        compact(status)
+        print(f"コンパクションしました: {STATUS_FILE.name}（{len(status['posted'])}件）")
+    else:
+        print(f"=== 投稿ステータス ===")
+        print(f"  投稿済み: {len(status['posted'])}件")
+        print(f"  次のテキストインデックス: {status['text_index']}")
+        print(f"  ジャーナル: {status['journal_size']}件（{STATUS_COMPACT_EVERY}件でコンパクション）")
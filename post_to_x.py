@@ -9,15 +9,23 @@ Instagram と Threads にも投稿します。
 - サムネイル画像をXに投稿（+ リプライとしてブラー動画を投稿）
 - サムネイル画像をInstagramに投稿（画像のみ）
 - サムネイル画像をThreadsに投稿（画像+テキスト）
-- ステータスファイルで投稿済みを管理
+- ステータス（post_status.py のジャーナル）で投稿済みを管理（次の投稿対象は pair_catalog.py のカタログから取得）
+- 先読みキュー（prefetch_queue.py）に準備済みのペアがあれば優先して投稿し、投稿後に補充
+- 投稿テキストはテキストプール（text_pool.py）に生成済みのものを使い、投稿後に補充
+  （プールにない場合は投稿前にその1件だけ生成）
+- imgBB にアップロード済みの画像は imgbb_cache.json で再利用（再実行時の再アップロードを省略）
 - 一度の実行で1セットを投稿
 """
 
 import json
 import os
 import sys
+import threading
 import time
-import base64
+import hashlib
+import io
+import mimetypes
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from dotenv import load_dotenv
 import tweepy
@@ -26,12 +34,37 @@ from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from PIL import Image
 from generate_post_text import generate_post_text_gemini
+from extract_thumbnails import PLATFORM_BYTE_BUDGETS, THUMBNAIL_SUFFIXES, encode_image
+import download_next_post_files
+import durable_io
+import http_client
+import instagram_image
+import media_probe
+import pair_catalog
+import post_status
+import prefetch_queue
+import text_pool
 import tweet_manager
 
 # 設定ファイルのパス
-STATUS_FILE = Path(__file__).parent / "post_status.json"
 TEXTS_FILE = Path(__file__).parent / "post_texts.txt"
 TEXTS_EN_FILE = Path(__file__).parent / "post_texts_en.txt"
+# imgBB にアップロード済みの画像URLのキャッシュ（画像内容のハッシュ -> URL）
+IMGBB_CACHE_FILE = Path(__file__).parent / "imgbb_cache.json"
+# X メディアアップロードの同時実行数
+X_UPLOAD_WORKERS = int(os.getenv("X_UPLOAD_WORKERS", "6"))
+# Graph API のベースURL（mock_graph_api.py でのオフライン検証時に差し替え可能）
+INSTAGRAM_API_BASE = os.getenv("INSTAGRAM_API_BASE", "https://graph.instagram.com/v22.0")
+THREADS_API_BASE = os.getenv("THREADS_API_BASE", "https://graph.threads.net/v1.0")
+# メディアコンテナの処理完了待ちの上限（秒）
+CONTAINER_WAIT_TIMEOUT = float(os.getenv("CONTAINER_WAIT_TIMEOUT", "120"))
+# imgBB アップロードのタイムアウト（基本値 + ファイルサイズ / 想定する最低転送速度）
+IMGBB_TIMEOUT_BASE = float(os.getenv("IMGBB_TIMEOUT_BASE", "30"))
+IMGBB_MIN_BYTES_PER_SEC = int(os.getenv("IMGBB_MIN_BYTES_PER_SEC", str(256 * 1024)))
+# imgBB 上の画像の保存期間（秒、0: 無期限）
+IMGBB_EXPIRATION = int(os.getenv("IMGBB_EXPIRATION", "0"))
+# アップロード済みURLを再利用する期間（日）
+IMGBB_CACHE_TTL_DAYS = float(os.getenv("IMGBB_CACHE_TTL_DAYS", "30"))
 # META_TOKENS_FILE は Gist管理にするため削除
 
 
@@ -157,7 +190,7 @@ def load_tokens_from_gist(gist_id: str, token: str) -> dict | None:
             "Authorization": f"token {token}",
             "Accept": "application/vnd.github.v3+json"
         }
-        res = requests.get(url, headers=headers, timeout=30)
+        res = http_client.get(url, headers=headers, timeout=30)
         res.raise_for_status()
         
         data = res.json()
@@ -193,7 +226,7 @@ def save_tokens_to_gist(tokens: dict, gist_id: str, token: str):
             }
         }
         
-        res = requests.patch(url, headers=headers, json=payload, timeout=30)
+        res = http_client.patch(url, headers=headers, json=payload, timeout=30)
         res.raise_for_status()
         print("  ✓ Gistを更新しました")
         
@@ -254,13 +287,13 @@ def refresh_access_token_api(platform: str, token: str) -> str | None:
             # Threadsは th_refresh_token の可能性があるため、エラーなら再試行するロジックを入れても良いが
             # 現状は ig_refresh_token で試行。
             
-        res = requests.get(url, params=params, timeout=30)
+        res = http_client.get(url, params=params, timeout=30)
         
         if res.status_code != 200:
             # Threadsの場合、th_refresh_tokenを試す
             if platform == "threads":
                 params["grant_type"] = "th_refresh_token"
-                res = requests.get(url, params=params, timeout=30)
+                res = http_client.get(url, params=params, timeout=30)
         
         if res.status_code == 200:
             data = res.json()
@@ -301,20 +334,6 @@ def get_twitter_client(config: dict) -> tuple[tweepy.Client, tweepy.API]:
     return client, api
 
 
-def load_status() -> dict:
-    """ステータスファイルを読み込み"""
-    if STATUS_FILE.exists():
-        with open(STATUS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"posted": [], "current_index": 0, "text_index": 0}
-
-
-def save_status(status: dict):
-    """ステータスファイルを保存"""
-    with open(STATUS_FILE, "w", encoding="utf-8") as f:
-        json.dump(status, f, ensure_ascii=False, indent=2)
-
-
 def get_file_pairs(thumbnails_path: Path, originals_path: Path) -> list[dict]:
     """サムネイルとオリジナル動画のペアを取得"""
     pairs = []
@@ -324,11 +343,17 @@ def get_file_pairs(thumbnails_path: Path, originals_path: Path) -> list[dict]:
         print(f"ディレクトリが見つかりません: {thumbnails_path} または {originals_path}")
         return []
     
-    # サムネイルファイルを取得
+    # サムネイルファイルを取得（PNG / JPEG / WebP）
     thumbnail_files = sorted([f for f in thumbnails_path.iterdir() 
-                              if f.is_file() and f.suffix.lower() == ".png"])
+                              if f.is_file() and f.suffix.lower() in THUMBNAIL_SUFFIXES])
     
+    seen = set()
     for thumbnail in thumbnail_files:
+        # 同じ名前で複数形式ある場合は最初の1つを使用
+        if thumbnail.stem in seen:
+            continue
+        seen.add(thumbnail.stem)
+        
         # 対応するオリジナル動画を探す
         video_name = thumbnail.stem + ".mp4"
         video_path = originals_path / video_name
@@ -343,6 +368,56 @@ def get_file_pairs(thumbnails_path: Path, originals_path: Path) -> list[dict]:
     return pairs
 
 
+def get_next_local_pair(thumbnails_path: Path, originals_path: Path,
+                        status: dict) -> tuple[dict | None, int]:
+    """
+    ローカルのフォルダから次に投稿するペアを取得
+
+    ペアの一覧は pair_catalog に保存しておき、フォルダが変更された場合
+    （更新日時が変わった場合）のみ get_file_pairs で作り直す。
+    全て投稿済みの場合はステータスをリセットして最初から投稿する。
+
+    Returns:
+        (次に投稿するペア, 全ペア数)。ペアがない場合は (None, 0)
+    """
+    source = f"local:{thumbnails_path.resolve()}:{originals_path.resolve()}"
+    fingerprint = pair_catalog.directory_fingerprint(thumbnails_path, originals_path)
+    if pair_catalog.needs_refresh(source, fingerprint):
+        added, removed = pair_catalog.replace_pairs(
+            source, get_file_pairs(thumbnails_path, originals_path), fingerprint
+        )
+        print(f"ペアカタログを更新: 追加 {added}件, 削除 {removed}件")
+    pair_catalog.sync_posted(status["posted"])
+
+    total, pending = pair_catalog.get_counts(source)
+    pairs = pair_catalog.next_pending(source)
+    if bool(pairs) != (pending > 0):
+        # トリガーで保持している件数が実際のペアと食い違っている場合は集計し直す
+        print("警告: ペアカタログの件数が一致しないため、集計し直します")
+        pair_catalog.recount()
+        total, pending = pair_catalog.get_counts(source)
+    if total == 0:
+        return None, 0
+    print(f"検出されたファイルペア: {total}セット")
+
+    if not pairs:
+        print("\n全てのファイルが投稿済みです。リセットして最初から投稿を開始します。")
+        post_status.record_reset(status)
+        pair_catalog.sync_posted(status["posted"])
+        total, pending = pair_catalog.get_counts(source)
+        pairs = pair_catalog.next_pending(source)
+        if not pairs:
+            return None, 0
+
+    print(f"未投稿: {pending}セット")
+    pair = pairs[0]
+    return {
+        "name": pair["name"],
+        "thumbnail": Path(pair["thumbnail"]),
+        "video": Path(pair["video"]),
+    }, total
+
+
 def load_post_texts(file_path: Path = None, default_text: str = "🎬 新着動画プレビュー") -> list[str]:
     """投稿テキストのストックを読み込み"""
     if file_path is None:
@@ -372,34 +447,19 @@ def get_next_text(texts: list[str], status: dict) -> tuple[str, int]:
     return texts[text_index], text_index
 
 
-def upload_media(api: tweepy.API, file_path: Path, media_type: str = "image") -> str:
-    """メディアをアップロードしてmedia_idを取得"""
+def start_media_upload(api: tweepy.API, file_path: Path, media_type: str = "image") -> str:
+    """メディアをアップロードしてmedia_idを取得（動画のサーバー側処理は待たない）"""
     print(f"  アップロード中: {file_path.name}")
     
     if media_type == "video":
         # 動画アップロード（チャンク形式）
+        # 処理完了待ちは wait_for_media_processing でまとめて行う
         media = api.media_upload(
             filename=str(file_path),
             media_category="tweet_video",
-            chunked=True
+            chunked=True,
+            wait_for_async_finalize=False
         )
-        
-        # 動画処理完了を待つ
-        print("  動画処理中...")
-        while True:
-            status = api.get_media_upload_status(media.media_id)
-            if hasattr(status, 'processing_info'):
-                state = status.processing_info.get('state')
-                if state == 'succeeded':
-                    break
-                elif state == 'failed':
-                    error = status.processing_info.get('error', {})
-                    raise Exception(f"動画処理失敗: {error}")
-                else:
-                    wait_secs = status.processing_info.get('check_after_secs', 5)
-                    time.sleep(wait_secs)
-            else:
-                break
     else:
         # 画像アップロード
         media = api.media_upload(filename=str(file_path))
@@ -408,6 +468,101 @@ def upload_media(api: tweepy.API, file_path: Path, media_type: str = "image") ->
     return str(media.media_id)
 
 
+def wait_for_media_processing(api: tweepy.API, media_ids: list[str]) -> dict[str, Exception]:
+    """
+    複数動画のサーバー側処理が完了するまでまとめて待つ
+    
+    Returns:
+        処理に失敗した（状態を確認できなかった場合を含む）media_id と例外の辞書
+    """
+    failures = {}
+    pending = list(media_ids)
+    
+    if pending:
+        print(f"  動画処理中... ({len(pending)}件)")
+    
+    while pending:
+        wait_secs = None
+        for media_id in list(pending):
+            try:
+                status = api.get_media_upload_status(media_id)
+            except Exception as e:
+                # 1件の確認エラーで他のセット（メイン投稿など）を止めない
+                failures[media_id] = e
+                pending.remove(media_id)
+                continue
+            if not hasattr(status, 'processing_info'):
+                pending.remove(media_id)
+                continue
+            
+            state = status.processing_info.get('state')
+            if state == 'succeeded':
+                pending.remove(media_id)
+            elif state == 'failed':
+                error = status.processing_info.get('error', {})
+                failures[media_id] = Exception(f"動画処理失敗: {error}")
+                pending.remove(media_id)
+            else:
+                check_after = status.processing_info.get('check_after_secs', 5)
+                wait_secs = check_after if wait_secs is None else min(wait_secs, check_after)
+        
+        if pending:
+            time.sleep(wait_secs)
+    
+    return failures
+
+
+def upload_media_sets(api: tweepy.API, thumbnail_path: Path, video_path: Path,
+                      count: int, max_workers: int = X_UPLOAD_WORKERS) -> list:
+    """
+    画像+動画のセットを count 個分、同時にアップロードする
+    （同じmedia_idは別ツイートで再利用できないため、ツイートごとに1セット必要）
+    
+    全アップロードをワーカープールで並列に開始し、
+    動画の処理完了はまとめて待機する。
+    
+    Returns:
+        セットごとの (画像ID, 動画ID)、失敗したセットは例外
+    """
+    jobs = [
+        (index, media_type, path)
+        for index in range(count)
+        for media_type, path in (("image", thumbnail_path), ("video", video_path))
+    ]
+    
+    media = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+        futures = {
+            executor.submit(start_media_upload, api, path, media_type): (index, media_type)
+            for index, media_type, path in jobs
+        }
+        for future in as_completed(futures):
+            try:
+                media[futures[future]] = future.result()
+            except Exception as e:
+                media[futures[future]] = e
+    
+    # 動画の処理完了をまとめて待つ
+    video_ids = [media[(index, "video")] for index in range(count)
+                 if isinstance(media[(index, "video")], str)]
+    failures = wait_for_media_processing(api, video_ids)
+    
+    sets = []
+    for index in range(count):
+        image_id = media[(index, "image")]
+        video_id = media[(index, "video")]
+        if isinstance(image_id, Exception):
+            sets.append(image_id)
+        elif isinstance(video_id, Exception):
+            sets.append(video_id)
+        elif video_id in failures:
+            sets.append(failures[video_id])
+        else:
+            sets.append((image_id, video_id))
+    
+    return sets
+
+
 def post_to_x(client: tweepy.Client, api: tweepy.API, 
               thumbnail_path: Path, video_path: Path,
               thumbnail_text: str = "", video_text: str = "",
@@ -427,16 +582,17 @@ def post_to_x(client: tweepy.Client, api: tweepy.API,
         "2010978695356219537",
     ]
     
-    # 1. サムネイル画像をアップロード
+    # 1. メインツイート + 各コミュニティ分のメディアを同時にアップロード
     print("\n[X 1/2] メディアをアップロード...")
-    thumbnail_media_id = upload_media(api, thumbnail_path, "image")
-    print(f"  画像ID: {thumbnail_media_id}")
+    media_sets = upload_media_sets(api, thumbnail_path, video_path, 1 + len(COMMUNITY_IDS))
     
-    # 2. 動画をアップロード
-    video_media_id = upload_media(api, video_path, "video")
+    if isinstance(media_sets[0], Exception):
+        raise media_sets[0]
+    thumbnail_media_id, video_media_id = media_sets[0]
+    print(f"  画像ID: {thumbnail_media_id}")
     print(f"  動画ID: {video_media_id}")
     
-    # 3. メインツイートを投稿
+    # 2. メインツイートを投稿
     print("[X 2/2] ツイート投稿...")
     # 画像と動画を同時に添付（Mixed Media）
     response = client.create_tweet(
@@ -449,15 +605,14 @@ def post_to_x(client: tweepy.Client, api: tweepy.API,
     
     print(f"  ✓ 投稿完了: https://twitter.com/i/status/{tweet_id}")
     
-    # 4. コミュニティにも投稿
+    # 3. コミュニティにも投稿（メディアはアップロード済み）
     result["community_posts"] = []
-    for community_id in COMMUNITY_IDS:
+    for community_id, media_set in zip(COMMUNITY_IDS, media_sets[1:]):
         try:
             print(f"\n[X Community] コミュニティ {community_id} に投稿中...")
-            # コミュニティ投稿用にメディアを再アップロード
-            # （同じmedia_idは別ツイートで再利用できないため）
-            cm_thumbnail_media_id = upload_media(api, thumbnail_path, "image")
-            cm_video_media_id = upload_media(api, video_path, "video")
+            if isinstance(media_set, Exception):
+                raise media_set
+            cm_thumbnail_media_id, cm_video_media_id = media_set
             
             cm_response = client.create_tweet(
                 text=community_text if community_text else thumbnail_text,
@@ -484,27 +639,73 @@ def post_to_x(client: tweepy.Client, api: tweepy.API,
 # imgBB / Instagram / Threads
 # ============================================================
 
-def upload_to_imgbb(image_path: Path, api_key: str) -> str:
+def upload_timeout(size: int) -> tuple[float, float]:
+    """ファイルサイズに応じたタイムアウト（接続, 読み取り）を計算"""
+    return (10, IMGBB_TIMEOUT_BASE + size / IMGBB_MIN_BYTES_PER_SEC)
+
+
+def print_upload_progress(label: str, step: int = 25):
+    """アップロードの進捗を step% ごとに表示するコールバックを作成"""
+    next_percent = step
+    
+    def progress(sent: int, total: int):
+        nonlocal next_percent
+        percent = sent * 100 // total
+        if percent >= next_percent:
+            print(f"  [{label}] 送信中... {percent}% ({sent / 1024:.0f}/{total / 1024:.0f}KB)")
+            while next_percent <= percent:
+                next_percent += step
+    
+    return progress
+
+
+def upload_to_imgbb(image: Path | bytes, api_key: str, progress=None,
+                    name: str | None = None) -> str:
     """
     画像をimgBBにアップロードしてパブリックURLを取得
     
+    画像はbase64に変換せず、multipart/form-data で逐次送信する
+    （ファイルの場合は全体をメモリに読み込まない）。
+    
+    Args:
+        image: 画像のパス、またはエンコード済みの画像データ
+        api_key: imgBB のAPIキー
+        progress: 送信済みバイト数と合計バイト数を受け取るコールバック（None: 25%ごとに表示）
+        name: ファイル名（画像データを渡す場合は必須）
+    
     Returns:
         画像のパブリックURL
     """
-    print(f"\n[imgBB] 画像をアップロード中: {image_path.name}")
+    if isinstance(image, bytes):
+        size = len(image)
+        open_image = lambda: io.BytesIO(image)
+    else:
+        name = name or image.name
+        size = image.stat().st_size
+        open_image = lambda: open(image, "rb")
     
-    with open(image_path, "rb") as f:
-        image_data = base64.b64encode(f.read()).decode("utf-8")
+    print(f"\n[imgBB] 画像をアップロード中: {name}")
     
-    response = requests.post(
-        "https://api.imgbb.com/1/upload",
-        data={
-            "key": api_key,
-            "image": image_data,
-            "name": image_path.stem
-        },
-        timeout=60
-    )
+    if progress is None:
+        progress = print_upload_progress("imgBB")
+    
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    
+    with open_image() as f:
+        fields = {"key": api_key, "name": Path(name).stem}
+        if IMGBB_EXPIRATION > 0:
+            fields["expiration"] = str(IMGBB_EXPIRATION)
+        body = http_client.MultipartStream(
+            fields,
+            "image", f, name, size,
+            file_content_type=content_type, progress=progress
+        )
+        response = http_client.post(
+            "https://api.imgbb.com/1/upload",
+            data=body,
+            headers={"Content-Type": body.content_type},
+            timeout=upload_timeout(size)
+        )
     response.raise_for_status()
     result = response.json()
     
@@ -516,45 +717,184 @@ def upload_to_imgbb(image_path: Path, api_key: str) -> str:
         raise Exception(f"imgBBアップロード失敗: {result}")
 
 
-def resize_image_for_instagram(image_path: Path) -> Path:
+_imgbb_cache_lock = threading.Lock()
+
+
+def load_imgbb_cache() -> dict:
+    """imgBB のURLキャッシュを読み込み（画像内容のハッシュ -> エントリ）"""
+    try:
+        with open(IMGBB_CACHE_FILE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def save_imgbb_cache(cache: dict):
+    """imgBB のURLキャッシュを保存"""
+    durable_io.write_json(IMGBB_CACHE_FILE, cache, indent=2)
+
+
+def upload_to_imgbb_cached(image: Path | bytes, api_key: str,
+                           name: str | None = None) -> str:
     """
-    Instagramのフィード投稿要件（アスペクト比 4:5 ~ 1.91:1）に合わせて画像を調整
-    縦長すぎる画像（9:16など）は、中央で 4:5 にクロップする
+    画像をimgBBにアップロード（同じ内容の画像をアップロード済みならそのURLを再利用）
+    
+    キャッシュは画像内容の SHA-256 をキーにするため、再実行時やファイル名が違っても
+    同じ画像は再アップロードしない。エントリは IMGBB_CACHE_TTL_DAYS
+    （IMGBB_EXPIRATION の方が短ければそちら）で期限切れになる。
+    
+    Args:
+        image: 画像のパス、またはエンコード済みの画像データ
+        name: ファイル名（画像データを渡す場合は必須）
+    
+    Returns:
+        画像のパブリックURL
+    """
+    if isinstance(image, bytes):
+        digest = hashlib.sha256(image).hexdigest()
+    else:
+        name = name or image.name
+        digest = media_probe.file_hash(image)
+    now = time.time()
+    
+    with _imgbb_cache_lock:
+        entry = load_imgbb_cache().get(digest)
+    if entry and entry.get("expires_at", 0) > now:
+        print(f"\n[imgBB] アップロード済みの画像を再利用: {name}")
+        print(f"  ✓ URL: {entry['url']}")
+        return entry["url"]
+    
+    url = upload_to_imgbb(image, api_key, name=name)
+    
+    lifetime = IMGBB_CACHE_TTL_DAYS * 86400
+    if IMGBB_EXPIRATION > 0:
+        lifetime = min(lifetime, IMGBB_EXPIRATION)
+    
+    with _imgbb_cache_lock:
+        # 期限切れのエントリは保存時に削除
+        cache = {d: e for d, e in load_imgbb_cache().items()
+                 if e.get("expires_at", 0) > now}
+        cache[digest] = {
+            "url": url,
+            "name": name,
+            "uploaded_at": int(now),
+            "expires_at": int(now + lifetime),
+        }
+        try:
+            save_imgbb_cache(cache)
+        except OSError as e:
+            print(f"警告: imgBBキャッシュの保存に失敗しました: {e}")
+    
+    return url
+
+
+def get_instagram_crop_box(image_path: Path) -> tuple[int, int, int, int] | None:
+    """
+    Instagramのフィード投稿要件（アスペクト比 4:5 ~ 1.91:1）に合わせたクロップ範囲を取得
+    
+    画像のヘッダーからサイズだけを読むため、画像全体はデコードしない。
+    
+    Returns:
+        (left, top, right, bottom)。クロップ不要の場合（または読み込み失敗時）None
     """
     try:
         with Image.open(image_path) as img:
             width, height = img.size
-            aspect_ratio = width / height
-            
-            # Instagramの許容アスペクト比
-            MIN_RATIO = 0.8   # 4:5
-            MAX_RATIO = 1.91  # 1.91:1
-            
-            # アスペクト比が範囲内ならそのまま
-            if MIN_RATIO <= aspect_ratio <= MAX_RATIO:
-                return image_path
-                
-            print(f"⚠️ 画像アスペクト比調整: {aspect_ratio:.2f} -> {MIN_RATIO} (Instagram用)")
-            
-            # 縦長すぎる場合（例: 9:16 = 0.56）-> 上下をカットして 4:5 に
-            if aspect_ratio < MIN_RATIO:
-                new_height = int(width / MIN_RATIO)
-                top = (height - new_height) // 2
-                bottom = top + new_height
-                
-                cropped_img = img.crop((0, top, width, bottom))
-                
-                # 一時ファイルとして保存
-                temp_path = image_path.parent / f"ig_temp_{image_path.name}"
-                cropped_img.save(temp_path)
-                return temp_path
-                
-            # 横長すぎる場合 -> 今回は省略（通常縦長動画のサムネなので発生しにくい）
-            return image_path
-            
     except Exception as e:
-        print(f"警告: 画像リサイズ失敗: {e}")
-        return image_path
+        print(f"警告: 画像サイズの取得失敗: {e}")
+        return None
+    
+    # クロップ範囲は instagram_image の共通ロジックで決定（media_pipeline.py と同じ基準）
+    crop_box = instagram_image.instagram_crop_box(width, height)
+    if crop_box:
+        print(f"⚠️ 画像アスペクト比調整: {width / height:.2f} -> {instagram_image.INSTAGRAM_MIN_RATIO} (Instagram用)")
+    return crop_box
+
+
+def crop_image_for_instagram(image_path: Path, crop_box: tuple[int, int, int, int]) -> bytes:
+    """
+    縦長すぎる画像（9:16など）を中央で 4:5 にクロップし、Instagram用のJPEGにエンコード
+    
+    デコード・クロップ・縮小・エンコードを全てメモリ上で行い、一時ファイルは作らない。
+    
+    Returns:
+        エンコード済みのJPEGデータ
+    """
+    with Image.open(image_path) as img:
+        cropped_img = img.crop(crop_box)
+    
+    # Instagramの最大幅を大きく超える場合は整数倍で縮小（reduce は resize より高速）
+    factor = cropped_img.width // instagram_image.INSTAGRAM_MAX_WIDTH
+    if factor >= 2:
+        cropped_img = cropped_img.reduce(factor)
+    
+    # Instagram Graph API は JPEG のみ対応
+    data, _ = encode_image(cropped_img, "jpeg", PLATFORM_BYTE_BUDGETS["instagram"])
+    return data
+
+
+def wait_for_container(base_url: str, container_id: str, access_token: str,
+                       status_field: str = "status_code", error_field: str = "status",
+                       label: str = "",
+                       timeout: float = None,
+                       initial_interval: float = 1.0, max_interval: float = 8.0):
+    """
+    メディアコンテナの処理完了をポーリングで待つ
+    
+    固定時間の待機ではなく、ステータスが FINISHED になった時点で戻る。
+    ポーリング間隔は initial_interval から max_interval まで徐々に伸ばす。
+    期限までに処理完了を確認できなかったコンテナは公開しない（例外にする）。
+    
+    Args:
+        base_url: Graph API のベースURL
+        container_id: メディアコンテナID
+        access_token: アクセストークン
+        status_field: ステータスのフィールド名（Instagram: status_code, Threads: status）
+        error_field: エラー詳細のフィールド名（Instagram: status, Threads: error_message）
+        label: ログ表示用のプラットフォーム名
+        timeout: 待機上限（秒）。None の場合は CONTAINER_WAIT_TIMEOUT
+    
+    Raises:
+        Exception: コンテナの処理が失敗した場合、または期限までに処理完了を確認できなかった場合
+    """
+    if timeout is None:
+        timeout = CONTAINER_WAIT_TIMEOUT
+    
+    print(f"[{label}] コンテナの処理完了を待機中...")
+    start = time.monotonic()
+    deadline = start + timeout
+    interval = initial_interval
+    
+    while True:
+        try:
+            response = http_client.get(
+                f"{base_url}/{container_id}",
+                params={
+                    "fields": f"{status_field},{error_field}",
+                    "access_token": access_token
+                },
+                timeout=30
+            )
+            response.raise_for_status()
+            data = response.json()
+            status = data.get(status_field)
+            
+            if status in ("FINISHED", "PUBLISHED"):
+                print(f"  ✓ 処理完了 ({time.monotonic() - start:.1f}秒)")
+                return
+            if status in ("ERROR", "EXPIRED"):
+                raise Exception(f"コンテナ処理失敗: {status} {data.get(error_field, '')}".strip())
+        except requests.exceptions.RequestException as e:
+            # 一時的な取得失敗は期限までポーリングを続ける
+            print(f"  ステータス取得エラー: {e}")
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise Exception(f"{timeout:g}秒以内にコンテナの処理完了を確認できませんでした")
+        
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 1.5, max_interval)
 
 
 def post_to_instagram(image_url: str, caption: str, 
@@ -571,12 +911,11 @@ def post_to_instagram(image_url: str, caption: str,
     Returns:
         投稿のメディアID
     """
-    api_version = "v22.0"
-    base_url = f"https://graph.instagram.com/{api_version}"
+    base_url = INSTAGRAM_API_BASE
     
     # Step 1: メディアコンテナを作成
     print("\n[Instagram 1/2] メディアコンテナを作成中...")
-    response = requests.post(
+    response = http_client.post(
         f"{base_url}/{user_id}/media",
         data={
             "image_url": image_url,
@@ -589,13 +928,14 @@ def post_to_instagram(image_url: str, caption: str,
     container_id = response.json()["id"]
     print(f"  ✓ コンテナ作成完了: {container_id}")
     
-    # 処理完了を待つ
-    print("[Instagram] 画像処理中（10秒待機）...")
-    time.sleep(10)
+    # 処理完了を待つ（確認できなければ公開せずに例外）
+    wait_for_container(base_url, container_id, access_token,
+                       status_field="status_code", error_field="status",
+                       label="Instagram")
     
     # Step 2: 公開
     print("[Instagram 2/2] 投稿を公開中...")
-    response = requests.post(
+    response = http_client.post(
         f"{base_url}/{user_id}/media_publish",
         data={
             "creation_id": container_id,
@@ -624,7 +964,7 @@ def post_to_threads(image_url: str, text: str,
     Returns:
         投稿のメディアID
     """
-    base_url = "https://graph.threads.net/v1.0"
+    base_url = THREADS_API_BASE
     
     # Step 1: メディアコンテナを作成
     print("\n[Threads 1/2] メディアコンテナを作成中...")
@@ -634,7 +974,7 @@ def post_to_threads(image_url: str, text: str,
     
     for attempt in range(max_retries):
         try:
-            response = requests.post(
+            response = http_client.post(
                 f"{base_url}/{user_id}/threads",
                 data={
                     "media_type": "IMAGE",
@@ -656,13 +996,14 @@ def post_to_threads(image_url: str, text: str,
                 raise
 
     
-    # Metaのサーバーが処理する時間を確保（公式推奨: 30秒）
-    print("[Threads] 画像処理中（30秒待機）...")
-    time.sleep(30)
+    # Metaのサーバーが処理を終えるまでステータスをポーリング（確認できなければ公開せずに例外）
+    wait_for_container(base_url, container_id, access_token,
+                       status_field="status", error_field="error_message",
+                       label="Threads")
     
     # Step 2: 公開
     print("[Threads 2/2] 投稿を公開中...")
-    response = requests.post(
+    response = http_client.post(
         f"{base_url}/{user_id}/threads_publish",
         data={
             "creation_id": container_id,
@@ -695,6 +1036,151 @@ def can_post_threads(config: dict) -> bool:
     )
 
 
+def prepare_image_url(image_path: Path, api_key: str, label: str,
+                      crop_box: tuple[int, int, int, int] | None = None) -> str | None:
+    """
+    投稿用画像をimgBBにアップロードしてパブリックURLを取得
+    
+    Args:
+        crop_box: 指定時はメモリ上でクロップしたJPEGをアップロード（get_instagram_crop_box の結果）
+    
+    Returns:
+        画像のパブリックURL（失敗時None）
+    """
+    image = image_path
+    name = None
+    if crop_box:
+        try:
+            image = crop_image_for_instagram(image_path, crop_box)
+            name = f"{image_path.stem}_ig.jpg"
+        except Exception as e:
+            # クロップに失敗した場合は元の画像をそのまま使用
+            print(f"警告: 画像リサイズ失敗: {e}")
+    
+    try:
+        return upload_to_imgbb_cached(image, api_key, name=name)
+    except Exception as e:
+        print(f"{label}用画像準備エラー: {e}")
+        return None
+
+
+def run_x_pipeline(config: dict, next_pair: dict,
+                   post_text: str, community_text: str) -> dict | None:
+    """X への投稿処理（失敗時None）"""
+    try:
+        print("\n" + "=" * 50)
+        print("📘 X (Twitter) に投稿中...")
+        print("=" * 50)
+        
+        client, api = get_twitter_client(config)
+        
+        return post_to_x(
+            client, api,
+            next_pair["thumbnail"],
+            next_pair["video"],
+            thumbnail_text=post_text,
+            video_text="",
+            community_text=community_text
+        )
+        
+    except tweepy.TweepyException as e:
+        print(f"\n✗ X APIエラー: {e}")
+    except Exception as e:
+        print(f"\n✗ Xエラー: {e}")
+    return None
+
+
+def run_instagram_pipeline(config: dict, image_url_future: Future,
+                           post_text: str) -> dict | None:
+    """Instagram への投稿処理（画像URLの準備完了を待ってから投稿、失敗時None）"""
+    ig_image_url = image_url_future.result()
+    if not ig_image_url:
+        return None
+    
+    try:
+        print("\n" + "=" * 50)
+        print("📷 Instagram に投稿中...")
+        print("=" * 50)
+        
+        # Instagram用キャプション: テキスト + ハッシュタグ（3個まで）
+        ig_caption = f"{post_text}\n\n#裏垢女子 #AI美女 #AIグラビア"
+        
+        ig_media_id = post_to_instagram(
+            image_url=ig_image_url,
+            caption=ig_caption,
+            user_id=config["instagram_user_id"],
+            access_token=config["instagram_access_token"]
+        )
+        return {"media_id": ig_media_id}
+        
+    except requests.exceptions.HTTPError as e:
+        print(f"\n✗ Instagram APIエラー: {e}")
+        if e.response is not None:
+            print(f"  レスポンス: {e.response.text}")
+    except Exception as e:
+        print(f"\n✗ Instagramエラー: {e}")
+    return None
+
+
+def run_threads_pipeline(config: dict, image_url_future: Future,
+                         post_text: str) -> dict | None:
+    """Threads への投稿処理（画像URLの準備完了を待ってから投稿、失敗時None）"""
+    th_image_url = image_url_future.result()
+    if not th_image_url:
+        return None
+    
+    try:
+        print("\n" + "=" * 50)
+        print("🧵 Threads に投稿中...")
+        print("=" * 50)
+        
+        threads_media_id = post_to_threads(
+            image_url=th_image_url,
+            text=post_text,
+            user_id=config["threads_user_id"],
+            access_token=config["threads_access_token"]
+        )
+        return {"media_id": threads_media_id}
+        
+    except requests.exceptions.HTTPError as e:
+        print(f"\n✗ Threads APIエラー: {e}")
+        if e.response is not None:
+            print(f"  レスポンス: {e.response.text}")
+    except Exception as e:
+        print(f"\n✗ Threadsエラー: {e}")
+    return None
+
+
+def refill_text_pool(config: dict, text_index: int, modulus: int):
+    """投稿後にテキストプールを補充（失敗しても投稿結果には影響しない）"""
+    if text_pool.TEXT_POOL_SIZE <= 0 or not config.get("gemini_api_key"):
+        return
+    
+    print(f"\n{'=' * 50}")
+    print("📝 テキストプールを補充中...")
+    print(f"{'=' * 50}")
+    try:
+        text_pool.fill(config["gemini_api_key"], text_pool.upcoming_indices(text_index, modulus))
+    except Exception as e:
+        print(f"⚠ テキストプールの補充に失敗しました: {e}")
+
+
+def refill_prefetch_queue(posted_names: list[str]):
+    """投稿後に先読みキューを補充（失敗しても投稿結果には影響しない）"""
+    if prefetch_queue.PREFETCH_COUNT <= 0:
+        return
+    if not (os.getenv("GDRIVE_THUMBNAILS_FOLDER_ID") and os.getenv("GDRIVE_ORIGINALS_FOLDER_ID")):
+        return
+    
+    print(f"\n{'=' * 50}")
+    print("📥 先読みキューを補充中...")
+    print(f"{'=' * 50}")
+    try:
+        download_next_post_files.prefetch(prefetch_queue.PREFETCH_COUNT, posted_names)
+    except (Exception, SystemExit) as e:
+        print(f"⚠ 先読みキューの補充に失敗しました: {e}")
+
+
 def main():
     """メイン処理"""
     print("=== SNS投稿スクリプト (X / Instagram / Threads) ===\n")
@@ -716,33 +1202,26 @@ def main():
     print(f"投稿先: {', '.join(platforms)}\n")
     
     # ステータスを読み込み
-    status = load_status()
-    
-    # ファイルペアを取得
-    pairs = get_file_pairs(config["thumbnails_path"], config["originals_path"])
+    status = post_status.load_status()
     
-    if not pairs:
-        print("エラー: 投稿可能なファイルペアが見つかりません。")
-        return
-    
-    print(f"検出されたファイルペア: {len(pairs)}セット")
-    
-    # 未投稿のペアを探す
     posted_names = set(status["posted"])
-    unpaired = [p for p in pairs if p["name"] not in posted_names]
     
-    if not unpaired:
-        print("\n全てのファイルが投稿済みです。リセットして最初から投稿を開始します。")
-        status["posted"] = []
-        status["current_index"] = 0
-        save_status(status)
-        unpaired = pairs
-
+    # 先読みキューに準備済みのペアがあればそれを使用（ディレクトリの走査も不要）
+    total_pairs = None
+    prefetched = prefetch_queue.ready_pairs(posted_names)
     
-    print(f"未投稿: {len(unpaired)}セット")
-    
-    # 次に投稿するペアを取得
-    next_pair = unpaired[0]
+    if prefetched:
+        print(f"先読みキュー: {len(prefetched)}セット準備済み")
+        next_pair = prefetched[0]
+    else:
+        # ペアカタログから次の未投稿ペアを取得
+        next_pair, total_pairs = get_next_local_pair(
+            config["thumbnails_path"], config["originals_path"], status
+        )
+        
+        if not next_pair:
+            print("エラー: 投稿可能なファイルペアが見つかりません。")
+            return
     
     print(f"\n--- 投稿対象 ---")
     print(f"名前: {next_pair['name']}")
@@ -753,9 +1232,24 @@ def main():
     texts_fallback = load_post_texts()
     _, text_index = get_next_text(texts_fallback, status)
     
-    # 日本語投稿テキストをGemini APIで生成
+    # 日本語投稿テキストはテキストプールの生成済みのものを使用（Gemini APIの応答を待たない）
     post_text = None
-    if config.get("gemini_api_key"):
+    if text_pool.TEXT_POOL_SIZE > 0:
+        post_text = text_pool.get_text(text_index)
+        if not post_text and config.get("gemini_api_key"):
+            # キャッシュがない初回などでプールにない場合は、この投稿の分だけ先に生成
+            # （残りは投稿後の補充で生成）
+            print("\n🤖 テキストプールに生成済みのテキストがないため、この投稿の分を生成中...")
+            try:
+                text_pool.fill(config["gemini_api_key"], [text_index])
+            except Exception as e:
+                print(f"⚠ テキストの生成に失敗しました: {e}")
+            post_text = text_pool.get_text(text_index)
+        if post_text:
+            print("\n🤖 テキストプールの生成済みテキストを使用")
+        else:
+            print("\nℹ️ テキストプールに生成済みのテキストがありません")
+    elif config.get("gemini_api_key"):
         print("\n🤖 Gemini APIで妄想会話テキストを生成中...")
         post_text = generate_post_text_gemini(
             api_key=config["gemini_api_key"],
@@ -774,136 +1268,89 @@ def main():
     community_text, _ = get_next_text(texts_en, status)
     print(f"投稿テキスト (EN/Community): {community_text}")
     
-    # 各プラットフォームの投稿結果を記録
-    results = {}
-    has_error = False
-    
-    # ========== X (Twitter) ==========
-    try:
-        print("\n" + "=" * 50)
-        print("📘 X (Twitter) に投稿中...")
-        print("=" * 50)
+    # ========== 各プラットフォームへ並列に投稿 ==========
+    # X / Instagram / Threads は互いに依存しないため同時に実行し、
+    # 全体の所要時間を最も遅いプラットフォームの時間に抑える
+    thumbnail = next_pair["thumbnail"]
+    futures = {}
+    
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        # 画像をパブリックURLにアップロード (imgBB)
+        # InstagramとThreadsの仕様に合わせて、それぞれ最適な画像をアップロードする
+        # （パイプラインより先に投入し、ワーカーを待ち合わせで埋めないようにする）
+        ig_url_future = None
+        th_url_future = None
         
-        client, api = get_twitter_client(config)
+        ig_image = thumbnail
+        ig_crop_box = None
+        if can_post_instagram(config):
+            # media_pipeline.py --instagram でクロップ済みの画像があればそのまま使う
+            ig_image = instagram_image.find_instagram_image(thumbnail) or thumbnail
+            if ig_image == thumbnail:
+                # アスペクト比調整（クロップの要否はヘッダーのみで判定し、
+                # デコードとクロップはワーカー内のメモリ上で1回だけ行う）
+                ig_crop_box = get_instagram_crop_box(thumbnail)
+            ig_url_future = executor.submit(
+                prepare_image_url, ig_image, config["imgbb_api_key"], "Instagram",
+                crop_box=ig_crop_box
+            )
         
-        x_result = post_to_x(
-            client, api,
-            next_pair["thumbnail"],
-            next_pair["video"],
-            thumbnail_text=post_text,
-            video_text="",
-            community_text=community_text
-        )
-        results["x"] = x_result
+        # Threads用画像準備（元の縦長画像でOK）
+        if can_post_threads(config):
+            if ig_url_future and ig_image == thumbnail and ig_crop_box is None:
+                th_url_future = ig_url_future # 同じで良ければ再利用
+            else:
+                th_url_future = executor.submit(
+                    prepare_image_url, thumbnail, config["imgbb_api_key"], "Threads"
+                )
         
-    except tweepy.TweepyException as e:
-        print(f"\n✗ X APIエラー: {e}")
-        has_error = True
-    except Exception as e:
-        print(f"\n✗ Xエラー: {e}")
-        has_error = True
-    
-    # ========== 画像をパブリックURLにアップロード (imgBB) ==========
-    # InstagramとThreadsの仕様に合わせて、それぞれ最適な画像をアップロードする
-    ig_image_url = None
-    th_image_url = None
-    
-    # Instagram用画像準備
-    if can_post_instagram(config):
-        try:
-            # アスペクト比調整
-            ig_image_path = resize_image_for_instagram(next_pair['thumbnail'])
-            ig_image_url = upload_to_imgbb(ig_image_path, config["imgbb_api_key"])
-            
-            # 一時ファイルなら削除
-            if ig_image_path != next_pair['thumbnail']:
-                try:
-                    os.remove(ig_image_path)
-                except:
-                    pass
-        except Exception as e:
-            print(f"Instagram用画像準備エラー: {e}")
-    
-    # Threads用画像準備（元の縦長画像でOK）
-    if can_post_threads(config):
-        if ig_image_url and next_pair['thumbnail'] == resize_image_for_instagram(next_pair['thumbnail']):
-             th_image_url = ig_image_url # 同じで良ければ再利用
-        else:
-            try:
-                th_image_url = upload_to_imgbb(next_pair['thumbnail'], config["imgbb_api_key"])
-            except Exception as e:
-                print(f"Threads用画像準備エラー: {e}")
-    
-    # ========== Instagram ==========
-    if can_post_instagram(config) and ig_image_url:
-        try:
-            print("\n" + "=" * 50)
-            print("📷 Instagram に投稿中...")
-            print("=" * 50)
-            
-            # Instagram用キャプション: テキスト + ハッシュタグ（3個まで）
-            ig_caption = f"{post_text}\n\n#裏垢女子 #AI美女 #AIグラビア"
-            
-            ig_media_id = post_to_instagram(
-                image_url=ig_image_url,
-                caption=ig_caption,
-                user_id=config["instagram_user_id"],
-                access_token=config["instagram_access_token"]
+        futures["x"] = executor.submit(
+            run_x_pipeline, config, next_pair, post_text, community_text
+        )
+        if ig_url_future:
+            futures["instagram"] = executor.submit(
+                run_instagram_pipeline, config, ig_url_future, post_text
             )
-            results["instagram"] = {"media_id": ig_media_id}
-            
-        except requests.exceptions.HTTPError as e:
-            print(f"\n✗ Instagram APIエラー: {e}")
-            if e.response is not None:
-                print(f"  レスポンス: {e.response.text}")
-        except Exception as e:
-            print(f"\n✗ Instagramエラー: {e}")
-    
-    # ========== Threads ==========
-    if can_post_threads(config) and th_image_url:
-        try:
-            print("\n" + "=" * 50)
-            print("🧵 Threads に投稿中...")
-            print("=" * 50)
-            
-            threads_media_id = post_to_threads(
-                image_url=th_image_url,
-                text=post_text,
-                user_id=config["threads_user_id"],
-                access_token=config["threads_access_token"]
+        if th_url_future:
+            futures["threads"] = executor.submit(
+                run_threads_pipeline, config, th_url_future, post_text
             )
-            results["threads"] = {"media_id": threads_media_id}
-            
-        except requests.exceptions.HTTPError as e:
-            print(f"\n✗ Threads APIエラー: {e}")
-            if e.response is not None:
-                print(f"  レスポンス: {e.response.text}")
-        except Exception as e:
-            print(f"\n✗ Threadsエラー: {e}")
+    
+    # 各プラットフォームの投稿結果を記録
+    results = {}
+    for platform, future in futures.items():
+        result = future.result()
+        if result:
+            results[platform] = result
     
     # ========== ステータス更新 ==========
     # X投稿が成功していれば（または少なくとも1つ成功していれば）ステータスを更新
     if results:
-        status["posted"].append(next_pair["name"])
-        status["current_index"] = len(status["posted"])
-        status["text_index"] = (text_index + 1) % len(texts_fallback)
-        save_status(status)
+        post_status.record_post(status, next_pair["name"], (text_index + 1) % len(texts_fallback))
+        pair_catalog.mark_posted(next_pair["name"])
+        # 使用したテキストはプールから削除（一巡後は新しく生成する）
+        text_pool.remove(text_index)
+        
+        # 投稿したペアを先読みキューから削除
+        if prefetched:
+            prefetch_queue.remove(next_pair["name"])
         
         # tweets.json に追加 (Xのみ)
         if "x" in results:
             try:
                 tweet_id = results["x"].get("tweet_id")
                 if tweet_id:
-                    created_at = datetime.now(timezone(timedelta(hours=9))).isoformat()
+                    now = datetime.now(timezone(timedelta(hours=9)))
                     print(f"  💾 DBに追加: ID={tweet_id}")
-                    tweet_manager.add_tweet(tweet_id, created_at, post_text[:50])
+                    tweet_manager.add_tweet(tweet_id, now.isoformat(), post_text[:50],
+                                            created_ts=int(now.timestamp()))
             except Exception as e:
                 print(f"  ⚠ DB追加失敗: {e}")
         
         print(f"\n{'=' * 50}")
         print(f"=== 投稿完了 ===")
         print(f"{'=' * 50}")
-        print(f"進捗: {len(status['posted'])}/{len(pairs)} セット投稿済み")
+        print(f"進捗: {len(status['posted'])}{f'/{total_pairs}' if total_pairs else ''} セット投稿済み")
         print(f"\n投稿結果:")
         if "x" in results:
             print(f"  ✓ X: https://twitter.com/i/status/{results['x']['thumbnail_tweet_id']}")
@@ -917,6 +1364,10 @@ def main():
             print(f"  ✓ Instagram: media_id={results['instagram']['media_id']}")
         if "threads" in results:
             print(f"  ✓ Threads: media_id={results['threads']['media_id']}")
+        
+        # 投稿が終わってから次回以降の分を先読み
+        refill_text_pool(config, status["text_index"], len(texts_fallback))
+        refill_prefetch_queue(status["posted"])
     else:
         print(f"\n✗ 全てのプラットフォームへの投稿に失敗しました。")
         sys.exit(1)
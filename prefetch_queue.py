@@ -0,0 +1,145 @@
+"""
+投稿ファイルの先読みキュー
+
+次に投稿する数セット分のサムネイル・動画・動画メタデータを事前にダウンロードして保持する。
+post_to_x.py はキューの先頭から投稿対象を取り出し、投稿後にキューを補充する
+（Google Drive からのダウンロードが投稿処理の待ち時間に含まれない）。
+
+キューは PREFETCH_DIR に保存する（GitHub Actions では actions/cache で実行間に引き継ぐ）:
+    PREFETCH_DIR/manifest.json      キューの順序とメタデータ
+    PREFETCH_DIR/<名前>/<名前>.png   サムネイル
+    PREFETCH_DIR/<名前>/<名前>.mp4   動画
+
+設定（環境変数）:
+- PREFETCH_DIR: キューの保存先（デフォルト: スクリプトと同じフォルダの .cache/prefetch）
+- PREFETCH_COUNT: 先読みするセット数（デフォルト: 3、0で無効）
+
+使い方:
+    python prefetch_queue.py   # キューの内容を表示
+"""
+
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import durable_io
+
+PREFETCH_DIR = Path(os.getenv("PREFETCH_DIR", Path(__file__).parent / ".cache" / "prefetch"))
+PREFETCH_COUNT = int(os.getenv("PREFETCH_COUNT", "3"))
+
+MANIFEST_FILE_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def item_dir(name: str) -> Path:
+    """キュー内の1セット分のフォルダ"""
+    return PREFETCH_DIR / name
+
+
+def load_queue() -> list[dict]:
+    """
+    キューを読み込み
+
+    Returns:
+        エントリのリスト（先頭が次の投稿対象）
+        - name: ペアの名前
+        - thumbnail / video: PREFETCH_DIR からの相対パス
+        - metadata: 動画のメタデータ（media_probe、取得できなかった場合None）
+        - fetched_at: ダウンロード日時（UNIX時間）
+    """
+    try:
+        with open(PREFETCH_DIR / MANIFEST_FILE_NAME, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return []
+    return manifest.get("items", [])
+
+
+def save_queue(items: list[dict]):
+    """キューを保存"""
+    PREFETCH_DIR.mkdir(parents=True, exist_ok=True)
+    durable_io.write_json(PREFETCH_DIR / MANIFEST_FILE_NAME,
+                          {"version": MANIFEST_VERSION, "items": items}, indent=2)
+
+
+def is_ready(item: dict) -> bool:
+    """エントリのファイルが揃っているか"""
+    return all((PREFETCH_DIR / item[key]).is_file() for key in ("thumbnail", "video"))
+
+
+def ready_pairs(posted: set[str]) -> list[dict]:
+    """
+    投稿可能なペアを取得（投稿済み・ファイル欠損のエントリは除外）
+
+    Returns:
+        post_to_x.get_file_pairs と同じ形式のペア（+ metadata）のリスト
+    """
+    return [
+        {
+            "name": item["name"],
+            "thumbnail": PREFETCH_DIR / item["thumbnail"],
+            "video": PREFETCH_DIR / item["video"],
+            "metadata": item.get("metadata"),
+        }
+        for item in load_queue()
+        if item["name"] not in posted and is_ready(item)
+    ]
+
+
+def add(name: str, thumbnail: Path, video: Path, metadata: dict | None = None):
+    """ダウンロード済みのペアをキューの末尾に追加"""
+    items = [item for item in load_queue() if item["name"] != name]
+    items.append({
+        "name": name,
+        "thumbnail": thumbnail.relative_to(PREFETCH_DIR).as_posix(),
+        "video": video.relative_to(PREFETCH_DIR).as_posix(),
+        "metadata": metadata,
+        "fetched_at": int(time.time()),
+    })
+    save_queue(items)
+
+
+def remove(name: str):
+    """キューからペアを削除（ファイルも削除）"""
+    items = load_queue()
+    remaining = [item for item in items if item["name"] != name]
+    if len(remaining) != len(items):
+        save_queue(remaining)
+    shutil.rmtree(item_dir(name), ignore_errors=True)
+
+
+def prune(posted: set[str]) -> list[dict]:
+    """
+    投稿済み・ファイル欠損のエントリと、投稿済みのペアのフォルダを削除
+
+    キューにない未投稿のフォルダ（ダウンロード途中のもの）は、次回に再開できるよう残す。
+
+    Returns:
+        残ったエントリのリスト
+    """
+    items = load_queue()
+    kept = [item for item in items if item["name"] not in posted and is_ready(item)]
+    if len(kept) != len(items):
+        save_queue(kept)
+
+    if PREFETCH_DIR.exists():
+        for path in PREFETCH_DIR.iterdir():
+            if path.is_dir() and path.name in posted:
+                shutil.rmtree(path, ignore_errors=True)
+    return kept
+
+
+if __name__ == "__main__":
+    items = load_queue()
+    print(f"=== 先読みキュー ({PREFETCH_DIR}) ===")
+    if not items:
+        print("空です。")
+    for i, item in enumerate(items, 1):
+        state = "準備完了" if is_ready(item) else "ファイル欠損"
+        metadata = item.get("metadata") or {}
+        duration = f"{metadata['duration']:.1f}秒" if metadata.get("duration") else "-"
+        print(f"  {i}. {item['name']} ({state}, {duration})")
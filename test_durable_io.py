@@ -0,0 +1,253 @@
+"""
+書き込み途中の障害に対する復旧のテスト
+
+書き込みの途中で例外やプロセスの強制終了を起こし、
+durable_io / post_status / tweet_manager が前世代から復旧するか、
+CorruptFileError で処理を止めることを確認する。
+
+使い方:
+    python -m pytest -q test_durable_io.py
+"""
+
+import json
+import os
+import stat
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+import durable_io
+import post_status
+import tweet_manager
+
+
+@pytest.fixture
+def status_files(tmp_path, monkeypatch):
+    """post_status の保存先を一時フォルダにする"""
+    monkeypatch.setattr(post_status, "STATUS_FILE", tmp_path / "post_status.json")
+    monkeypatch.setattr(post_status, "JOURNAL_FILE", tmp_path / "post_status.journal")
+    monkeypatch.setattr(post_status, "STATUS_COMPACT_EVERY", 3)
+    return tmp_path
+
+
+@pytest.fixture
+def tweet_files(tmp_path, monkeypatch):
+    """tweet_manager の保存先を一時フォルダにする"""
+    monkeypatch.setattr(tweet_manager, "TWEETS_FILE", tmp_path / "tweets.json")
+    monkeypatch.setattr(tweet_manager, "TWEETS_JOURNAL", tmp_path / "tweets.journal")
+    monkeypatch.setattr(tweet_manager, "TWEETS_DB", tmp_path / ".cache" / "tweets.db")
+    monkeypatch.setattr(tweet_manager, "TWEETS_COMPACT_EVERY", 3)
+    return tmp_path
+
+
+def _record_posts(count: int) -> dict:
+    status = post_status.load_status()
+    for i in range(count):
+        post_status.record_post(status, f"pair{i}", i + 1)
+    return status
+
+
+def _truncate(path: Path):
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) // 2])
+
+
+# --- durable_io.write_bytes ---
+
+def test_fsync_failure_keeps_target(tmp_path, monkeypatch):
+    """一時ファイルの fsync で失敗しても元のファイルが残り、一時ファイルは消える"""
+    target = tmp_path / "data.json"
+    durable_io.write_json(target, {"value": 1})
+
+    def failing_fsync(fd):
+        raise OSError("fsync failed")
+
+    monkeypatch.setattr(durable_io.os, "fsync", failing_fsync)
+    with pytest.raises(OSError):
+        durable_io.write_json(target, {"value": 2}, keep_previous=True)
+
+    assert json.loads(target.read_text(encoding="utf-8")) == {"value": 1}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["data.json"]
+
+
+def test_replace_failure_keeps_target(tmp_path, monkeypatch):
+    """置き換えの直前で失敗しても元のファイルが残り、一時ファイルは消える"""
+    target = tmp_path / "data.json"
+    durable_io.write_json(target, {"value": 1})
+    real_replace = os.replace
+
+    def failing_replace(src, dst):
+        if Path(dst) == target:
+            raise OSError("replace failed")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(durable_io.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        durable_io.write_json(target, {"value": 2}, keep_previous=True)
+
+    assert json.loads(target.read_text(encoding="utf-8")) == {"value": 1}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["data.json", "data.json.prev"]
+
+
+def test_write_keeps_file_mode(tmp_path):
+    """置き換え後も元のファイルの権限を保つ（新規ファイルは umask に従う）"""
+    target = tmp_path / "data.json"
+    durable_io.write_json(target, {"value": 1})
+    assert stat.S_IMODE(target.stat().st_mode) == 0o666 & ~durable_io._UMASK
+
+    os.chmod(target, 0o640)
+    durable_io.write_json(target, {"value": 2}, keep_previous=True)
+    assert stat.S_IMODE(target.stat().st_mode) == 0o640
+
+
+def test_read_json_recovers_from_previous(tmp_path):
+    """壊れたファイルは前世代から読み込み、両方壊れていれば CorruptFileError"""
+    target = tmp_path / "data.json"
+    durable_io.write_json(target, {"value": 1})
+    durable_io.write_json(target, {"value": 2}, keep_previous=True)
+
+    _truncate(target)
+    assert durable_io.read_json(target) == {"value": 1}
+
+    _truncate(durable_io.previous_path(target))
+    with pytest.raises(durable_io.CorruptFileError):
+        durable_io.read_json(target)
+
+
+# --- post_status ---
+
+def test_append_killed_midway(status_files):
+    """追記の途中でプロセスが強制終了しても、書きかけの行を無視して続きから記録できる"""
+    # 子プロセスで2件記録した後、3件目の追記の途中（行の半分を書いた時点）で SIGKILL する
+    script = textwrap.dedent(f"""
+        import os, signal, sys
+        from pathlib import Path
+        sys.path.insert(0, {str(Path(__file__).parent)!r})
+        import durable_io, post_status
+
+        post_status.STATUS_FILE = Path({str(post_status.STATUS_FILE)!r})
+        post_status.JOURNAL_FILE = Path({str(post_status.JOURNAL_FILE)!r})
+        status = post_status.load_status()
+        post_status.record_post(status, "pair0", 1)
+        post_status.record_post(status, "pair1", 2)
+
+        class TornFile:
+            def __init__(self, f):
+                self.f = f
+            def __enter__(self):
+                return self
+            def __exit__(self, *exc):
+                return self.f.__exit__(*exc)
+            def __getattr__(self, name):
+                return getattr(self.f, name)
+            def write(self, data):
+                self.f.write(data[:len(data) // 2])
+                self.f.flush()
+                os.kill(os.getpid(), signal.SIGKILL)
+
+        durable_io.open = lambda *args, **kwargs: TornFile(open(*args, **kwargs))
+        post_status.record_post(status, "pair2", 3)
+    """)
+    result = subprocess.run([sys.executable, "-c", script])
+    assert result.returncode == -9
+
+    journal = post_status.JOURNAL_FILE.read_bytes()
+    assert not journal.endswith(b"\n")
+
+    status = post_status.load_status()
+    assert status["posted"] == ["pair0", "pair1"]
+    assert status["seq"] == 2
+
+    post_status.record_post(status, "pair2", 3)
+    status = post_status.load_status()
+    assert status["posted"] == ["pair0", "pair1", "pair2"]
+    assert status["text_index"] == 3
+
+
+def test_truncated_journal_ignores_torn_line(status_files):
+    """ジャーナルの末尾が切れていても、それ以前のイベントは読み込める"""
+    _record_posts(2)
+    _truncate(post_status.JOURNAL_FILE)
+
+    status = post_status.load_status()
+    assert status["posted"] == ["pair0"]
+    assert status["seq"] == 1
+
+
+def test_truncated_snapshot_recovers_from_previous(status_files):
+    """スナップショットが壊れていても、前世代のスナップショットと両方のジャーナルから復旧する"""
+    expected = _record_posts(7)
+    # 3件目と6件目でコンパクション: 前世代 = seq 3 のスナップショットと seq 4〜6 のジャーナル
+    assert durable_io.previous_path(post_status.STATUS_FILE).exists()
+    assert durable_io.previous_path(post_status.JOURNAL_FILE).exists()
+
+    _truncate(post_status.STATUS_FILE)
+    status = post_status.load_status()
+    assert status["posted"] == expected["posted"]
+    assert status["text_index"] == expected["text_index"]
+    assert status["seq"] == 7
+
+
+def test_corrupt_snapshot_without_previous_raises(status_files):
+    """スナップショットも前世代も壊れている場合は CorruptFileError"""
+    _record_posts(7)
+    _truncate(post_status.STATUS_FILE)
+    _truncate(durable_io.previous_path(post_status.STATUS_FILE))
+
+    with pytest.raises(durable_io.CorruptFileError):
+        post_status.load_status()
+
+
+# --- tweet_manager ---
+
+def test_corrupt_tweets_json_raises(tweet_files):
+    """tweets.json が壊れていて前世代もない場合は、空のインデックスで続けずにエラーにする"""
+    tweet_manager.TWEETS_FILE.write_text('[{"id": "1", "created_at": "2024-', encoding="utf-8")
+
+    for _ in range(2):
+        with pytest.raises(durable_io.CorruptFileError):
+            tweet_manager.load_tweets()
+    assert tweet_manager.TWEETS_FILE.read_text(encoding="utf-8").startswith('[{"id": "1"')
+
+
+def test_truncated_tweets_json_recovers_from_previous(tweet_files):
+    """コンパクション後に tweets.json が壊れても、前世代と両方のジャーナルから復旧する"""
+    for i in range(4):
+        tweet_manager.add_tweet(str(i), f"2024-01-0{i + 1}T00:00:00+00:00", f"text{i}")
+    tweet_manager.remove_tweet("0")
+    tweet_manager.remove_tweet("1")
+    # 3件ごとにコンパクション: 前世代 = 0〜2 の tweets.json と、3 の追加・0 と 1 の削除のジャーナル
+    tweet_manager.add_tweet("4", "2024-01-05T00:00:00+00:00", "text4")
+    expected = ["2", "3", "4"]
+    assert [t["id"] for t in tweet_manager.load_tweets()] == expected
+
+    _truncate(tweet_manager.TWEETS_FILE)
+    assert [t["id"] for t in tweet_manager.load_tweets()] == expected
+
+
+def test_index_rebuilt_from_text_store(tweet_files):
+    """インデックスを消しても、tweets.json とジャーナルから作り直す"""
+    for i in range(5):
+        tweet_manager.add_tweet(str(i), f"2024-01-0{i + 1}T00:00:00+00:00", f"text{i}")
+    tweet_manager.remove_tweet("2")
+
+    tweet_manager.TWEETS_DB.unlink()
+    assert [t["id"] for t in tweet_manager.load_tweets()] == ["0", "1", "3", "4"]
+    assert tweet_manager.get_oldest_tweet()["id"] == "0"
+
+    # インデックスを経由しない変更（git pull など）も反映する
+    durable_io.append_line(tweet_manager.TWEETS_JOURNAL, json.dumps({"event": "remove", "id": "0"}))
+    assert tweet_manager.get_oldest_tweet()["id"] == "1"
+
+
+def test_save_tweets_discards_previous_journal(tweet_files):
+    """save_tweets で置き換えた後は、前世代のジャーナルのイベントを適用し直さない"""
+    for i in range(4):
+        tweet_manager.add_tweet(str(i), f"2024-01-0{i + 1}T00:00:00+00:00")
+    tweet_manager.save_tweets([{"id": "9", "created_at": "2024-02-01T00:00:00+00:00"}])
+
+    tweet_manager.TWEETS_DB.unlink()
+    assert [t["id"] for t in tweet_manager.load_tweets()] == ["9"]
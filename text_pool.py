@@ -0,0 +1,185 @@
+"""
+投稿テキストのプール
+
+これから使う text_index の投稿テキストを Gemini API で事前に生成して保持する。
+post_to_x.py はプールに生成済みのテキストがあればそれを使い、投稿処理の中で
+Gemini API の応答を待たない（生成済みでなければ投稿前にその1件だけ生成し、
+それも失敗した場合は post_texts.txt にフォールバック）。
+
+生成は TEXT_POOL_BATCH_SIZE 件ずつ1回のリクエストにまとめ（generate_post_texts_gemini）、
+複数のリクエストは並列に行う（同時実行数は TEXT_POOL_WORKERS まで）。
+失敗・タイムアウトした、または応答に含まれなかった text_index だけが次回の補充に回る。
+
+プールは TEXT_POOL_FILE に text_index をキーとして保存する
+（GitHub Actions では actions/cache で実行間に引き継ぎ、補充は投稿後に post_to_x.py が行う）。
+使用したテキストは投稿後に削除し、text_index が一巡した際は新しく生成する。
+
+設定（環境変数）:
+- TEXT_POOL_FILE: プールの保存先（デフォルト: スクリプトと同じフォルダの .cache/text_pool.json）
+- TEXT_POOL_SIZE: 先に生成しておく件数（デフォルト: 5、0で無効）
+- TEXT_POOL_WORKERS: 生成の同時実行数（デフォルト: 3）
+- TEXT_POOL_BATCH_SIZE: 1回のリクエストで生成する件数（デフォルト: 10、1で1件ずつ生成）
+
+使い方:
+    python text_pool.py          # プールの内容を表示
+    python text_pool.py fill     # 次に使う TEXT_POOL_SIZE 件を生成
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import durable_io
+from generate_post_text import generate_post_text_gemini, generate_post_texts_gemini
+
+TEXT_POOL_FILE = Path(os.getenv("TEXT_POOL_FILE", Path(__file__).parent / ".cache" / "text_pool.json"))
+TEXT_POOL_SIZE = int(os.getenv("TEXT_POOL_SIZE", "5"))
+TEXT_POOL_WORKERS = int(os.getenv("TEXT_POOL_WORKERS", "3"))
+TEXT_POOL_BATCH_SIZE = int(os.getenv("TEXT_POOL_BATCH_SIZE", "10"))
+
+POOL_VERSION = 1
+
+_pool_lock = threading.Lock()
+
+
+def load_pool() -> dict:
+    """
+    プールを読み込み
+
+    Returns:
+        text_index（文字列）-> エントリ
+        - text: 生成されたテキスト
+        - generated_at: 生成日時（UNIX時間）
+    """
+    try:
+        pool = durable_io.read_json(TEXT_POOL_FILE, {})
+    except durable_io.CorruptFileError as e:
+        # 再生成できるデータのため、読み込めなければ空から作り直す
+        print(f"警告: {e}")
+        return {}
+    if not isinstance(pool, dict) or pool.get("version") != POOL_VERSION:
+        return {}
+    return pool.get("texts", {})
+
+
+def save_pool(texts: dict):
+    """プールを保存"""
+    TEXT_POOL_FILE.parent.mkdir(parents=True, exist_ok=True)
+    durable_io.write_json(TEXT_POOL_FILE, {"version": POOL_VERSION, "texts": texts}, indent=2)
+
+
+def get_text(text_index: int) -> str | None:
+    """text_index の生成済みテキストを取得（未生成の場合None）"""
+    entry = load_pool().get(str(text_index))
+    return entry["text"] if entry else None
+
+
+def remove(text_index: int):
+    """使用したテキストをプールから削除"""
+    with _pool_lock:
+        texts = load_pool()
+        if texts.pop(str(text_index), None) is not None:
+            save_pool(texts)
+
+
+def upcoming_indices(text_index: int, modulus: int, count: int = TEXT_POOL_SIZE) -> list[int]:
+    """
+    これから使う text_index のリスト
+
+    Args:
+        text_index: 次に使う text_index
+        modulus: text_index の周期（post_texts.txt の行数）
+        count: 件数
+    """
+    indices = []
+    for i in range(count):
+        index = (text_index + i) % modulus
+        if index in indices:
+            break
+        indices.append(index)
+    return indices
+
+
+def _store(generated: dict[int, str]):
+    if not generated:
+        return
+    with _pool_lock:
+        texts = load_pool()
+        now = int(time.time())
+        for text_index, text in generated.items():
+            texts[str(text_index)] = {"text": text, "generated_at": now}
+        save_pool(texts)
+
+
+def _generate(api_key: str, batch: list[int]) -> dict[int, str]:
+    """batch の text_index のテキストを生成（1件の場合は単体の生成）"""
+    if len(batch) == 1:
+        text = generate_post_text_gemini(api_key=api_key, text_index=batch[0])
+        return {batch[0]: text} if text else {}
+    return generate_post_texts_gemini(api_key, batch)
+
+
+def fill(api_key: str, indices: list[int], workers: int = TEXT_POOL_WORKERS,
+         batch_size: int = TEXT_POOL_BATCH_SIZE) -> int:
+    """
+    未生成の text_index のテキストを生成してプールに追加
+
+    batch_size 件ずつ1回のリクエストで生成し、複数のリクエストは並列に行う。
+    生成できたリクエストから順に保存するため、途中で止まっても生成済みの分は残る。
+
+    Returns:
+        プールに揃っている件数（indices のうち）
+    """
+    texts = load_pool()
+    missing = [index for index in indices if str(index) not in texts]
+    print(f"=== テキストプール: {len(indices) - len(missing)}/{len(indices)} 件生成済み ===")
+    if not missing:
+        return len(indices)
+
+    ready = len(indices) - len(missing)
+    batch_size = max(1, batch_size)
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(_generate, api_key, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            generated = future.result()
+            _store(generated)
+            ready += len(generated)
+            failed = [index for index in futures[future] if index not in generated]
+            if failed:
+                print(f"  ⚠ text_index={failed} の生成に失敗しました（次回の補充で再試行）")
+
+    print(f"テキストプール: {ready}/{len(indices)} 件生成済み")
+    return ready
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "fill":
+        from dotenv import load_dotenv
+        load_dotenv(Path(__file__).parent / ".env")
+
+        import post_status
+        from post_to_x import load_post_texts
+
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            print("GEMINI_API_KEY が設定されていません")
+            sys.exit(1)
+        if TEXT_POOL_SIZE <= 0:
+            print("TEXT_POOL_SIZE が0のため生成しません")
+            sys.exit(0)
+
+        status = post_status.load_status()
+        modulus = len(load_post_texts())
+        fill(api_key, upcoming_indices(status["text_index"] % modulus, modulus))
+    else:
+        texts = load_pool()
+        print(f"=== テキストプール ({TEXT_POOL_FILE}) ===")
+        if not texts:
+            print("空です。")
+        for index in sorted(texts, key=int):
+            preview = texts[index]["text"].replace("\n", " ")[:40]
+            print(f"  {index}: {preview}")
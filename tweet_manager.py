@@ -1,14 +1,73 @@
 """
 ツイートデータ管理モジュール
 
-tweets.json を読み書きし、IDと投稿日時のリストを管理する。
+IDと投稿日時のリストを、スナップショット (tweets.json) と追記専用のジャーナル
+(tweets.journal) の2つのテキストファイルで管理する（git にコミットするのはこの2つ）。
+
+- 追加・削除のたびにジャーナルの末尾にイベントを1行（JSON）追記する
+  （tweets.json 全体を書き直さないため、コミットの差分も1行で済む）
+- ジャーナルが TWEETS_COMPACT_EVERY 件を超えたら、tweets.json（日時順）に反映して
+  ジャーナルを空にする（コンパクション）。前世代 (.prev) も残す
+- 検索用に SQLite のインデックス (.cache/tweets.db) を持つ。ID（主キー）と投稿日時
+  （ソートキー）にインデックスがあるため、追加・削除・最古の取得は全件を読まずに行える
+- インデックスは tweets.json とジャーナルから作り直せるキャッシュで、
+  元ファイルのサイズと更新日時が記録と違う場合（git pull 後など）は作り直す
+
+投稿日時は書き込み時に1度だけパースし、UTCのepoch秒 (created_ts) として保存する。
+並び替えや最古の取得はこの整数のみを使い、日時文字列のパースは行わない。
+
+イベントは同じものを2回適用しても結果が変わらない（追加は既存IDを無視、削除は存在しなくても可）。
+そのためコンパクションの途中で止まった場合や、tweets.json を前世代から復旧した場合も、
+前世代のジャーナルと今のジャーナルを順に適用し直せばよい。
+tweets.json も前世代も壊れている場合はエラーにする（履歴を空で上書きしない）。
+
+イベントの形式:
+    {"event": "add", "id": ID, "created_at": 投稿日時, "text": 本文, "created_ts": epoch秒}
+    {"event": "remove", "id": ID}
+
+設定（環境変数）:
+- TWEETS_DB: インデックスの保存先（デフォルト: スクリプトと同じフォルダの .cache/tweets.db）
+- TWEETS_COMPACT_EVERY: コンパクションするジャーナルの件数（デフォルト: 50）
+
+使い方:
+    python tweet_manager.py                          # 件数を表示
+    python tweet_manager.py compact                  # 今すぐコンパクション
+    python tweet_manager.py import [tweets.json のパス]   # 別の tweets.json を取り込む
+    python tweet_manager.py migrate [tweets.json のパス]  # 各レコードに created_ts を付与
 """
 
 import json
+import os
+import sqlite3
+import sys
+from contextlib import closing, contextmanager
 from pathlib import Path
 from datetime import datetime, timezone
 
+import durable_io
+
 TWEETS_FILE = Path(__file__).parent / "tweets.json"
+TWEETS_JOURNAL = Path(__file__).parent / "tweets.journal"
+TWEETS_DB = Path(os.getenv("TWEETS_DB", Path(__file__).parent / ".cache" / "tweets.db"))
+TWEETS_COMPACT_EVERY = int(os.getenv("TWEETS_COMPACT_EVERY", "50"))
+
+# インデックスのスキーマのバージョン（PRAGMA user_version、違う場合は作り直す）
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    id TEXT PRIMARY KEY,
+    created_at TEXT,
+    text TEXT,
+    created_ts INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tweets_created_ts ON tweets (created_ts, id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
 
 def parse_date(date_str: str) -> datetime:
     if not date_str:
@@ -24,56 +83,292 @@ def parse_date(date_str: str) -> datetime:
     return datetime.min.replace(tzinfo=timezone.utc)
 
 
-def load_tweets() -> list[dict]:
-    """ツイートリストを読み込む"""
-    if not TWEETS_FILE.exists():
-        return []
-    
+def to_epoch(created_at: str) -> int:
+    """投稿日時をUTCのepoch秒に正規化"""
+    dt = parse_date(created_at or "")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _record_epoch(tweet: dict) -> int:
+    """レコードのepoch秒を取得（created_ts があればパースしない）"""
+    created_ts = tweet.get("created_ts")
+    if isinstance(created_ts, int):
+        return created_ts
+    return to_epoch(tweet.get("created_at"))
+
+
+def _source_fingerprint() -> str:
+    """tweets.json とジャーナル（前世代を含む）のサイズと更新日時"""
+    paths = [TWEETS_FILE, durable_io.previous_path(TWEETS_JOURNAL), TWEETS_JOURNAL]
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            fingerprint.append(None)
+            continue
+        fingerprint.append([stat.st_size, stat.st_mtime_ns])
+    return json.dumps(fingerprint)
+
+
+def _read_json(path: Path) -> list[dict]:
+    """
+    tweets.json を読み込み（壊れている場合は前世代から復旧）
+
+    Raises:
+        durable_io.CorruptFileError: 前世代からも復旧できない場合
+    """
+    return durable_io.read_json(path, [])
+
+
+def _read_journal(path: Path) -> list[dict]:
+    """ジャーナルのイベントを読み込み（書きかけで止まった行は無視）"""
+    events = []
     try:
-        with open(TWEETS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return []
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return events
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            print(f"警告: {path.name} の書きかけの行を無視しました: {line[:80]}")
+    return events
+
+
+def _import_rows(conn: sqlite3.Connection, tweets: list[dict]) -> int:
+    """ツイートをインデックスに追加（既存IDは無視）し、追加件数を返す"""
+    before = conn.total_changes
+    conn.executemany(
+        "INSERT OR IGNORE INTO tweets (id, created_at, text, created_ts) VALUES (?, ?, ?, ?)",
+        [
+            (str(t["id"]), t.get("created_at"), t.get("text", ""), _record_epoch(t))
+            for t in tweets
+        ]
+    )
+    return conn.total_changes - before
+
+
+def _apply(conn: sqlite3.Connection, event: dict):
+    """イベントをインデックスに適用"""
+    if event["event"] == "add":
+        _import_rows(conn, [event])
+    elif event["event"] == "remove":
+        conn.execute("DELETE FROM tweets WHERE id = ?", (str(event["id"]),))
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def _get_meta(conn: sqlite3.Connection, key: str) -> str | None:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _rebuild(conn: sqlite3.Connection):
+    """tweets.json とジャーナルからインデックスを作り直す"""
+    # 読み込めない場合は作り直す前にエラーにする（インデックスは空にしない）
+    tweets = _read_json(TWEETS_FILE)
+    events = _read_journal(TWEETS_JOURNAL)
+    previous = _read_journal(durable_io.previous_path(TWEETS_JOURNAL))
+
+    conn.execute("DELETE FROM tweets")
+    _import_rows(conn, tweets)
+    for event in previous + events:
+        _apply(conn, event)
+    _set_meta(conn, "journal_size", len(events))
+    _set_meta(conn, "source", _source_fingerprint())
+
+
+@contextmanager
+def _open_db():
+    """インデックスを開き（元ファイルが変わっていれば作り直す）、正常終了すればコミットする"""
+    TWEETS_DB.parent.mkdir(parents=True, exist_ok=True)
+    with closing(sqlite3.connect(TWEETS_DB)) as conn:
+        conn.row_factory = sqlite3.Row
+        with conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.executescript("DROP TABLE IF EXISTS tweets; DROP TABLE IF EXISTS meta;")
+                conn.executescript(SCHEMA)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            if _get_meta(conn, "source") != _source_fingerprint():
+                _rebuild(conn)
+        with conn:
+            yield conn
+
+
+def _row_to_dict(row: sqlite3.Row) -> dict:
+    return {
+        "id": row["id"],
+        "created_at": row["created_at"],
+        "text": row["text"],
+        "created_ts": row["created_ts"],
+    }
+
+
+def _all_rows(conn: sqlite3.Connection) -> list[dict]:
+    rows = conn.execute(
+        "SELECT id, created_at, text, created_ts FROM tweets ORDER BY created_ts, id"
+    ).fetchall()
+    return [_row_to_dict(row) for row in rows]
+
+
+def _compact(conn: sqlite3.Connection):
+    """
+    インデックスの内容を tweets.json に書き出してジャーナルを空にする
+
+    tweets.json の置き換え後にジャーナルを空にするため、その間に止まっても
+    次回はジャーナルのイベントが重ねて適用されるだけで結果は変わらない。
+    """
+    durable_io.write_json(TWEETS_FILE, _all_rows(conn), keep_previous=True, indent=2)
+    durable_io.write_text(TWEETS_JOURNAL, "", keep_previous=True)
+    _set_meta(conn, "journal_size", 0)
+    _set_meta(conn, "source", _source_fingerprint())
+
+
+def _append(conn: sqlite3.Connection, event: dict):
+    """イベントをジャーナルに追記してインデックスに適用"""
+    durable_io.append_line(TWEETS_JOURNAL, json.dumps(event, ensure_ascii=False))
+    _apply(conn, event)
+    journal_size = int(_get_meta(conn, "journal_size") or 0) + 1
+    _set_meta(conn, "journal_size", journal_size)
+    _set_meta(conn, "source", _source_fingerprint())
+
+    if journal_size >= TWEETS_COMPACT_EVERY:
+        _compact(conn)
+
+
+def compact():
+    """今すぐコンパクション"""
+    with _open_db() as conn:
+        _compact(conn)
+
+
+def import_from_json(path: Path) -> int:
+    """別の tweets.json の内容を取り込む（重複IDはスキップ）"""
+    with _open_db() as conn:
+        added = _import_rows(conn, _read_json(path))
+        _compact(conn)
+    return added
+
+
+def migrate_json(path: Path = None) -> int:
+    """
+    tweets.json の各レコードに created_ts を付与する（既に付与済みのものはそのまま）
+
+    Returns:
+        created_ts を付与したレコード数
+    """
+    if path is None:
+        path = TWEETS_FILE
+    tweets = _read_json(path)
+
+    updated = 0
+    for tweet in tweets:
+        if not isinstance(tweet.get("created_ts"), int):
+            tweet["created_ts"] = to_epoch(tweet.get("created_at"))
+            updated += 1
+
+    # 整数キーでソート（日時文字列のパースなし）
+    tweets.sort(key=lambda x: x["created_ts"])
+
+    # 書き込み途中で止まっても元のファイルが残るよう、アトミックに置き換える
+    durable_io.write_json(path, tweets, keep_previous=True, indent=2)
+    return updated
+
+
+def load_tweets() -> list[dict]:
+    """ツイートリストを読み込む（日時順）"""
+    with _open_db() as conn:
+        return _all_rows(conn)
 
 def save_tweets(tweets: list[dict]):
-    """ツイートリストを保存する（日時順にソート）"""
-    # created_at でソート（古い順）
-    # datetime型にパースして比較する
-    tweets.sort(key=lambda x: parse_date(x.get("created_at") or ""))
-    
-    with open(TWEETS_FILE, "w", encoding="utf-8") as f:
-        json.dump(tweets, f, indent=2, ensure_ascii=False)
-
-def add_tweet(tweet_id: str, created_at: str, text: str = ""):
-    """新しいツイートを追加"""
-    tweets = load_tweets()
-    
-    # 重複チェック
-    if any(t["id"] == str(tweet_id) for t in tweets):
-        return
-
-    tweets.append({
-        "id": str(tweet_id),
-        "created_at": created_at,
-        "text": text
-    })
-    save_tweets(tweets)
+    """ツイートリストで保存内容を置き換える（日時順に tweets.json に書き出す）"""
+    with _open_db() as conn:
+        conn.execute("DELETE FROM tweets")
+        _import_rows(conn, tweets)
+        _compact(conn)
+        # 置き換え前のイベントを前世代のジャーナルから適用し直さないよう空にする
+        durable_io.write_text(durable_io.previous_path(TWEETS_JOURNAL), "")
+        _set_meta(conn, "source", _source_fingerprint())
+
+def add_tweet(tweet_id: str, created_at: str, text: str = "", created_ts: int = None):
+    """新しいツイートを追加（同じIDが既にあれば何もしない）"""
+    with _open_db() as conn:
+        if conn.execute("SELECT 1 FROM tweets WHERE id = ?", (str(tweet_id),)).fetchone():
+            return
+        _append(conn, {
+            "event": "add",
+            "id": str(tweet_id),
+            "created_at": created_at,
+            "text": text,
+            "created_ts": int(created_ts) if created_ts is not None else to_epoch(created_at),
+        })
 
 def get_oldest_tweet() -> dict | None:
     """最も古いツイートを取得"""
-    tweets = load_tweets()
-    if not tweets:
-        return None
-    # ソート済み前提だが、念のためパースしてソートする
-    tweets.sort(key=lambda x: parse_date(x.get("created_at") or ""))
-    return tweets[0]
+    with _open_db() as conn:
+        row = conn.execute(
+            "SELECT id, created_at, text, created_ts FROM tweets ORDER BY created_ts, id LIMIT 1"
+        ).fetchone()
+    return _row_to_dict(row) if row else None
+
+def get_oldest_tweets(limit: int) -> list[dict]:
+    """古い順にツイートを最大 limit 件取得"""
+    with _open_db() as conn:
+        rows = conn.execute(
+            "SELECT id, created_at, text, created_ts FROM tweets ORDER BY created_ts, id LIMIT ?",
+            (limit,)
+        ).fetchall()
+    return [_row_to_dict(row) for row in rows]
+
+def count_older_than(created_ts: int) -> int:
+    """指定したepoch秒より古いツイート数を取得"""
+    with _open_db() as conn:
+        return conn.execute(
+            "SELECT COUNT(*) FROM tweets WHERE created_ts < ?", (created_ts,)
+        ).fetchone()[0]
 
 def remove_tweet(tweet_id: str):
     """ツイートを削除"""
-    tweets = load_tweets()
-    tweets = [t for t in tweets if t["id"] != str(tweet_id)]
-    save_tweets(tweets)
+    with _open_db() as conn:
+        if not conn.execute("SELECT 1 FROM tweets WHERE id = ?", (str(tweet_id),)).fetchone():
+            return
+        _append(conn, {"event": "remove", "id": str(tweet_id)})
 
 def get_count() -> int:
     """保存されているツイート数を取得"""
-    return len(load_tweets())
+    with _open_db() as conn:
+        return conn.execute("SELECT COUNT(*) FROM tweets").fetchone()[0]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "compact":
+        compact()
+        print(f"コンパクションしました: {TWEETS_FILE.name}（{get_count()}件）")
+    elif len(sys.argv) > 1 and sys.argv[1] == "import":
+        if len(sys.argv) < 3:
+            print("使い方: python tweet_manager.py import <tweets.json のパス>")
+            sys.exit(1)
+        source = Path(sys.argv[2])
+        added = import_from_json(source)
+        print(f"{source} から {added} 件を取り込みました（合計: {get_count()}件）")
+    elif len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        source = Path(sys.argv[2]) if len(sys.argv) > 2 else TWEETS_FILE
+        updated = migrate_json(source)
+        print(f"{source}: {updated} 件に created_ts を付与しました")
+    else:
+        print("=== ツイートデータ ===")
+        print(f"  件数: {get_count()}件")
+        print(f"  インデックス: {TWEETS_DB}")
+        print("使い方:")
+        print("  python tweet_manager.py compact")
+        print("  python tweet_manager.py import <tweets.json のパス>")
+        print("  python tweet_manager.py migrate [tweets.json のパス]")